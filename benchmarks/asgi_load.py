@@ -0,0 +1,150 @@
+"""
+Load test of the async CV views under ASGI against the sync views under WSGI.
+
+Both variants are served by uvicorn (``--interface asgi`` with joinit.asgi and
+``--interface wsgi`` with joinit.wsgi) using the environment of this process,
+so point DATABASE_URL at a database that already holds CVs (see the import_cvs
+command) and run with DEBUG off. The CV views are staff only, so the requests
+carry the session of a staff user created in that database. Usage:
+
+    python -m benchmarks.asgi_load --concurrency 64 --seconds 10 --cv-id 1
+
+uvicorn is not a runtime dependency of the project; it is in requirements-dev.txt.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+STAFF_EMAIL = 'benchmark-staff@example.com'
+SCENARIOS = {
+    # name: (sync path, async path)
+    'list': ('/cv/?per_page=20', '/cv/async/?per_page=20'),
+    'detail': ('/cv/{cv_id}/', '/cv/async/{cv_id}/'),
+    'search': ('/cv/search/?q={query}', '/cv/async/search/?q={query}'),
+}
+
+SERVERS = {
+    'wsgi': ['--interface', 'wsgi', 'joinit.wsgi:application'],
+    'asgi': ['--interface', 'asgi3', 'joinit.asgi:application'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, port, workers):
+    command = [
+        sys.executable, '-m', 'uvicorn', '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(workers), '--no-access-log', *SERVERS[kind],
+    ]
+    process = subprocess.Popen(command, env=os.environ.copy())
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f'uvicorn exited with status {process.returncode}')
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('uvicorn did not start listening within 30 seconds')
+
+
+def staff_session_cookie():
+    """Return a Cookie header value logging the requests in as a staff user."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'joinit.settings')
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    from django.contrib.sessions.backends.db import SessionStore
+
+    from users.models import User
+
+    user, _ = User.objects.get_or_create(
+        email=STAFF_EMAIL, defaults={'username': STAFF_EMAIL, 'is_staff': True},
+    )
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+async def client(port, path, cookie, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: localhost\r\nCookie: {cookie}\r\nConnection: keep-alive\r\n\r\n'
+    ).encode()
+    try:
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            writer.write(request)
+            status_line = await reader.readline()
+            length = 0
+            while (line := await reader.readline()) not in (b'\r\n', b''):
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            if not status_line.startswith(b'HTTP/1.1 200'):
+                errors.append(status_line)
+    finally:
+        writer.close()
+
+
+async def load(port, path, cookie, concurrency, seconds):
+    latencies, errors = [], []
+    deadline = time.monotonic() + seconds
+    await asyncio.gather(*(client(port, path, cookie, deadline, latencies, errors) for _ in range(concurrency)))
+    latencies.sort()
+    return {
+        'requests_per_second': len(latencies) / seconds,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else None,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else None,
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--cv-id', type=int, default=1)
+    parser.add_argument('--query', default='python')
+    parser.add_argument('--scenario', choices=SCENARIOS, action='append')
+    args = parser.parse_args()
+
+    cookie = staff_session_cookie()
+    for kind in SERVERS:
+        port = free_port()
+        server = start_server(kind, port, args.workers)
+        try:
+            for scenario in args.scenario or SCENARIOS:
+                path = SCENARIOS[scenario][kind == 'asgi'].format(cv_id=args.cv_id, query=args.query)
+                asyncio.run(load(port, path, cookie, args.concurrency, 1))  # warm up caches and connections
+                result = asyncio.run(load(port, path, cookie, args.concurrency, args.seconds))
+                print(
+                    f'{kind} {scenario:<8} {result["requests_per_second"]:>8.0f} req/s  '
+                    f'p50 {result["p50_ms"] or 0:>7.1f} ms  p99 {result["p99_ms"] or 0:>7.1f} ms  '
+                    f'errors {result["errors"]}'
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare two result files of benchmarks.suite, e.g. of the base and head of a branch.
+
+A scenario regresses when its median latency grows by more than --threshold
+percent (and by more than --min-delta milliseconds, to ignore noise on very
+fast scenarios) or when it runs more queries than before. Exits with status 1
+if any scenario regressed. Usage:
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare(base, head, threshold, min_delta):
+    """Yield (scenario, base result, head result, relative change, regressed) for the scenarios of both runs."""
+    for name, new in head['scenarios'].items():
+        old = base['scenarios'].get(name)
+        if old is None:
+            continue
+        delta = new['median_ms'] - old['median_ms']
+        change = delta / old['median_ms'] if old['median_ms'] else 0.0
+        slower = change * 100 > threshold and delta > min_delta
+        yield name, old, new, change, slower or new['queries'] > old['queries']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Allowed median slowdown in percent.')
+    parser.add_argument('--min-delta', type=float, default=0.5, help='Ignore slowdowns below this many ms.')
+    args = parser.parse_args()
+
+    base, head = load(args.base), load(args.head)
+    for key in ('scale', 'database'):
+        if base['meta'].get(key) != head['meta'].get(key):
+            print(f'warning: comparing runs with different {key}: {base["meta"].get(key)} and {head["meta"].get(key)}')
+
+    regressed = []
+    print(f'{"scenario":<16} {"base ms":>10} {"head ms":>10} {"change":>8} {"queries":>9}')
+    for name, old, new, change, slower in compare(base, head, args.threshold, args.min_delta):
+        if slower:
+            regressed.append(name)
+        print(
+            f'{name:<16} {old["median_ms"]:>10.2f} {new["median_ms"]:>10.2f} {change:>+8.1%} '
+            f'{old["queries"]:>4} {new["queries"]:>4}{"  REGRESSED" if slower else ""}'
+        )
+    for name in sorted(base['scenarios'].keys() - head['scenarios'].keys()):
+        print(f'{name:<16} missing from {args.head}')
+    if regressed:
+        sys.exit(f'Regressed: {", ".join(regressed)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Synthetic users and CVs for the benchmarks.
+
+Records are generated deterministically from a seed, so two runs at the same
+scale see the same data. CVs are written through cv.importers, like a real
+bulk import, so the search index, skills, summaries and blocking keys they
+derive are populated too. Every CV belongs to a user sharing its email, and
+every user has the password PASSWORD.
+"""
+import datetime
+import json
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db.models import OuterRef, Subquery
+
+from cv.importers import import_cvs
+from cv.models import CvContent
+
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+PASSWORD = 'benchmark-password'
+BATCH_SIZE = 1000
+
+FIRST_NAMES = [
+    'Anna', 'Ben', 'Chloé', 'David', 'Elif', 'Felix', 'Greta', 'Hugo', 'Ines', 'Jonas', 'Katarzyna', 'Lars',
+    'Marta', 'Noah', 'Olga', 'Pablo', 'Quentin', 'Rosa', 'Stefan', 'Tereza', 'Umut', 'Vera', 'Wojciech', 'Zoe',
+]
+LAST_NAMES = [
+    'Andersen', 'Becker', 'Costa', 'Dubois', 'Eriksson', 'Fischer', 'García', 'Horvath', 'Ivanova', 'Jansen',
+    'Kowalski', 'Lehmann', 'Moreau', 'Novak', 'Olsen', 'Petrov', 'Rossi', 'Schmidt', 'Tanaka', 'Weber', 'Yilmaz',
+]
+LOCATIONS = [
+    'Amsterdam', 'Barcelona', 'Berlin', 'Brussels', 'Budapest', 'Copenhagen', 'Dublin', 'Hamburg', 'Helsinki',
+    'Kraków', 'Lisbon', 'London', 'Madrid', 'Milan', 'Munich', 'Paris', 'Prague', 'Stockholm', 'Vienna', 'Warsaw',
+]
+TITLES = [
+    'Backend Developer', 'Frontend Developer', 'Data Engineer', 'Data Scientist', 'DevOps Engineer',
+    'Engineering Manager', 'Full Stack Developer', 'Mobile Developer', 'QA Engineer', 'Site Reliability Engineer',
+    'Software Architect', 'Product Designer',
+]
+SKILLS = [
+    'Python', 'Django', 'Flask', 'JavaScript', 'TypeScript', 'React', 'Vue', 'Angular', 'Node.js', 'Go', 'Rust',
+    'Java', 'Kotlin', 'Swift', 'C#', 'PostgreSQL', 'MySQL', 'Redis', 'Kafka', 'Docker', 'Kubernetes', 'Terraform',
+    'AWS', 'GCP', 'Azure', 'Linux', 'GraphQL', 'Spark', 'Pandas', 'Machine Learning', 'CI/CD', 'Elasticsearch',
+]
+COMPANIES = [
+    'Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries', 'Wayne Enterprises', 'Soylent',
+    'Tyrell', 'Cyberdyne', 'Aperture', 'Vandelay Industries', 'Wonka', 'Gringotts', 'Oscorp',
+]
+SCHOOLS = [
+    'TU Berlin', 'ETH Zürich', 'KTH Stockholm', 'Sorbonne', 'University of Warsaw', 'TU Delft', 'Charles University',
+    'University of Lisbon', 'Politecnico di Milano', 'Trinity College Dublin',
+]
+FIELDS_OF_STUDY = ['Computer Science', 'Mathematics', 'Physics', 'Electrical Engineering', 'Economics', 'Design']
+DEGREES = ['BSc', 'MSc', 'PhD', None]
+CERTIFICATES = [
+    ('AWS Solutions Architect', 'Amazon'), ('CKA', 'CNCF'), ('Professional Scrum Master', 'Scrum.org'),
+    ('Azure Developer Associate', 'Microsoft'), ('Google Professional Data Engineer', 'Google'),
+]
+TODAY = datetime.date(2024, 1, 1)
+
+
+def email(index):
+    return f'candidate{index}@example.com'
+
+
+def _date(rng, start_year, end_year):
+    return datetime.date(rng.randint(start_year, end_year), rng.randint(1, 12), rng.randint(1, 28))
+
+
+def _work_experiences(rng):
+    jobs = []
+    end = TODAY
+    for position in range(rng.randint(1, 4)):
+        start = end - datetime.timedelta(days=rng.randint(180, 1500))
+        current = position == 0 and rng.random() < 0.6
+        jobs.append({
+            'company': rng.choice(COMPANIES),
+            'title': rng.choice(TITLES),
+            'start_date': start.isoformat(),
+            'end_date': None if current else end.isoformat(),
+            'currently_working': current,
+        })
+        end = start - datetime.timedelta(days=rng.randint(0, 120))
+    return jobs
+
+
+def cv_record(index, seed=0):
+    """Return the import record of CV number ``index``, the same for a given seed."""
+    rng = random.Random(f'{seed}:{index}')
+    first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    handle = f'{first_name}-{last_name}-{index}'.lower()
+    return {
+        'first_name': first_name,
+        'last_name': last_name,
+        'email': email(index),
+        'title': rng.choice(TITLES),
+        'summary': ' '.join(rng.choices(SKILLS + TITLES + COMPANIES, k=rng.randint(10, 40))),
+        'location': rng.choice(LOCATIONS),
+        'linkedin_url': f'https://www.linkedin.com/in/{handle}' if rng.random() < 0.7 else None,
+        'github_url': f'https://github.com/{handle}' if rng.random() < 0.4 else None,
+        'skills': ', '.join(rng.sample(SKILLS, rng.randint(3, 12))),
+        'educations': [
+            {
+                'school': rng.choice(SCHOOLS),
+                'degree': rng.choice(DEGREES),
+                'field_of_study': rng.choice(FIELDS_OF_STUDY),
+                'start_date': _date(rng, 2000, 2015).isoformat(),
+                'end_date': _date(rng, 2016, 2022).isoformat(),
+            }
+            for _ in range(rng.randint(0, 2))
+        ],
+        'work_experiences': _work_experiences(rng),
+        'certificates': [
+            {
+                'name': name,
+                'organisation': organisation,
+                'issue_date': _date(rng, 2015, 2023).isoformat(),
+                'credential_url': f'https://certificates.example.com/{index}/{position}',
+            }
+            for position, (name, organisation) in enumerate(rng.sample(CERTIFICATES, rng.randint(0, 2)))
+        ],
+    }
+
+
+def iter_cv_records(count, start=0, seed=0):
+    for index in range(start, start + count):
+        yield cv_record(index, seed)
+
+
+def create_users(count, start=0, seed=0, batch_size=BATCH_SIZE):
+    """Bulk create ``count`` users with the emails of the CVs of the same numbers."""
+    User = get_user_model()
+    # Hashing is deliberately slow; one hash shared by every user keeps generation fast.
+    password = make_password(PASSWORD)
+    for offset in range(start, start + count, batch_size):
+        users = []
+        for index in range(offset, min(offset + batch_size, start + count)):
+            rng = random.Random(f'{seed}:user:{index}')
+            users.append(User(
+                # The username column inherited from AbstractUser is still unique.
+                username=email(index),
+                email=email(index),
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                password=password,
+            ))
+        User.objects.bulk_create(users)
+
+
+def create_cvs(count, start=0, seed=0, batch_size=BATCH_SIZE, progress=None):
+    """Import ``count`` CVs with their sections and return the ImportResult."""
+    lines = (json.dumps(record) for record in iter_cv_records(count, start, seed))
+    return import_cvs(lines, chunk_size=batch_size, progress=progress)
+
+
+def link_users():
+    """Make the users the owners of the CVs sharing their email."""
+    User = get_user_model()
+    return CvContent.objects.filter(user__isnull=True).update(
+        user=Subquery(User.objects.filter(email=OuterRef('email')).values('pk')[:1]),
+    )
+
+
+def generate(count, seed=0, batch_size=BATCH_SIZE, progress=None):
+    """Create ``count`` users and ``count`` CVs owned by them."""
+    create_users(count, seed=seed, batch_size=batch_size)
+    result = create_cvs(count, seed=seed, batch_size=batch_size, progress=progress)
+    link_users()
+    return result
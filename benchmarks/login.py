@@ -0,0 +1,90 @@
+"""
+Logins per second per core for each password hasher profile.
+
+Runs authenticate() in this process (one core) against a scratch database for
+every profile of users.hashers, with a correct password, then with wrong
+passwords from one address until the throttle of users.throttle kicks in, and
+reports the attempts per second of each kind. Usage:
+
+    python -m benchmarks.login --seconds 3
+"""
+import argparse
+import os
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'joinit.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import authenticate  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases  # noqa: E402
+
+from users.models import User  # noqa: E402
+
+PASSWORD = 'benchmark-password'
+PROFILES = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'users.hashers.ScryptPasswordHasher',
+    'argon2': 'users.hashers.Argon2PasswordHasher',
+}
+
+
+def rate(attempt, seconds):
+    """Calls of ``attempt`` per second, over at least ``seconds`` and 3 calls."""
+    done = 0
+    started = time.perf_counter()
+    while done < 3 or time.perf_counter() - started < seconds:
+        attempt()
+        done += 1
+    return done / (time.perf_counter() - started)
+
+
+def run(profile, seconds):
+    request = RequestFactory().post('/accounts/login/', REMOTE_ADDR='192.0.2.1')
+    with override_settings(PASSWORD_HASHERS=[PROFILES[profile]]):
+        email = f'{profile}@example.com'
+        User.objects.create(email=email, username=email, password=make_password(PASSWORD))
+        cache.clear()
+
+        def login():
+            assert authenticate(request, email=email, password=PASSWORD) is not None
+
+        def failed_login():
+            assert authenticate(request, email=email, password='wrong') is None
+
+        logins = rate(login, seconds)
+        with override_settings(LOGIN_THROTTLE_WINDOW=0):
+            failures = rate(failed_login, seconds)
+        # Reach the limit, then measure the rejected attempts.
+        for _ in range(settings.LOGIN_THROTTLE_IDENTIFIER_LIMIT):
+            failed_login()
+        throttled = rate(failed_login, seconds)
+    return logins, failures, throttled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--profile', action='append', choices=list(PROFILES), dest='profiles')
+    args = parser.parse_args()
+
+    setup_test_environment(debug=False)
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        for profile in args.profiles or PROFILES:
+            logins, failures, throttled = run(profile, args.seconds)
+            print(
+                f'{profile:<8} logins/s {logins:>8.1f}  failed logins/s {failures:>8.1f}  '
+                f'throttled attempts/s {throttled:>10.0f}'
+            )
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
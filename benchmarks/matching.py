@@ -0,0 +1,94 @@
+"""
+Latency of scoring a job against a synthetic cv.matching index.
+
+The index is generated in memory (no database needed) with a skill and title
+vocabulary of realistic size, then a mix of jobs is matched and the latency
+percentiles of a top-k match are reported. Usage:
+
+    python -m benchmarks.matching --cvs 500000 --limit 50
+
+It still imports the Django project, so run it with the environment the
+project needs (SECRET_KEY and friends).
+"""
+import argparse
+import os
+import statistics
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'joinit.settings')
+django.setup()
+
+import numpy as np  # noqa: E402
+from scipy import sparse  # noqa: E402
+
+from cv.matching import Job, MatchingIndex  # noqa: E402
+
+
+def random_index(cvs, skills, terms, locations, skills_per_cv, seed=0):
+    rng = np.random.default_rng(seed)
+    # Skill and title term popularity follows a long tail, as in real CVs.
+    skill_ids = rng.zipf(1.3, size=cvs * skills_per_cv) % skills
+    skill_matrix = sparse.csr_matrix(
+        (np.ones(len(skill_ids)), (np.repeat(np.arange(cvs), skills_per_cv), skill_ids)), shape=(cvs, skills),
+    )
+    skill_matrix.data[:] = 1
+    term_ids = rng.zipf(1.5, size=cvs * 3) % terms
+    title_matrix = sparse.csr_matrix(
+        (np.full(len(term_ids), 1 / np.sqrt(3)), (np.repeat(np.arange(cvs), 3), term_ids)), shape=(cvs, terms),
+    )
+    return MatchingIndex(
+        cv_ids=np.arange(1, cvs + 1),
+        skills=skill_matrix,
+        titles=title_matrix,
+        locations=rng.integers(-1, locations, size=cvs).astype(np.int32),
+        years=rng.gamma(2, 4, size=cvs),
+        skill_columns={f'skill {i}': i for i in range(skills)},
+        title_columns={f'term{i}': i for i in range(terms)},
+        location_codes={f'city {i}': i for i in range(locations)},
+    )
+
+
+def random_jobs(count, skills, terms, locations, seed=1):
+    rng = np.random.default_rng(seed)
+    return [
+        Job(
+            skills=[f'skill {i}' for i in rng.zipf(1.3, size=5) % skills],
+            title=' '.join(f'term{i}' for i in rng.zipf(1.5, size=2) % terms),
+            location=f'city {rng.integers(locations)}',
+            min_years=float(rng.integers(0, 10)),
+        )
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--cvs', type=int, default=500000)
+    parser.add_argument('--skills', type=int, default=20000)
+    parser.add_argument('--terms', type=int, default=5000)
+    parser.add_argument('--locations', type=int, default=2000)
+    parser.add_argument('--skills-per-cv', type=int, default=12)
+    parser.add_argument('--jobs', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = random_index(args.cvs, args.skills, args.terms, args.locations, args.skills_per_cv)
+    print(f'generated {len(index)} CVs in {time.perf_counter() - started:.1f} s')
+
+    latencies = []
+    for job in random_jobs(args.jobs, args.skills, args.terms, args.locations):
+        started = time.perf_counter()
+        index.match(job, args.limit)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(
+        f'top-{args.limit} of {args.cvs} CVs: p50 {statistics.median(latencies) * 1000:.1f} ms  '
+        f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms  max {latencies[-1] * 1000:.1f} ms'
+    )
+
+
+if __name__ == '__main__':
+    main()
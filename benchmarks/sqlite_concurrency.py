@@ -0,0 +1,125 @@
+"""
+Mixed read/write throughput of SQLite with and without the joinit.sqlite profile.
+
+Runs reader and writer processes against a scratch database for a fixed time
+and reports completed operations per second, together with the number of
+"database is locked" errors. Usage:
+
+    python -m benchmarks.sqlite_concurrency --readers 4 --writers 2 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from joinit.sqlite import PRAGMAS, apply_pragmas
+
+MODES = {
+    # Python's sqlite3 defaults, as Django uses them out of the box.
+    'default': {},
+    'profile': PRAGMAS,
+}
+
+
+def connect(path, pragmas):
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+    apply_pragmas(connection.cursor(), pragmas)
+    return connection
+
+
+def setup(path, rows):
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute('CREATE TABLE cv (id INTEGER PRIMARY KEY, title TEXT, summary TEXT, location TEXT)')
+    connection.execute('CREATE INDEX cv_location ON cv (location)')
+    connection.execute('BEGIN')
+    connection.executemany(
+        'INSERT INTO cv (title, summary, location) VALUES (?, ?, ?)',
+        ((f'title {i}', 'summary ' * 20, f'city {i % 100}') for i in range(rows)),
+    )
+    connection.execute('COMMIT')
+    connection.close()
+
+
+def reader(path, pragmas, deadline, results):
+    connection = connect(path, pragmas)
+    done = errors = 0
+    while time.time() < deadline:
+        try:
+            connection.execute(
+                'SELECT id, title FROM cv WHERE location = ? LIMIT 20', (f'city {done % 100}',)
+            ).fetchall()
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    results.put(('read', done, errors))
+
+
+def writer(path, pragmas, deadline, results, immediate):
+    connection = connect(path, pragmas)
+    done = errors = 0
+    while time.time() < deadline:
+        try:
+            connection.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+            connection.execute('SELECT count(*) FROM cv WHERE location = ?', (f'city {done % 100}',)).fetchone()
+            connection.execute(
+                'UPDATE cv SET summary = ? WHERE id = ?', (f'summary {done}', done % 1000 + 1)
+            )
+            connection.execute('COMMIT')
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+    results.put(('write', done, errors))
+
+
+def run(mode, readers, writers, seconds, rows, immediate):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        setup(path, rows)
+        pragmas = MODES[mode]
+        results = multiprocessing.Queue()
+        deadline = time.time() + seconds
+        processes = [
+            multiprocessing.Process(target=reader, args=(path, pragmas, deadline, results)) for _ in range(readers)
+        ] + [
+            multiprocessing.Process(target=writer, args=(path, pragmas, deadline, results, immediate))
+            for _ in range(writers)
+        ]
+        for process in processes:
+            process.start()
+        totals = {'read': [0, 0], 'write': [0, 0]}
+        for _ in processes:
+            kind, done, errors = results.get()
+            totals[kind][0] += done
+            totals[kind][1] += errors
+        for process in processes:
+            process.join()
+    return {
+        kind: {'ops_per_second': done / seconds, 'locked_errors': errors}
+        for kind, (done, errors) in totals.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    for mode, immediate in (('default', False), ('profile', False), ('profile', True)):
+        result = run(mode, args.readers, args.writers, args.seconds, args.rows, immediate)
+        label = f'{mode}{" + BEGIN IMMEDIATE" if immediate else ""}'
+        print(
+            f'{label:<28} reads/s {result["read"]["ops_per_second"]:>10.0f} '
+            f'(locked {result["read"]["locked_errors"]})  '
+            f'writes/s {result["write"]["ops_per_second"]:>8.0f} (locked {result["write"]["locked_errors"]})'
+        )
+
+
+if __name__ == '__main__':
+    main()
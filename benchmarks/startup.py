@@ -0,0 +1,58 @@
+"""
+Cold start time of a process of the project.
+
+Starts fresh Python processes that set up Django (as every management command
+does) or set up Django and load the URLconf (as a web worker does before its
+first response), and reports the median and minimum wall time of each, with
+every social login provider and with none enabled. Usage:
+
+    python -m benchmarks.startup --runs 20
+
+Run it on two commits to compare them; DJANGO_STARTUP_PROFILE=1 shows which
+apps the time goes to, see joinit/startup.py.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SETUP = 'import django; django.setup()'
+COMMANDS = {
+    'setup': SETUP,
+    'urls': SETUP + '; from django.urls import get_resolver; get_resolver().url_patterns',
+}
+VARIANTS = {
+    'all providers': {},
+    'no providers': {'SOCIALACCOUNT_ENABLED_PROVIDERS': ''},
+}
+
+
+def run(code, env):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], env=env, check=True)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    base_env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'joinit.settings'}
+    base_env.pop('DJANGO_STARTUP_PROFILE', None)
+    # Once, so the first measured run doesn't compile the bytecode.
+    run(COMMANDS['urls'], base_env)
+    for variant, variables in VARIANTS.items():
+        for command, code in COMMANDS.items():
+            env = {**base_env, **variables}
+            times = [run(code, env) for _ in range(args.runs)]
+            print(
+                f'{variant:<14} {command:<6} median {statistics.median(times) * 1000:>7.1f} ms  '
+                f'min {min(times) * 1000:>7.1f} ms'
+            )
+
+
+if __name__ == '__main__':
+    main()
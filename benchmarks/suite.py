@@ -0,0 +1,291 @@
+"""
+Timed scenarios over the CV and user data paths.
+
+A scratch database (created like the test database, named after the scale) is
+filled with synthetic users and CVs from benchmarks.data, then every scenario
+is run a number of times: bulk inserts, paginated lists, CV details with a
+cold and a warm cache, filters, full-text search and login. For each scenario
+the latency percentiles and the number of queries of its most expensive run
+are reported; a scenario running more queries than its budget fails the
+suite, as query counts do not depend on the machine. Usage:
+
+    python -m benchmarks.suite --scale 10k --output before.json
+    python -m benchmarks.compare before.json after.json
+
+--scale is 10k, 100k, 1m or a number of CVs. With --keepdb the generated data
+is kept and reused by the next run at the same scale, which matters at 1m.
+Data is generated through the regular import path and takes a while.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'joinit.settings')
+django.setup()
+
+from django.db import connections, transaction  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases,
+)
+
+from benchmarks import data  # noqa: E402
+from cv import cache  # noqa: E402
+from cv.models import CvContent  # noqa: E402
+from users.models import User  # noqa: E402
+
+REPEAT = 20
+WARMUP = 2
+PAGE_SIZE = 20
+INSERT_BATCH = 1000
+STAFF_EMAIL = 'benchmark-staff@example.com'
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: object
+    # Most queries a single run may execute.
+    max_queries: int
+    # Called before every run, untimed.
+    setup: object = None
+    # Runs are rolled back, for scenarios that write.
+    rollback: bool = False
+    # Overrides --repeat for slow scenarios.
+    repeat: int = None
+
+
+class Context:
+    def __init__(self, count, seed):
+        self.count = count
+        self.client = Client()
+        # The CV views are staff only.
+        staff, _ = User.objects.get_or_create(
+            email=STAFF_EMAIL, defaults={'username': STAFF_EMAIL, 'is_staff': True},
+        )
+        self.client.force_login(staff)
+        self.rng = random.Random(seed)
+        self.pks = list(CvContent.objects.order_by('pk').values_list('pk', flat=True)[:10000])
+        self.num_pages = max(1, -(-count // PAGE_SIZE))
+
+    def get(self, path, **params):
+        response = self.client.get(path, params)
+        if response.status_code != 200:
+            raise AssertionError(f'GET {path} {params} returned {response.status_code}.')
+        return response
+
+
+def clear_cache(context):
+    cache.get_cache().clear()
+
+
+def insert_cvs(context):
+    result = data.create_cvs(INSERT_BATCH, start=context.count, batch_size=INSERT_BATCH)
+    if result.created != INSERT_BATCH:
+        raise AssertionError(f'Imported {result.created} of {INSERT_BATCH} CVs: {result.errors[:3]}')
+
+
+def insert_users(context):
+    data.create_users(INSERT_BATCH, start=context.count, batch_size=INSERT_BATCH)
+
+
+def list_first_page(context):
+    context.get('/cv/', per_page=PAGE_SIZE)
+
+
+def list_deep_page(context):
+    context.get('/cv/', page=context.num_pages - context.rng.randrange(10), per_page=PAGE_SIZE)
+
+
+def detail(context):
+    context.get(f'/cv/{context.rng.choice(context.pks)}/')
+
+
+def detail_cached(context):
+    # Cached by the warmup runs.
+    context.get(f'/cv/{context.pks[0]}/')
+
+
+def filter_location(context):
+    context.get('/cv/', location=context.rng.choice(data.LOCATIONS), page=context.rng.randint(1, 10))
+
+
+def filter_skills(context):
+    context.get('/cv/', skills=','.join(context.rng.sample(data.SKILLS, 2)))
+
+
+def search(context):
+    context.get('/cv/search/', q=f'{context.rng.choice(data.SKILLS)} {context.rng.choice(data.TITLES).split()[0]}')
+
+
+def summaries(context):
+    context.get('/cv/summaries/', location=context.rng.choice(data.LOCATIONS), page=context.rng.randint(1, 10))
+
+
+def login(context):
+    client = Client()
+    if not client.login(email=data.email(context.rng.randrange(context.count)), password=data.PASSWORD):
+        raise AssertionError('Login failed.')
+
+
+# Bulk insert budgets hold on SQLite, whose bound parameter limit splits inserts in the most batches.
+SCENARIOS = [
+    Scenario('insert_cvs', insert_cvs, max_queries=235, rollback=True, repeat=3),
+    Scenario('insert_users', insert_users, max_queries=11, rollback=True, repeat=3),
+    # The CV views include two queries loading the session and the staff user.
+    Scenario('list_first_page', list_first_page, max_queries=8, setup=clear_cache),
+    Scenario('list_deep_page', list_deep_page, max_queries=8, setup=clear_cache),
+    Scenario('detail', detail, max_queries=6, setup=clear_cache),
+    Scenario('detail_cached', detail_cached, max_queries=2),
+    Scenario('filter_location', filter_location, max_queries=8, setup=clear_cache),
+    Scenario('filter_skills', filter_skills, max_queries=8, setup=clear_cache),
+    Scenario('search', search, max_queries=8, setup=clear_cache),
+    Scenario('summaries', summaries, max_queries=4),
+    Scenario('login', login, max_queries=13, repeat=5),
+]
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run_scenario(scenario, context, repeat):
+    timings = []
+    queries = 0
+    for iteration in range(-WARMUP, scenario.repeat or repeat):
+        if scenario.setup is not None:
+            scenario.setup(context)
+        with ExitStack() as stack:
+            if scenario.rollback:
+                stack.enter_context(transaction.atomic())
+            captured = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+            started = time.perf_counter()
+            scenario.run(context)
+            elapsed = time.perf_counter() - started
+            if scenario.rollback:
+                transaction.set_rollback(True)
+        if iteration >= 0:
+            timings.append(elapsed * 1000)
+            queries = max(queries, sum(len(capture) for capture in captured))
+    return {
+        'repeat': len(timings),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': queries,
+        'max_queries': scenario.max_queries,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_scale(value):
+    if value.lower() in data.SCALES:
+        return data.SCALES[value.lower()]
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Expected one of {", ".join(data.SCALES)} or a number of CVs.') from None
+
+
+def use_scratch_database(label):
+    settings_dict = connections['default'].settings_dict
+    if settings_dict['ENGINE'] == 'django.db.backends.sqlite3':
+        name = os.path.join(tempfile.gettempdir(), f'joinit-benchmark-{label}.sqlite3')
+    else:
+        name = f'joinit_benchmark_{label}'
+    settings_dict.setdefault('TEST', {})['NAME'] = name
+
+
+def populate(count, seed):
+    existing = CvContent.objects.count()
+    if existing == count:
+        print(f'reusing {count} CVs', file=sys.stderr)
+        return
+    if existing:
+        sys.exit(f'The benchmark database holds {existing} CVs instead of {count}; run once without --keepdb.')
+    started = time.monotonic()
+
+    def progress(result):
+        print(f'\rgenerated {result.processed} of {count} CVs', end='', file=sys.stderr)
+
+    data.generate(count, seed=seed, progress=progress)
+    print(f'\rgenerated {count} users and CVs in {time.monotonic() - started:.0f} s', file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', type=parse_scale, default=data.SCALES['10k'])
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-k', '--scenario', action='append', choices=[s.name for s in SCENARIOS], dest='scenarios')
+    parser.add_argument('-o', '--output', help='Write the results as JSON to this file.')
+    parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database for the next run.')
+    args = parser.parse_args()
+
+    label = next((name for name, count in data.SCALES.items() if count == args.scale), str(args.scale))
+    setup_test_environment(debug=False)
+    use_scratch_database(label)
+    old_config = setup_databases(verbosity=0, interactive=False, keepdb=args.keepdb)
+    try:
+        populate(args.scale, args.seed)
+        context = Context(args.scale, args.seed)
+        results = {}
+        for scenario in SCENARIOS:
+            if args.scenarios and scenario.name not in args.scenarios:
+                continue
+            result = results[scenario.name] = run_scenario(scenario, context, args.repeat)
+            over = result['queries'] > result['max_queries']
+            print(
+                f'{scenario.name:<16} median {result["median_ms"]:>9.2f} ms  p95 {result["p95_ms"]:>9.2f} ms  '
+                f'queries {result["queries"]:>3}/{result["max_queries"]}{"  OVER BUDGET" if over else ""}'
+            )
+        vendor = connections['default'].vendor
+    finally:
+        teardown_databases(old_config, verbosity=0, keepdb=args.keepdb)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'scale': label,
+            'cvs': args.scale,
+            'seed': args.seed,
+            'database': vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'scenarios': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+            file.write('\n')
+    over_budget = [name for name, result in results.items() if result['queries'] > result['max_queries']]
+    if over_budget:
+        sys.exit(f'Query budget exceeded by: {", ".join(over_budget)}')
+
+
+if __name__ == '__main__':
+    main()
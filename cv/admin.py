@@ -1,3 +1,74 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
 
-# Register your models here.
+from cv.models import CvContent
+from cv.pagination import InvalidCursor, KeysetPaginator
+
+CURSOR_VAR = 'cursor'
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Change list paginated by cv.pagination.KeysetPaginator in the admin's keyset_ordering.
+
+    Sorting by a column or "Show all" fall back to Django's offset pagination.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR, '')
+        self.keyset_page = None
+        super().__init__(request, *args, **kwargs)
+        # Filter, search and sort links start over from the first page.
+        self.params.pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        if ORDER_VAR in self.params or self.show_all:
+            return super().get_results(request)
+        paginator = KeysetPaginator(self.queryset, self.model_admin.keyset_ordering, self.list_per_page)
+        try:
+            self.keyset_page = paginator.page(self.cursor)
+        except InvalidCursor:
+            raise IncorrectLookupParameters
+        self.result_count = self.queryset.count()
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.full_result_count = self.root_queryset.count() if self.show_full_result_count else None
+        self.show_admin_actions = not self.show_full_result_count or bool(self.full_result_count)
+        self.result_list = self.keyset_page.object_list
+        self.can_show_all = self.result_count <= self.list_max_show_all
+        self.multi_page = self.keyset_page.has_next or self.keyset_page.has_previous
+        self.paginator = None
+
+    @property
+    def next_page_url(self):
+        return self.get_query_string({CURSOR_VAR: self.keyset_page.next_cursor})
+
+    @property
+    def previous_page_url(self):
+        return self.get_query_string({CURSOR_VAR: self.keyset_page.previous_cursor})
+
+
+class KeysetPaginationMixin:
+    """Paginate the change list of a ModelAdmin without list_editable by keyset, in ``keyset_ordering``."""
+
+    keyset_ordering = ('-pk',)
+    change_list_template = 'admin/keyset_change_list.html'
+    # Counting the unfiltered rows costs a second full count per page.
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+@admin.register(CvContent)
+class CvContentAdmin(KeysetPaginationMixin, admin.ModelAdmin):
+    list_display = ('id', 'first_name', 'last_name', 'email', 'title', 'location')
+    list_select_related = ('user',)
+    search_fields = ('email', 'last_name')
+    ordering = ('-pk',)
+    raw_id_fields = ('user',)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CvConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cv'
+
+    def ready(self):
+        from cv import cache, signals  # noqa: F401
+        from joinit import metrics
+
+        metrics.register_collector(cache.collect_metrics)
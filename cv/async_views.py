@@ -0,0 +1,90 @@
+"""
+ASGI-native versions of the CV list, detail and search views.
+
+They use the async queryset and cache APIs end to end, so under an ASGI server
+a request does not tie up a worker thread for its whole duration. They run the
+same queries as the sync views, one after another: Django runs each async query
+in a single shared thread, so gathering them would not overlap them. CVs missing
+from the cache cost four queries, like CvContent.objects.with_sections(). Like
+their sync versions, they are staff only.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.core.paginator import Paginator
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
+from django.urls import reverse
+
+from cv import cache, search
+from cv.pagination import InvalidCursor
+from cv.views import (
+    MAX_PAGE_SIZE, PAGE_SIZE, _cursor_response, _cv_keyset_paginator, _filter_cvs, _int_param, _invalid_cursor,
+    _list_response, _search_params, _search_response,
+)
+
+
+def require_GET(view):
+    """Coroutine version of django.views.decorators.http.require_GET, which only wraps sync views in Django 4.1."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return HttpResponseNotAllowed(['GET'])
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def _is_staff(user):
+    return user.is_active and user.is_staff
+
+
+def staff_member_required(view):
+    """Coroutine version of django.contrib.admin.views.decorators.staff_member_required."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # request.user is loaded lazily from the session, with sync queries.
+        if not await sync_to_async(_is_staff)(request.user):
+            return redirect_to_login(request.get_full_path(), reverse('admin:login'))
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _page_cvs(pks_queryset):
+    pks = [pk async for pk in pks_queryset]
+    return pks, await cache.aget_serialized_cvs(pks)
+
+
+@staff_member_required
+@require_GET
+async def cv_list(request):
+    if 'cursor' in request.GET:
+        try:
+            page = await _cv_keyset_paginator(request).apage(request.GET['cursor'])
+        except InvalidCursor as exc:
+            return _invalid_cursor(exc)
+        serialized = await cache.aget_serialized_cvs(page.object_list)
+        return _cursor_response(page, [serialized[pk] for pk in page if pk in serialized])
+    cvs = _filter_cvs(request)
+    paginator = Paginator(cvs, _int_param(request, 'per_page', PAGE_SIZE, MAX_PAGE_SIZE))
+    # Counting is the only query Paginator runs itself; the page is sliced lazily.
+    paginator.count = await cvs.acount()
+    page = paginator.get_page(_int_param(request, 'page', 1))
+    pks, serialized = await _page_cvs(page.object_list)
+    page.object_list = pks
+    return _list_response(page, serialized)
+
+
+@staff_member_required
+@require_GET
+async def cv_detail(request, pk):
+    data = await cache.aget_serialized_cv(pk)
+    if data is None:
+        raise Http404('CV not found.')
+    return JsonResponse(data)
+
+
+@staff_member_required
+@require_GET
+async def search_cvs(request):
+    params = _search_params(request)
+    return _search_response(params['query'], await search.asearch(**params))
@@ -0,0 +1,168 @@
+"""
+Cache of serialized CVs.
+
+Entries are keyed by CV id and a per-CV version number. Invalidating a CV bumps
+its version instead of deleting entries, so a stale value can never be read
+back, even if it is still in the cache; it simply ages out. The signal handlers in
+cv.signals invalidate a CV whenever it or one of its sections changes; the only
+user data it holds is user_id, and deleting a user deletes its CVs.
+
+The version numbers live in the cache itself, so every process must share it.
+With the default per-process local-memory cache, a change made in one worker
+only invalidates that worker's entries and the others keep serving the old CV
+until CV_CACHE_TIMEOUT: multi-worker deployments need a shared backend, such as
+Redis or Memcached, through CACHE_URL or CV_CACHE_ALIAS.
+
+Misses are loaded from the primary database. A miss usually follows an
+invalidation, and a read replica that has not caught up with the change yet
+would store the old CV under the new version until CV_CACHE_TIMEOUT.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from cv.models import CvContent
+from cv.serializers import serialize_cv
+from joinit.routers import use_primary
+
+
+class CacheStats:
+    """Per-process hit and miss counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hits=0, misses=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+stats = CacheStats()
+
+
+def collect_metrics():
+    """Export the cache statistics through joinit.metrics."""
+    yield 'joinit_cv_cache_requests_total', 'counter', 'Serialized CV cache lookups by result.', [
+        ({'result': 'hit'}, stats.hits),
+        ({'result': 'miss'}, stats.misses),
+    ]
+
+
+def get_cache():
+    return caches[settings.CV_CACHE_ALIAS]
+
+
+def _version_key(pk):
+    return f'cv:{pk}:version'
+
+
+def _data_key(pk, version):
+    return f'cv:{pk}:v{version}'
+
+
+def _new_version():
+    # Start from the clock rather than 1 so an evicted version key cannot be
+    # re-created with a number that older, still cached entries were stored under.
+    return time.time_ns() // 1000
+
+
+def _fill_versions(pks, versions):
+    """Return (pk -> version, new version entries to store) for the versions found in the cache."""
+    result = {}
+    missing = {}
+    for pk in pks:
+        version = versions.get(_version_key(pk))
+        if version is None:
+            version = missing[_version_key(pk)] = _new_version()
+        result[pk] = version
+    return result, missing
+
+
+def get_versions(pks):
+    cache = get_cache()
+    result, missing = _fill_versions(pks, cache.get_many([_version_key(pk) for pk in pks]))
+    if missing:
+        cache.set_many(missing, timeout=None)
+    return result
+
+
+async def aget_versions(pks):
+    cache = get_cache()
+    result, missing = _fill_versions(pks, await cache.aget_many([_version_key(pk) for pk in pks]))
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+    return result
+
+
+def invalidate(pks):
+    cache = get_cache()
+    for pk in pks:
+        try:
+            cache.incr(_version_key(pk))
+        except ValueError:
+            # Nothing has been cached for this CV under a known version.
+            pass
+
+
+def load_cvs(pks):
+    with use_primary():
+        return CvContent.objects.with_sections().in_bulk(pks)
+
+
+def get_serialized_cvs(pks):
+    """Return a mapping of pk -> serialized CV for the existing CVs among ``pks``."""
+    cache = get_cache()
+    versions = get_versions(pks)
+    keys = {pk: _data_key(pk, version) for pk, version in versions.items()}
+    cached = cache.get_many(keys.values())
+    result = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    missing = [pk for pk in pks if pk not in result]
+    stats.record(hits=len(result), misses=len(missing))
+    if missing:
+        loaded = {pk: serialize_cv(cv) for pk, cv in load_cvs(missing).items()}
+        cache.set_many({keys[pk]: data for pk, data in loaded.items()}, timeout=settings.CV_CACHE_TIMEOUT)
+        result.update(loaded)
+    return result
+
+
+def get_serialized_cv(pk):
+    return get_serialized_cvs([pk]).get(pk)
+
+
+async def aget_serialized_cvs(pks):
+    """Async version of get_serialized_cvs()."""
+    cache = get_cache()
+    versions = await aget_versions(pks)
+    keys = {pk: _data_key(pk, version) for pk, version in versions.items()}
+    cached = await cache.aget_many(keys.values())
+    result = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    missing = [pk for pk in pks if pk not in result]
+    stats.record(hits=len(result), misses=len(missing))
+    if missing:
+        with use_primary():
+            loaded = {
+                cv.pk: serialize_cv(cv)
+                async for cv in CvContent.objects.with_sections().filter(pk__in=missing)
+            }
+        await cache.aset_many({keys[pk]: data for pk, data in loaded.items()}, timeout=settings.CV_CACHE_TIMEOUT)
+        result.update(loaded)
+    return result
+
+
+async def aget_serialized_cv(pk):
+    return (await aget_serialized_cvs([pk])).get(pk)
@@ -0,0 +1,35 @@
+"""Work experience arithmetic shared by cv.summaries and cv.matching."""
+import numpy as np
+
+
+def job_span(start_date, end_date, currently_working, today):
+    """Return the (start, end) day ordinals of a job, or None when its start is unknown."""
+    if start_date is None:
+        return None
+    end_date = today if currently_working else end_date or start_date
+    return start_date.toordinal(), end_date.toordinal()
+
+
+def experience_days(rows, cv_ids, starts, ends):
+    """
+    Sum the work experience of each row in days, counting overlapping jobs once.
+
+    ``cv_ids``, ``starts`` and ``ends`` describe one job each, with dates as day
+    ordinals; ``rows`` is the number of rows of the result and ``cv_ids`` index it.
+    """
+    days = np.zeros(rows, dtype=np.int64)
+    if not len(cv_ids):
+        return days
+    order = np.lexsort((starts, cv_ids))
+    cv_ids, starts, ends = cv_ids[order], starts[order], np.maximum(ends[order], starts[order])
+    # Offset every CV's dates past the previous CV's so a running maximum restarts at each CV.
+    offset = cv_ids * (int(ends.max()) + 1)
+    reach = np.maximum.accumulate(ends + offset) - offset
+    covered_until = np.empty_like(reach)
+    covered_until[0] = 0
+    covered_until[1:] = reach[:-1]
+    first = np.ones(len(cv_ids), dtype=bool)
+    first[1:] = cv_ids[1:] != cv_ids[:-1]
+    covered_until[first] = 0
+    np.add.at(days, cv_ids, np.maximum(ends - np.maximum(starts, covered_until), 0))
+    return days
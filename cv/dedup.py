@@ -0,0 +1,223 @@
+"""
+Detection of CVs that describe the same candidate.
+
+Comparing every pair of CVs does not scale, so every CV gets a few blocking
+keys (CvBlockingKey rows) that duplicates are likely to share even when the
+CVs differ slightly: its LinkedIn and GitHub handles, the local part of its
+email and a phonetic key of its name. Only CVs sharing a key are scored
+against each other, with fuzzy name similarity and the identifiers they have
+in common. Keys are kept up to date by the signal handlers in cv.signals.
+"""
+import difflib
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from django.db import transaction
+from django.db.models import Count
+
+from cv.models import CvBlockingKey, CvContent
+
+KEY_FIELDS = ['first_name', 'last_name', 'email', 'linkedin_url', 'github_url']
+
+# Keys shared by more CVs than this are too common to tell candidates apart (think "J500:john") and are skipped.
+MAX_BLOCK_SIZE = 200
+MIN_SCORE = 0.8
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+
+def fold(text):
+    """Lower-case ``text`` and strip accents and everything but letters, digits and spaces."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).casefold()
+    return ' '.join(re.sub(r'[^\w ]|_', ' ', text).split())
+
+
+def soundex(name):
+    letters = [char for char in fold(name) if 'a' <= char <= 'z']
+    if not letters:
+        return ''
+    code = letters[0]
+    previous = SOUNDEX_CODES.get(letters[0])
+    for char in letters[1:]:
+        digit = SOUNDEX_CODES.get(char)
+        if digit and digit != previous:
+            code += digit
+        if char not in 'hw':
+            previous = digit
+    return (code + '000')[:4]
+
+
+def url_handle(url, host):
+    """Return the profile handle of a LinkedIn (``/in/<handle>``) or GitHub (``/<handle>``) URL on ``host``."""
+    if not url:
+        return ''
+    parts = urlsplit(url if '//' in url else f'//{url}')
+    if not (parts.hostname or '').endswith(host):
+        return ''
+    segments = [segment for segment in parts.path.split('/') if segment]
+    if host == 'linkedin.com':
+        segments = segments[1:2] if segments[:1] in (['in'], ['pub']) else []
+    return fold(segments[0]).replace(' ', '') if segments else ''
+
+
+def email_local_part(email):
+    local, at, _ = (email or '').rpartition('@')
+    if not at:
+        return ''
+    # Sub-addresses and dots usually reach the same mailbox.
+    return fold(local.split('+')[0]).replace(' ', '')
+
+
+def blocking_keys(cv):
+    keys = set()
+    for prefix, handle in (
+        ('li', url_handle(cv.linkedin_url, 'linkedin.com')),
+        ('gh', url_handle(cv.github_url, 'github.com')),
+        ('em', email_local_part(cv.email)),
+    ):
+        if handle:
+            keys.add(f'{prefix}:{handle}')
+    first, last = fold(cv.first_name), fold(cv.last_name)
+    if first and last:
+        # Both name orders, as first and last name are often swapped.
+        keys.add(f'nm:{soundex(last)}:{first[0]}')
+        keys.add(f'nm:{soundex(first)}:{last[0]}')
+    max_length = CvBlockingKey._meta.get_field('key').max_length
+    return {key[:max_length] for key in keys}
+
+
+def index_cvs(cvs):
+    """Replace the blocking keys of the given CVs with those of their stored, locked rows."""
+    pks = [cv.pk for cv in cvs if cv.pk is not None]
+    if not pks:
+        return
+    with transaction.atomic():
+        cvs = CvContent.objects.filter(pk__in=pks).lock(*KEY_FIELDS)
+        CvBlockingKey.objects.filter(cv_id__in=pks).delete()
+        CvBlockingKey.objects.bulk_create(
+            [CvBlockingKey(cv_id=cv.pk, key=key) for cv in cvs for key in blocking_keys(cv)],
+            batch_size=1000,
+        )
+
+
+def index_cv(cv):
+    index_cvs([cv])
+
+
+def rebuild_keys(batch_size=1000, progress=None):
+    """Recompute the blocking keys of every CV in batches of ``batch_size`` CVs."""
+    queryset = CvContent.objects.only('pk').order_by('pk')
+    indexed = 0
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        index_cvs(batch)
+        indexed += len(batch)
+        last_pk = batch[-1].pk
+        if progress is not None:
+            progress(indexed)
+    return indexed
+
+
+@dataclass
+class Candidate:
+    """Two CVs that probably describe the same candidate; ``cv_id`` is the lower id of the two."""
+    cv_id: int
+    other_id: int
+    score: float
+    keys: list
+
+    def as_dict(self):
+        return {'cv_id': self.cv_id, 'other_id': self.other_id, 'score': round(self.score, 4), 'keys': self.keys}
+
+
+def name_similarity(a, b):
+    """Similarity in [0, 1] of two CVs' full names, ignoring accents, case and name order."""
+    names = [fold(f'{cv.first_name or ""} {cv.last_name or ""}') for cv in (a, b)]
+    if not all(names):
+        return 0.0
+    ordered = difflib.SequenceMatcher(None, *names).ratio()
+    unordered = difflib.SequenceMatcher(None, *(' '.join(sorted(name.split())) for name in names)).ratio()
+    return max(ordered, unordered)
+
+
+def score_pair(a, b):
+    """Score in [0, 1] of how likely CVs ``a`` and ``b`` describe the same candidate."""
+    names = name_similarity(a, b)
+    profiles = [
+        (url_handle(a.linkedin_url, 'linkedin.com'), url_handle(b.linkedin_url, 'linkedin.com')),
+        (url_handle(a.github_url, 'github.com'), url_handle(b.github_url, 'github.com')),
+    ]
+    same = any(x and x == y for x, y in [*profiles, (fold(a.email), fold(b.email))])
+    # Candidates often use several addresses, but rarely several profiles on the same site.
+    conflicting = any(x and y and x != y for x, y in profiles)
+    if same:
+        score = 0.9 + 0.1 * names
+    elif email_local_part(a.email) and email_local_part(a.email) == email_local_part(b.email):
+        score = 0.5 + 0.5 * names
+    else:
+        score = 0.8 * names
+    return score / 2 if conflicting and not same else score
+
+
+def find_candidates(cv_ids, min_score=MIN_SCORE, max_block_size=MAX_BLOCK_SIZE):
+    """
+    Return the candidates pairing a CV in ``cv_ids`` with a CV of a higher id, best first.
+
+    Running this over consecutive pk ranges finds every candidate pair exactly once.
+    """
+    cv_ids = set(cv_ids)
+    keys = CvBlockingKey.objects.filter(cv_id__in=cv_ids).values('key')
+    oversized = (
+        CvBlockingKey.objects.filter(key__in=keys).values('key')
+        .annotate(size=Count('cv_id')).filter(size__gt=max_block_size).values('key')
+    )
+    blocks = defaultdict(list)
+    for key, cv_id in (
+        CvBlockingKey.objects.filter(key__in=keys).exclude(key__in=oversized).order_by().values_list('key', 'cv_id')
+    ):
+        blocks[key].append(cv_id)
+
+    pairs = defaultdict(list)
+    for key, members in blocks.items():
+        for cv_id in members:
+            if cv_id in cv_ids:
+                for other_id in members:
+                    if other_id > cv_id:
+                        pairs[cv_id, other_id].append(key)
+    if not pairs:
+        return []
+
+    cvs = CvContent.objects.only('pk', *KEY_FIELDS).in_bulk({pk for pair in pairs for pk in pair})
+    candidates = []
+    for (cv_id, other_id), shared in pairs.items():
+        if cv_id in cvs and other_id in cvs:
+            score = score_pair(cvs[cv_id], cvs[other_id])
+            if score >= min_score:
+                candidates.append(Candidate(cv_id, other_id, score, sorted(shared)))
+    candidates.sort(key=lambda candidate: (-candidate.score, candidate.cv_id, candidate.other_id))
+    return candidates
+
+
+def iter_candidates(after=0, batch_size=1000, min_score=MIN_SCORE, max_block_size=MAX_BLOCK_SIZE):
+    """
+    Yield (last_pk, candidates) per batch of ``batch_size`` CVs with a pk greater than ``after``.
+
+    Passing the last yielded ``last_pk`` as ``after`` resumes the scan after that batch.
+    """
+    queryset = CvContent.objects.order_by('pk').values_list('pk', flat=True)
+    while True:
+        batch = list(queryset.filter(pk__gt=after)[:batch_size])
+        if not batch:
+            return
+        after = batch[-1]
+        yield after, find_candidates(batch, min_score=min_score, max_block_size=max_block_size)
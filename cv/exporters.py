@@ -0,0 +1,146 @@
+"""
+Streaming CV export.
+
+CVs are read in keyset-paginated chunks (``pk > last_pk``) with their user
+joined in and their sections prefetched for the whole chunk, so every chunk
+costs four queries and only one chunk is held in memory at a time. Writers
+yield text pieces that can be fed to a file or to a StreamingHttpResponse.
+"""
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from cv.models import CvContent
+from cv.serializers import CV_FIELDS, SECTION_FIELDS, serialize_cv
+
+FORMATS = ('ndjson', 'csv', 'json-resume')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'json-resume': 'application/json',
+}
+FILE_EXTENSIONS = {
+    'ndjson': 'ndjson',
+    'csv': 'csv',
+    'json-resume': 'json',
+}
+# Matches the column layout accepted by cv.importers; sections are JSON encoded lists.
+CSV_COLUMNS = ['id', 'user_id', *CV_FIELDS, *SECTION_FIELDS]
+
+
+def iter_cvs(queryset=None, chunk_size=1000):
+    """Yield CVs with their sections ordered by pk, fetching ``chunk_size`` of them at a time."""
+    if queryset is None:
+        queryset = CvContent.objects.all()
+    queryset = queryset.with_sections().order_by('pk')
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last_pk = chunk[-1].pk
+
+
+def _dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def write_ndjson(cvs):
+    for cv in cvs:
+        yield _dumps(serialize_cv(cv)) + '\n'
+
+
+def write_csv(cvs):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_COLUMNS)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writeheader()
+    yield flush()
+    for cv in cvs:
+        data = serialize_cv(cv)
+        for section in SECTION_FIELDS:
+            data[section] = _dumps(data[section])
+        writer.writerow(data)
+        yield flush()
+
+
+def to_json_resume(cv):
+    """Map a CV to the JSON Resume schema (https://jsonresume.org/schema/)."""
+    data = serialize_cv(cv)
+    profiles = [
+        {'network': network, 'url': data[field]}
+        for network, field in (('LinkedIn', 'linkedin_url'), ('GitHub', 'github_url'))
+        if data[field]
+    ]
+    return {
+        'basics': {
+            'name': ' '.join(filter(None, (data['first_name'], data['last_name']))),
+            'label': data['title'],
+            'email': data['email'],
+            'summary': data['summary'],
+            'location': {'address': data['location']} if data['location'] else {},
+            'profiles': profiles,
+        },
+        'work': [
+            {
+                'name': work['company'],
+                'position': work['title'],
+                'startDate': work['start_date'],
+                'endDate': None if work['currently_working'] else work['end_date'],
+            }
+            for work in data['work_experiences']
+        ],
+        'education': [
+            {
+                'institution': education['school'],
+                'area': education['field_of_study'],
+                'studyType': education['degree'],
+                'startDate': education['start_date'],
+                'endDate': education['end_date'],
+            }
+            for education in data['educations']
+        ],
+        'certificates': [
+            {
+                'name': certificate['name'],
+                'issuer': certificate['organisation'],
+                'date': certificate['issue_date'],
+                'url': certificate['credential_url'],
+            }
+            for certificate in data['certificates']
+        ],
+        'skills': [{'name': name.strip()} for name in data['skills'].split(',') if name.strip()],
+        'meta': {'id': data['id']},
+    }
+
+
+def write_json_resume(cvs):
+    """Write a JSON array of JSON Resume documents, one array item at a time."""
+    separator = '['
+    for cv in cvs:
+        yield separator + _dumps(to_json_resume(cv))
+        separator = ',\n'
+    yield '[]\n' if separator == '[' else ']\n'
+
+
+WRITERS = {
+    'ndjson': write_ndjson,
+    'csv': write_csv,
+    'json-resume': write_json_resume,
+}
+
+
+def export_cvs(format='ndjson', queryset=None, chunk_size=1000):
+    """Return a generator of text pieces with every CV in ``queryset`` in the given format."""
+    if format not in WRITERS:
+        raise ValueError(f'Unsupported export format {format!r}, expected one of {", ".join(FORMATS)}.')
+    return WRITERS[format](iter_cvs(queryset, chunk_size=chunk_size))
@@ -0,0 +1,253 @@
+"""
+CV change history.
+
+Every committed change of a CV or of its sections appends a CvRevision. The
+state of a CV is its CV_FIELDS and user_id and, per section kind, its sections
+by id, as JSON values. A revision stores either that whole state (a checkpoint)
+or only what changed since the previous revision (a delta): the changed fields
+of the CV and of each changed section, and None for a deleted section. The
+summary, usually the largest field, is thus only stored again when it changes.
+
+Every CV_HISTORY_CHECKPOINT_INTERVAL revisions the next one is a checkpoint, so
+reconstructing any version replays at most that many revisions, read with one
+query. Deleting a CV appends a deletion revision; the history outlives the CV
+until compact() purges it.
+
+Revisions are recorded once the transaction commits, from the committed rows,
+so a transaction changing a CV and several sections appends a single revision.
+compact() keeps one revision per ``granularity`` seconds of old history and
+rewrites the revisions it keeps with regularly spaced checkpoints.
+"""
+import datetime
+from dataclasses import dataclass, field
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from cv.models import Certificate, CvContent, CvRevision, Education, WorkExperience
+from cv.serializers import CV_FIELDS, SECTION_FIELDS
+
+SECTION_MODELS = {
+    'educations': Education,
+    'work_experiences': WorkExperience,
+    'certificates': Certificate,
+}
+STATE_CV_FIELDS = ('user_id', *CV_FIELDS)
+FULL_KINDS = (CvRevision.CHECKPOINT, CvRevision.DELETION)
+
+
+def _json(value):
+    return value.isoformat() if isinstance(value, (datetime.date, datetime.datetime)) else value
+
+
+def load_states(pks):
+    """Return the current state of the CVs in ``pks`` by pk; deleted CVs are left out."""
+    states = {}
+    for row in CvContent.objects.filter(pk__in=pks).order_by('pk').values('pk', *STATE_CV_FIELDS):
+        pk = row.pop('pk')
+        states[pk] = {
+            'cv': {name: _json(value) for name, value in row.items()},
+            **{name: {} for name in SECTION_MODELS},
+        }
+    for name, model in SECTION_MODELS.items():
+        for row in model.objects.filter(cv_id__in=states).order_by('pk').values('pk', 'cv_id', *SECTION_FIELDS[name]):
+            pk, cv_id = row.pop('pk'), row.pop('cv_id')
+            # JSON object keys are strings.
+            states[cv_id][name][str(pk)] = {key: _json(value) for key, value in row.items()}
+    return states
+
+
+def diff(old, new):
+    """Return the delta from state ``old`` to state ``new``, empty when they are equal."""
+    delta = {}
+    changed = {name: value for name, value in new['cv'].items() if name not in old['cv'] or old['cv'][name] != value}
+    if changed:
+        delta['cv'] = changed
+    for name in SECTION_MODELS:
+        before, after = old.get(name, {}), new[name]
+        sections = {pk: None for pk in before.keys() - after.keys()}
+        for pk, fields in after.items():
+            previous = before.get(pk, {})
+            changed = {key: value for key, value in fields.items() if key not in previous or previous[key] != value}
+            if changed:
+                sections[pk] = changed
+        if sections:
+            delta[name] = sections
+    return delta
+
+
+def apply(state, delta):
+    """Return ``state`` with ``delta`` applied; neither is modified."""
+    state = {**state, 'cv': {**state['cv'], **delta.get('cv', {})}}
+    for name in SECTION_MODELS:
+        if name in delta:
+            sections = dict(state.get(name, {}))
+            for pk, fields in delta[name].items():
+                if fields is None:
+                    sections.pop(pk, None)
+                else:
+                    sections[pk] = {**sections.get(pk, {}), **fields}
+            state[name] = sections
+    return state
+
+
+def replay(revisions):
+    """Return the state after ``revisions``, which start with a checkpoint or deletion; None for a deleted CV."""
+    state = None
+    for revision in revisions:
+        if revision.kind == CvRevision.DELTA:
+            state = apply(state, revision.data)
+        else:
+            state = revision.data if revision.kind == CvRevision.CHECKPOINT else None
+    return state
+
+
+def _chains(revisions):
+    """Revisions from the latest checkpoint or deletion of each CV on, grouped by CV."""
+    latest_full = revisions.filter(cv_id=OuterRef('cv_id'), kind__in=FULL_KINDS).order_by('-number').values('number')
+    chains = revisions.filter(number__gte=Subquery(latest_full[:1])).order_by('cv_id', 'number')
+    return {cv_id: list(chain) for cv_id, chain in groupby(chains, key=lambda revision: revision.cv_id)}
+
+
+def _revision(cv_id, number, previous, previous_count, state, created_at):
+    """Return the unsaved revision leading from ``previous`` to ``state``, or None when nothing changed."""
+    if state is None:
+        return None if previous is None else CvRevision(
+            cv_id=cv_id, number=number, kind=CvRevision.DELETION, data={}, created_at=created_at,
+        )
+    if previous is None or previous_count >= settings.CV_HISTORY_CHECKPOINT_INTERVAL:
+        return CvRevision(cv_id=cv_id, number=number, kind=CvRevision.CHECKPOINT, data=state, created_at=created_at)
+    delta = diff(previous, state)
+    if not delta:
+        return None
+    return CvRevision(cv_id=cv_id, number=number, kind=CvRevision.DELTA, data=delta, created_at=created_at)
+
+
+@transaction.atomic
+def record_cvs(pks):
+    """Append a revision for every CV in ``pks`` that changed, or was deleted, since its latest revision."""
+    pks = set(pks)
+    if not pks:
+        return []
+    # Serializes recording the same CV in concurrent transactions.
+    CvContent.objects.filter(pk__in=pks).lock()
+    states = load_states(pks)
+    chains = _chains(CvRevision.objects.filter(cv_id__in=pks))
+    now = timezone.now()
+    revisions = []
+    for pk in sorted(pks):
+        chain = chains.get(pk, [])
+        revision = _revision(
+            pk, chain[-1].number + 1 if chain else 1, replay(chain), len(chain), states.get(pk), now,
+        )
+        if revision is not None:
+            revisions.append(revision)
+    return CvRevision.objects.bulk_create(revisions)
+
+
+def record_cv(pk):
+    return record_cvs([pk])
+
+
+def materialize(pk, state):
+    """Return ``state`` of CV ``pk`` in the format of cv.serializers.serialize_cv()."""
+    data = {'id': pk, **{name: state['cv'].get(name) for name in STATE_CV_FIELDS}}
+    for name, fields in SECTION_FIELDS.items():
+        sections = sorted(state.get(name, {}).items(), key=lambda item: int(item[0]))
+        data[name] = [
+            {'id': int(section_pk), **{key: values.get(key) for key in fields}} for section_pk, values in sections
+        ]
+    return data
+
+
+def as_of(pk, when):
+    """
+    Return CV ``pk`` as it was at ``when``, in the format of cv.serializers.serialize_cv().
+
+    Returns None when the CV did not exist at that time, or its history does not go back that far.
+    """
+    chain = _chains(CvRevision.objects.filter(cv_id=pk, created_at__lte=when)).get(pk)
+    state = replay(chain) if chain else None
+    return None if state is None else materialize(pk, state)
+
+
+def encode(cv_id, versions):
+    """Return unsaved revisions, numbered from 1, for a list of (created_at, state) versions of a CV."""
+    revisions = []
+    previous, count = None, 0
+    for created_at, state in versions:
+        revision = _revision(cv_id, len(revisions) + 1, previous, count, state, created_at)
+        if revision is None:
+            continue
+        revisions.append(revision)
+        previous, count = state, 1 if revision.kind in FULL_KINDS else count + 1
+    return revisions
+
+
+@dataclass
+class CompactResult:
+    cvs: int = 0
+    revisions_before: int = 0
+    revisions_after: int = 0
+    # Ids of deleted CVs whose history was purged.
+    purged: list = field(default_factory=list)
+
+
+def _compact_cv(cv_id, before, granularity, purge_deleted, result):
+    # Locks the CV while its history is rewritten, unless it is deleted.
+    CvContent.objects.filter(pk=cv_id).lock()
+    revisions = list(CvRevision.objects.filter(cv_id=cv_id).order_by('number'))
+    if not revisions:
+        return
+    if purge_deleted and revisions[-1].kind == CvRevision.DELETION and revisions[-1].created_at < before:
+        CvRevision.objects.filter(cv_id=cv_id).delete()
+        result.cvs += 1
+        result.revisions_before += len(revisions)
+        result.purged.append(cv_id)
+        return
+
+    def period(revision):
+        return int(revision.created_at.timestamp() // granularity)
+
+    versions, state = [], None
+    for revision, following in zip(revisions, [*revisions[1:], None]):
+        state = apply(state, revision.data) if revision.kind == CvRevision.DELTA else replay([revision])
+        # An old revision is superseded by the next one within the same period.
+        if following is not None and following.created_at < before and period(following) == period(revision):
+            continue
+        versions.append((revision.created_at, state))
+    compacted = encode(cv_id, versions)
+    unchanged = len(compacted) == len(revisions) and all(
+        (old.number, old.kind, old.data) == (new.number, new.kind, new.data) for old, new in zip(revisions, compacted)
+    )
+    if unchanged:
+        return
+    CvRevision.objects.filter(cv_id=cv_id).delete()
+    CvRevision.objects.bulk_create(compacted)
+    result.cvs += 1
+    result.revisions_before += len(revisions)
+    result.revisions_after += len(compacted)
+
+
+def compact(before, granularity=24 * 60 * 60, purge_deleted=False, progress=None):
+    """
+    Compact the history older than ``before`` and return a CompactResult.
+
+    Keeps the last revision of every ``granularity`` seconds before ``before``
+    and every later revision, re-encoded with a checkpoint every
+    CV_HISTORY_CHECKPOINT_INTERVAL revisions. With ``purge_deleted``, the
+    history of CVs deleted before ``before`` is dropped altogether.
+    """
+    result = CompactResult()
+    cv_ids = list(
+        CvRevision.objects.filter(created_at__lt=before).values_list('cv_id', flat=True).order_by('cv_id').distinct()
+    )
+    for cv_id in cv_ids:
+        with transaction.atomic():
+            _compact_cv(cv_id, before, granularity, purge_deleted, result)
+        if progress is not None:
+            progress(result)
+    return result
@@ -0,0 +1,306 @@
+"""
+Bulk CV import.
+
+Records are streamed from NDJSON, JSON array or CSV input and written in chunks:
+each chunk is validated with the model validators, deduplicated on the unique
+CvContent.email and saved with a handful of bulk_create calls inside a single
+transaction, so memory stays bounded by the chunk size whatever the input size.
+"""
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+
+from django.contrib.auth.base_user import BaseUserManager
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from cv import cache, dedup, history, matching, search, skills, summaries
+from cv.models import Certificate, CvContent, Education, WorkExperience
+from cv.serializers import CV_FIELDS
+
+FORMATS = ('ndjson', 'json', 'csv')
+
+# Section key in an input record -> model; the key is also the related name on CvContent.
+SECTIONS = {
+    'educations': Education,
+    'work_experiences': WorkExperience,
+    'certificates': Certificate,
+}
+# Single section keys written before CVs could have several sections of a kind.
+LEGACY_SECTIONS = {
+    'education': 'educations',
+    'work_experience': 'work_experiences',
+    'certificate': 'certificates',
+}
+# Identifiers written by cv.exporters; imported CVs always get new ones.
+IGNORED_FIELDS = {'id', 'user_id'}
+MAX_REPORTED_ERRORS = 100
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    elapsed: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def processed(self):
+        return self.created + self.updated + self.skipped + self.invalid
+
+    @property
+    def rows_per_second(self):
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, line, error):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, error))
+
+
+def _iter_json_array(stream, read_size=64 * 1024):
+    """Yield the items of a top-level JSON array without reading the whole document."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    opened = False
+    eof = False
+
+    while True:
+        while position < len(buffer) and (buffer[position].isspace() or (opened and buffer[position] == ',')):
+            position += 1
+        if position < len(buffer):
+            if not opened:
+                if buffer[position] != '[':
+                    raise ValueError('Expected a JSON array of CV records.')
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield item
+                continue
+        elif eof:
+            raise ValueError('Unexpected end of JSON input.')
+        chunk = stream.read(read_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def _iter_csv(stream):
+    """
+    Yield CSV rows as records.
+
+    Section columns hold JSON encoded lists, e.g. ``educations``. The legacy
+    layout of one section per prefixed column, e.g. ``education.school``, is
+    read as a single section.
+    """
+    for row in csv.DictReader(stream):
+        record = {}
+        for column, value in row.items():
+            if column is None:
+                continue
+            value = value if value != '' else None
+            section, _, name = column.partition('.')
+            if name:
+                if value is not None:
+                    record.setdefault(section, {})[name] = value
+            else:
+                record[column] = value
+        yield record
+
+
+def iter_records(stream, format):
+    """
+    Yield (line, record) pairs from ``stream``; ``line`` is the record number in the input.
+
+    NDJSON records are yielded undecoded so a malformed line only invalidates itself.
+    """
+    if format == 'ndjson':
+        records = (line for line in stream if line.strip())
+    elif format == 'json':
+        records = _iter_json_array(stream)
+    elif format == 'csv':
+        records = _iter_csv(stream)
+    else:
+        raise ValueError(f'Unsupported import format {format!r}, expected one of {", ".join(FORMATS)}.')
+    return enumerate(records, start=1)
+
+
+def format_error(error):
+    if hasattr(error, 'error_dict'):
+        return '; '.join(f'{name}: {" ".join(messages)}' for name, messages in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+def _build_section(name, model, data):
+    if not isinstance(data, dict):
+        raise ValidationError({name: 'Expected a list of objects.'})
+    fields = {f.name for f in model._meta.concrete_fields if not f.primary_key and not f.is_relation}
+    unknown = data.keys() - fields - IGNORED_FIELDS
+    if unknown:
+        raise ValidationError({name: f'Unknown fields: {", ".join(sorted(unknown))}.'})
+    instance = model(**{key: value for key, value in data.items() if key in fields})
+    try:
+        # The CV is only assigned once it has been saved.
+        instance.full_clean(exclude=['cv'], validate_unique=False)
+    except ValidationError as exc:
+        raise ValidationError({
+            f'{name}.{field}': messages for field, messages in exc.message_dict.items()
+        }) from exc
+    return instance
+
+
+def _build_sections(name, model, data):
+    if isinstance(data, str):
+        # CSV cells hold JSON.
+        try:
+            data = json.loads(data)
+        except ValueError:
+            raise ValidationError({name: 'Invalid JSON.'}) from None
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        raise ValidationError({name: 'Expected a list of objects.'})
+    return [_build_section(name, model, item) for item in data]
+
+
+def build_cv(record):
+    """Validate an input record and return an unsaved CvContent with lists of its unsaved sections."""
+    if not isinstance(record, dict):
+        raise ValidationError('Expected an object per CV record.')
+    unknown = record.keys() - set(CV_FIELDS) - SECTIONS.keys() - LEGACY_SECTIONS.keys() - IGNORED_FIELDS
+    if unknown:
+        raise ValidationError(f'Unknown CV fields: {", ".join(sorted(unknown))}.')
+    data = {name: record[name] for name in CV_FIELDS if record.get(name) is not None}
+    if data.get('email') and isinstance(data['email'], str):
+        data['email'] = BaseUserManager.normalize_email(data['email'])
+    sections = {name: [] for name in SECTIONS}
+    for key, value in record.items():
+        name = LEGACY_SECTIONS.get(key, key)
+        if name in SECTIONS and value is not None:
+            sections[name].extend(_build_sections(key, SECTIONS[name], value))
+    cv = CvContent(**data)
+    cv.full_clean(exclude=['user'], validate_unique=False)
+    return cv, sections
+
+
+@transaction.atomic
+def _save_chunk(chunk, update_existing, result):
+    # Runs in one transaction, which also keeps the email lookup on the primary database.
+    emails = [cv.email.lower() for cv, _ in chunk if cv.email]
+    existing = {}
+    if emails:
+        # Emails are compared case-insensitively, through the lower(email) index.
+        stored = CvContent.objects.alias(email_lower=Lower('email')).filter(email_lower__in=emails)
+        existing = {cv.email.lower(): cv for cv in stored.only('pk', 'email')}
+
+    to_create, to_update = [], []
+    for cv, sections in chunk:
+        current = existing.get(cv.email.lower()) if cv.email else None
+        if current is None:
+            to_create.append((cv, sections))
+        elif update_existing:
+            cv.pk = current.pk
+            to_update.append((cv, sections))
+        else:
+            result.skipped += 1
+
+    CvContent.objects.bulk_create([cv for cv, _ in to_create])
+    updated_pks = [cv.pk for cv, _ in to_update]
+    if to_update:
+        CvContent.objects.bulk_update([cv for cv, _ in to_update], CV_FIELDS)
+        # Imported sections replace the ones the updated CVs had before. Nothing references sections, so
+        # they are deleted in one query each, without the signals whose work the chunk does below in bulk.
+        for model in SECTIONS.values():
+            sections = model.objects.filter(cv_id__in=updated_pks)
+            sections._raw_delete(sections.db)
+
+    rows = to_create + to_update
+    for name, model in SECTIONS.items():
+        instances = []
+        for cv, sections in rows:
+            for instance in sections[name]:
+                instance.cv = cv
+                instances.append(instance)
+        model.objects.bulk_create(instances)
+
+    # bulk_create() and bulk_update() do not send post_save, so update the derived data here.
+    cvs = [cv for cv, _ in rows]
+    search.index_cvs(cvs)
+    skills.sync_cv_skills(cvs)
+    dedup.index_cvs(cvs)
+    imported_pks = [cv.pk for cv in cvs]
+    summaries.refresh_summaries(imported_pks)
+    history.record_cvs(imported_pks)
+    transaction.on_commit(lambda: matching.mark_stale(imported_pks))
+    if updated_pks:
+        transaction.on_commit(lambda: cache.invalidate(updated_pks))
+
+    result.created += len(to_create)
+    result.updated += len(to_update)
+
+
+def import_cvs(stream, format='ndjson', chunk_size=1000, update_existing=False, progress=None):
+    """
+    Import CV records from ``stream`` and return an ImportResult.
+
+    Records whose email already exists are skipped, or overwritten when
+    ``update_existing`` is set. Invalid records are counted and reported but do
+    not stop the import. ``progress`` is called with the result after each chunk.
+    """
+    result = ImportResult()
+    started = time.monotonic()
+    chunk = {}
+    anonymous = []
+
+    def flush():
+        if chunk or anonymous:
+            _save_chunk([*chunk.values(), *anonymous], update_existing, result)
+            chunk.clear()
+            anonymous.clear()
+        result.elapsed = time.monotonic() - started
+        if progress is not None:
+            progress(result)
+
+    for line, record in iter_records(stream, format):
+        if isinstance(record, str):
+            try:
+                record = json.loads(record)
+            except ValueError as exc:
+                result.add_error(line, f'Invalid JSON: {exc}')
+                continue
+        try:
+            cv, sections = build_cv(record)
+        except ValidationError as exc:
+            result.add_error(line, format_error(exc))
+            continue
+        except (TypeError, ValueError) as exc:
+            # Values the model fields cannot take, e.g. a list given for a text field.
+            result.add_error(line, str(exc))
+            continue
+        email = cv.email.lower() if cv.email else None
+        if not email:
+            anonymous.append((cv, sections))
+        elif email in chunk:
+            # Duplicates within a chunk follow the same rule as duplicates of stored CVs.
+            result.skipped += 1
+            if update_existing:
+                chunk[email] = (cv, sections)
+        else:
+            chunk[email] = (cv, sections)
+        if len(chunk) + len(anonymous) >= chunk_size:
+            flush()
+    flush()
+    return result
@@ -0,0 +1,39 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from cv import history
+
+
+class Command(BaseCommand):
+    help = (
+        'Compact the CV change history: keep one revision per period of the history older than --older-than days '
+        'and rewrite the kept revisions with regularly spaced checkpoints.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=float, default=90,
+                            help='Age in days of the history to compact; newer revisions are all kept.')
+        parser.add_argument('--granularity', type=float, default=24,
+                            help='Hours of old history kept as one revision, the last one of the period.')
+        parser.add_argument('--purge-deleted', action='store_true',
+                            help='Drop the whole history of CVs deleted more than --older-than days ago.')
+
+    def handle(self, *args, older_than, granularity, purge_deleted, verbosity, **options):
+        if older_than < 0 or granularity <= 0:
+            raise CommandError('--older-than must not be negative and --granularity must be positive.')
+        started = time.monotonic()
+        before = timezone.now() - datetime.timedelta(days=older_than)
+
+        def progress(result):
+            if verbosity > 1:
+                self.stdout.write(f'Compacted the history of {result.cvs} CVs')
+
+        result = history.compact(before, granularity * 60 * 60, purge_deleted=purge_deleted, progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rewrote the history of {result.cvs} CVs in {time.monotonic() - started:.1f}s: '
+            f'{result.revisions_before} revisions down to {result.revisions_after}, '
+            f'purged the history of {len(result.purged)} deleted CVs'
+        ))
@@ -0,0 +1,23 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from cv import exporters
+
+
+class Command(BaseCommand):
+    help = 'Export all CVs as NDJSON, CSV or JSON Resume without loading them all into memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=exporters.FORMATS, default='ndjson')
+        parser.add_argument('--output', '-o', default='-', help='File to write to, or "-" for standard output.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Number of CVs fetched per query.')
+
+    def handle(self, *args, format, output, chunk_size, **options):
+        stream = sys.stdout if output == '-' else open(output, 'w', encoding='utf-8', newline='')
+        try:
+            for piece in exporters.export_cvs(format, chunk_size=chunk_size):
+                stream.write(piece)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cv import dedup
+
+
+class Command(BaseCommand):
+    help = (
+        'Write pairs of CVs that probably describe the same candidate as NDJSON merge candidates. '
+        'CVs are scanned in batches by id; with --state the scan resumes after the last finished batch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-',
+                            help='File to write to, or "-" for standard output. Files are appended to when resuming.')
+        parser.add_argument('--state', help='File recording the last scanned CV id, read on start to resume.')
+        parser.add_argument('--after', type=int, default=0, help='Only scan CVs with a greater id.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of CVs scanned per batch.')
+        parser.add_argument('--min-score', type=float, default=dedup.MIN_SCORE,
+                            help='Lowest score, between 0 and 1, of the pairs to write.')
+        parser.add_argument('--max-block-size', type=int, default=dedup.MAX_BLOCK_SIZE,
+                            help='Ignore blocking keys shared by more CVs than this.')
+        parser.add_argument('--rebuild-keys', action='store_true',
+                            help='Recompute the blocking keys of every CV before scanning.')
+
+    def handle(self, *args, output, state, after, batch_size, min_score, max_block_size, rebuild_keys, verbosity,
+               **options):
+        if state and os.path.exists(state):
+            with open(state, encoding='utf-8') as file:
+                try:
+                    after = max(after, int(file.read().strip() or 0))
+                except ValueError:
+                    raise CommandError(f'{state} does not hold a CV id.') from None
+        # Keep standard output for the candidates.
+        log = self.stderr if output == '-' else self.stdout
+
+        if rebuild_keys:
+            indexed = dedup.rebuild_keys(batch_size=batch_size)
+            log.write(f'Rebuilt the blocking keys of {indexed} CVs')
+
+        stream = sys.stdout if output == '-' else open(output, 'a' if after else 'w', encoding='utf-8')
+        found = 0
+        try:
+            for last_pk, candidates in dedup.iter_candidates(
+                after=after, batch_size=batch_size, min_score=min_score, max_block_size=max_block_size,
+            ):
+                for candidate in candidates:
+                    stream.write(json.dumps(candidate.as_dict()) + '\n')
+                stream.flush()
+                found += len(candidates)
+                if state:
+                    with open(state, 'w', encoding='utf-8') as file:
+                        file.write(f'{last_pk}\n')
+                if verbosity > 1:
+                    log.write(f'Scanned CVs up to id {last_pk}, {found} candidates')
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        log.write(self.style.SUCCESS(f'Found {found} merge candidates'))
@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cv import importers
+
+EXTENSION_FORMATS = {
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.json': 'json',
+    '.csv': 'csv',
+}
+
+
+class Command(BaseCommand):
+    help = 'Import CVs from an NDJSON, JSON or CSV file in chunked bulk transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or "-" to read from standard input.')
+        parser.add_argument('--format', choices=importers.FORMATS,
+                            help='Input format. Defaults to the one matching the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Number of CVs written per transaction.')
+        parser.add_argument('--update', action='store_true',
+                            help='Overwrite CVs whose email already exists instead of skipping them.')
+
+    def handle(self, *args, path, format, chunk_size, update, verbosity, **options):
+        if format is None:
+            format = EXTENSION_FORMATS.get(Path(path).suffix.lower())
+            if format is None:
+                raise CommandError('Cannot guess the input format, pass --format.')
+
+        def progress(result):
+            if verbosity > 1:
+                self.stdout.write(f'{result.processed} rows, {result.rows_per_second:.0f} rows/s')
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        try:
+            result = importers.import_cvs(
+                stream, format=format, chunk_size=chunk_size, update_existing=update, progress=progress,
+            )
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc) from exc
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for line, error in result.errors:
+            self.stderr.write(f'Record {line}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.created}, updated {result.updated}, skipped {result.skipped}, '
+            f'invalid {result.invalid} in {result.elapsed:.1f}s ({result.rows_per_second:.0f} rows/s)'
+        ))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cv import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all CVs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of CVs indexed per transaction.')
+
+    def handle(self, *args, batch_size, verbosity, **options):
+        started = time.monotonic()
+
+        def progress(indexed):
+            if verbosity > 1:
+                self.stdout.write(f'Indexed {indexed} CVs')
+
+        indexed = search.rebuild_index(batch_size=batch_size, progress=progress)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} CVs in {elapsed:.1f}s'))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cv import rendering
+from cv.models import CvContent
+
+
+class Command(BaseCommand):
+    help = 'Render CVs as HTML or PDF into a zip archive, using every CPU and the render cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Zip file to write.')
+        parser.add_argument('--format', choices=rendering.FORMATS, default='pdf')
+        parser.add_argument('--ids', help='Comma separated ids of the CVs to render. Defaults to every CV.')
+        parser.add_argument('--processes', type=int, help='Number of rendering processes. Defaults to one per CPU.')
+
+    def handle(self, *args, output, format, ids, processes, **options):
+        if ids:
+            try:
+                pks = [int(pk) for pk in ids.split(',') if pk.strip()]
+            except ValueError:
+                raise CommandError('--ids must be a comma separated list of CV ids.') from None
+        else:
+            pks = list(CvContent.objects.order_by('pk').values_list('pk', flat=True))
+        started = time.monotonic()
+        with open(output, 'wb') as file:
+            rendered = rendering.write_zip(pks, format, file, processes=processes)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} CVs into {output} in {elapsed:.1f}s'))
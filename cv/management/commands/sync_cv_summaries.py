@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cv import summaries
+
+
+class Command(BaseCommand):
+    help = 'Backfill missing CV summaries and rewrite outdated ones, or only report them with --check.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of CVs compared per batch.')
+        parser.add_argument('--check', action='store_true',
+                            help='Only report missing and outdated summaries; exit with an error if there are any.')
+
+    def handle(self, *args, batch_size, check, verbosity, **options):
+        started = time.monotonic()
+
+        def progress(result):
+            if verbosity > 1:
+                self.stdout.write(f'Checked {result.checked} CVs')
+
+        result = summaries.reconcile(batch_size=batch_size, fix=not check, progress=progress)
+        elapsed = time.monotonic() - started
+        checked = f'Checked {result.checked} CVs in {elapsed:.1f}s'
+        if not check:
+            self.stdout.write(self.style.SUCCESS(
+                f'{checked}, wrote {result.missing} missing and {result.outdated} outdated summaries'
+            ))
+        elif result.consistent:
+            self.stdout.write(self.style.SUCCESS(f'{checked}, all summaries are up to date'))
+        else:
+            raise CommandError(
+                f'{checked}: {result.missing} missing and {result.outdated} outdated summaries, '
+                f'e.g. of CVs {", ".join(map(str, result.pks))}.'
+            )
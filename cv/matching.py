@@ -0,0 +1,283 @@
+"""
+Candidate/job matching.
+
+A MatchingIndex holds what is needed to score a job against every CV as arrays:
+a sparse CV x skill matrix, a sparse CV x title term matrix, location codes and
+total years of work experience. Scoring a job is then two sparse matrix-vector
+products, a few vectorized comparisons and a partial sort, without a query or
+a Python loop over the CVs.
+
+The index is built lazily once per process. CVs saved or deleted in this process
+are marked stale by the signal handlers in cv.signals and reloaded before the
+next match; changes made by other processes are picked up when the index is
+rebuilt after CV_MATCHING_INDEX_MAX_AGE seconds. Both read from the primary
+database, as a lagging replica would keep the old rows of the CVs marked stale.
+
+NumPy and SciPy take longer to import than the rest of the project, and most
+processes never match a job: cv.views and cv.signals import this module on
+first use, and SciPy is only imported when the index is first built. Importing
+CVs, which refreshes summaries with NumPy anyway, loads it up front.
+"""
+import datetime
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.conf import settings
+
+from cv.dates import experience_days, job_span
+from cv.models import DAYS_PER_YEAR, CvContent, CvSkill, Skill, WorkExperience, normalize_skill_name
+from cv.search import tokenize
+from joinit.routers import use_primary
+
+# Relative weight of each criterion; criteria a job does not specify are left out of its scores.
+WEIGHTS = {
+    'skills': 0.5,
+    'title': 0.2,
+    'location': 0.1,
+    'experience': 0.2,
+}
+
+CHUNK_SIZE = 10000
+# Rebuild instead of appending reloaded rows once this share of the rows is outdated.
+MAX_STALE_RATIO = 0.25
+
+
+@dataclass
+class Job:
+    skills: list = field(default_factory=list)
+    title: str = ''
+    location: str = ''
+    min_years: float = 0
+
+
+def normalize_location(location):
+    return ' '.join((location or '').split()).casefold()
+
+
+class MatchingIndex:
+    """Matching data of every CV, one row per CV; see build() to load it from the database."""
+
+    def __init__(self, cv_ids, skills, titles, locations, years, skill_columns, title_columns, location_codes,
+                 active=None, rows=None, built_at=None):
+        self.cv_ids = cv_ids
+        # Binary, one column per Skill.pk.
+        self.skills = skills
+        # L2 normalized title terms, one column per entry of title_columns.
+        self.titles = titles
+        # Code of the normalized location in location_codes, -1 when missing.
+        self.locations = locations
+        self.years = years
+        self.skill_columns = skill_columns
+        self.title_columns = title_columns
+        self.location_codes = location_codes
+        # Rows of CVs that have been reloaded or deleted since are inactive.
+        self.active = np.ones(len(cv_ids), dtype=bool) if active is None else active
+        # CV pk -> row of its active data.
+        self.rows = {int(pk): row for row, pk in enumerate(cv_ids)} if rows is None else rows
+        self.built_at = time.monotonic() if built_at is None else built_at
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def age(self):
+        return time.monotonic() - self.built_at
+
+    @classmethod
+    def build(cls):
+        skill_columns = dict(Skill.objects.values_list('normalized_name', 'pk'))
+        title_columns, location_codes = {}, {}
+        cv_ids, skills, titles, locations, years = _load(None, skill_columns, title_columns, location_codes)
+        return cls(cv_ids, skills, titles, locations, years, skill_columns, title_columns, location_codes)
+
+    def updated(self, pks):
+        """Return a copy of the index with the given CVs reloaded from the database."""
+        stale = len(self.cv_ids) - len(self.rows) + len(pks)
+        if stale > MAX_STALE_RATIO * max(len(self.cv_ids), 1):
+            return self.build()
+        skill_columns, title_columns, location_codes = (
+            dict(self.skill_columns), dict(self.title_columns), dict(self.location_codes)
+        )
+        cv_ids, skills, titles, locations, years = _load(pks, skill_columns, title_columns, location_codes)
+        active = self.active.copy()
+        rows = dict(self.rows)
+        active[[rows.pop(pk) for pk in pks if pk in rows]] = False
+        rows.update((int(pk), len(self.cv_ids) + row) for row, pk in enumerate(cv_ids))
+        return MatchingIndex(
+            np.concatenate([self.cv_ids, cv_ids]),
+            _vstack(self.skills, skills),
+            _vstack(self.titles, titles),
+            np.concatenate([self.locations, locations]),
+            np.concatenate([self.years, years]),
+            skill_columns, title_columns, location_codes,
+            active=np.concatenate([active, np.ones(len(cv_ids), dtype=bool)]),
+            rows=rows,
+            built_at=self.built_at,
+        )
+
+    def scores(self, job):
+        """Return the score in [0, 1] of every row for ``job``, -1 for inactive rows."""
+        scores = np.zeros(len(self.cv_ids))
+        total_weight = 0
+
+        names = {normalize_skill_name(skill) for skill in job.skills} - {''}
+        if names:
+            vector = np.zeros(self.skills.shape[1])
+            columns = [self.skill_columns[name] for name in names if name in self.skill_columns]
+            vector[[column for column in columns if column < len(vector)]] = 1 / len(names)
+            scores += WEIGHTS['skills'] * (self.skills @ vector)
+            total_weight += WEIGHTS['skills']
+
+        terms = set(tokenize(job.title))
+        if terms:
+            vector = np.zeros(self.titles.shape[1])
+            columns = [self.title_columns[term] for term in terms if term in self.title_columns]
+            vector[columns] = 1 / math.sqrt(len(terms))
+            scores += WEIGHTS['title'] * (self.titles @ vector)
+            total_weight += WEIGHTS['title']
+
+        location = normalize_location(job.location)
+        if location:
+            code = self.location_codes.get(location)
+            if code is not None:
+                scores += WEIGHTS['location'] * (self.locations == code)
+            total_weight += WEIGHTS['location']
+
+        if job.min_years > 0:
+            scores += WEIGHTS['experience'] * np.minimum(self.years / job.min_years, 1)
+            total_weight += WEIGHTS['experience']
+
+        if total_weight:
+            scores /= total_weight
+        scores[~self.active] = -1
+        return scores
+
+    def match(self, job, limit=50):
+        """Return up to ``limit`` (cv_id, score) pairs with a positive score, best first."""
+        scores = self.scores(job)
+        limit = min(limit, len(scores))
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.lexsort((self.cv_ids[top], -scores[top]))]
+        return [(int(self.cv_ids[row]), float(scores[row])) for row in top if scores[row] > 0]
+
+
+def _vstack(top, bottom):
+    from scipy import sparse
+
+    columns = max(top.shape[1], bottom.shape[1])
+    top, bottom = top.copy(), bottom.copy()
+    top.resize((top.shape[0], columns))
+    bottom.resize((bottom.shape[0], columns))
+    return sparse.vstack([top, bottom], format='csr')
+
+
+def _code(codes, value):
+    return codes.setdefault(value, len(codes))
+
+
+def _load(pks, skill_columns, title_columns, location_codes):
+    """
+    Load the matching data of the CVs in ``pks`` (every CV when None), ordered by pk.
+
+    New skills, title terms and locations are added to the given mappings.
+    """
+    from scipy import sparse
+
+    cvs = CvContent.objects.order_by('pk')
+    cv_skills = CvSkill.objects.order_by()
+    jobs = WorkExperience.objects.filter(start_date__isnull=False).order_by()
+    if pks is not None:
+        cvs = cvs.filter(pk__in=pks)
+        cv_skills = cv_skills.filter(cv_id__in=pks)
+        jobs = jobs.filter(cv_id__in=pks)
+
+    cv_ids, locations = [], []
+    title_rows, title_codes, title_values = [], [], []
+    for row, (pk, title, location) in enumerate(
+        cvs.values_list('pk', 'title', 'location').iterator(chunk_size=CHUNK_SIZE)
+    ):
+        cv_ids.append(pk)
+        location = normalize_location(location)
+        locations.append(_code(location_codes, location) if location else -1)
+        terms = set(tokenize(title))
+        for term in terms:
+            title_rows.append(row)
+            title_codes.append(_code(title_columns, term))
+            title_values.append(1 / math.sqrt(len(terms)))
+    cv_ids = np.array(cv_ids, dtype=np.int64)
+    rows = len(cv_ids)
+
+    skill_cv_ids, skill_ids = [], []
+    for cv_id, skill_id, name in cv_skills.values_list(
+        'cv_id', 'skill_id', 'skill__normalized_name',
+    ).iterator(chunk_size=CHUNK_SIZE):
+        skill_cv_ids.append(cv_id)
+        skill_ids.append(skill_id)
+        skill_columns.setdefault(name, skill_id)
+    skill_rows, skill_ids = _rows_of(cv_ids, skill_cv_ids, skill_ids)
+    skills = sparse.csr_matrix(
+        (np.ones(len(skill_rows)), (skill_rows, skill_ids)),
+        shape=(rows, max(skill_columns.values(), default=0) + 1),
+    )
+    titles = sparse.csr_matrix(
+        (title_values, (title_rows, title_codes)), shape=(rows, len(title_columns)),
+    )
+
+    today = datetime.date.today()
+    job_cv_ids, starts, ends = [], [], []
+    for cv_id, *job in jobs.values_list(
+        'cv_id', 'start_date', 'end_date', 'currently_working',
+    ).iterator(chunk_size=CHUNK_SIZE):
+        start, end = job_span(*job, today)
+        job_cv_ids.append(cv_id)
+        starts.append(start)
+        ends.append(end)
+    job_rows, starts, ends = _rows_of(cv_ids, job_cv_ids, starts, ends)
+    years = experience_days(rows, job_rows, starts, ends) / DAYS_PER_YEAR
+
+    return cv_ids, skills, titles, np.array(locations, dtype=np.int32), years
+
+
+def _rows_of(cv_ids, related_cv_ids, *columns):
+    """Map related rows to the row of their CV, dropping those of CVs created since the CVs were read."""
+    related_cv_ids = np.array(related_cv_ids, dtype=np.int64)
+    rows = np.searchsorted(cv_ids, related_cv_ids)
+    known = rows < len(cv_ids)
+    known[known] = cv_ids[rows[known]] == related_cv_ids[known]
+    return (rows[known], *(np.array(column, dtype=np.int64)[known] for column in columns))
+
+
+_lock = threading.Lock()
+_index = None
+_stale = set()
+
+
+def get_index():
+    """Return the index of this process, building or refreshing it first when needed."""
+    global _index
+    with _lock, use_primary():
+        max_age = settings.CV_MATCHING_INDEX_MAX_AGE
+        if _index is None or (max_age and _index.age > max_age):
+            _stale.clear()
+            _index = MatchingIndex.build()
+        elif _stale:
+            _index = _index.updated(set(_stale))
+            _stale.clear()
+        return _index
+
+
+def mark_stale(pks):
+    """Reload the given CVs before the next match."""
+    with _lock:
+        if _index is not None:
+            _stale.update(pks)
+
+
+def match_cvs(job, limit=50):
+    """Return up to ``limit`` (cv_id, score) pairs for the CVs matching ``job`` best."""
+    return get_index().match(job, limit)
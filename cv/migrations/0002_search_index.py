@@ -0,0 +1,31 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField()),
+                ('cv', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='cv.cvcontent')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchindexentry',
+            index=models.Index(fields=['term', 'cv'], name='cv_search_term_cv_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchindexentry',
+            constraint=models.UniqueConstraint(fields=('cv', 'term'), name='cv_search_entry_unique'),
+        ),
+    ]
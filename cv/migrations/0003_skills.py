@@ -0,0 +1,44 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0002_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('normalized_name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CvSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('cv', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cv_skills', to='cv.cvcontent')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cv_skills', to='cv.skill')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cvcontent',
+            name='skill_set',
+            field=models.ManyToManyField(blank=True, related_name='cvs', through='cv.CvSkill', to='cv.skill'),
+        ),
+        migrations.AddIndex(
+            model_name='cvskill',
+            index=models.Index(fields=['skill', 'cv'], name='cv_skill_skill_cv_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cvskill',
+            constraint=models.UniqueConstraint(fields=('cv', 'skill'), name='cv_skill_unique'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+MAX_SKILL_LENGTH = 100
+
+
+def split_skills(text):
+    skills = {}
+    for raw in (text or '').split(','):
+        name = ' '.join(raw.split())[:MAX_SKILL_LENGTH]
+        normalized = name.casefold()
+        if normalized and normalized not in skills:
+            skills[normalized] = name
+    return skills
+
+
+def populate_skills(apps, schema_editor):
+    CvContent = apps.get_model('cv', 'CvContent')
+    CvSkill = apps.get_model('cv', 'CvSkill')
+    Skill = apps.get_model('cv', 'Skill')
+    db_alias = schema_editor.connection.alias
+
+    skill_ids = {}
+    last_pk = 0
+    while True:
+        batch = list(
+            CvContent.objects.using(db_alias).filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'skills')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        parsed = [(cv_id, split_skills(text)) for cv_id, text in batch]
+
+        new_skills = {}
+        for _, skills in parsed:
+            for normalized, name in skills.items():
+                if normalized not in skill_ids:
+                    new_skills.setdefault(normalized, name)
+        if new_skills:
+            Skill.objects.using(db_alias).bulk_create(
+                [Skill(name=name, normalized_name=normalized) for normalized, name in new_skills.items()]
+            )
+            skill_ids.update(
+                Skill.objects.using(db_alias).filter(normalized_name__in=new_skills).values_list('normalized_name', 'pk')
+            )
+
+        CvSkill.objects.using(db_alias).bulk_create([
+            CvSkill(cv_id=cv_id, skill_id=skill_ids[normalized], position=position)
+            for cv_id, skills in parsed
+            for position, normalized in enumerate(skills)
+        ])
+
+
+def clear_skills(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    apps.get_model('cv', 'CvSkill').objects.using(db_alias).all().delete()
+    apps.get_model('cv', 'Skill').objects.using(db_alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0003_skills'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_skills, clear_skills),
+    ]
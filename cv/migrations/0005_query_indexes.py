@@ -0,0 +1,46 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:42
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0004_populate_skills'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cvcontent',
+            index=models.Index(fields=['location'], name='cv_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cvcontent',
+            index=models.Index(fields=['title'], name='cv_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cvcontent',
+            index=models.Index(fields=['last_name', 'first_name'], name='cv_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cvcontent',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='cv_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='education',
+            index=models.Index(fields=['start_date', 'end_date'], name='cv_education_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workexperience',
+            index=models.Index(fields=['company'], name='cv_work_company_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workexperience',
+            index=models.Index(fields=['start_date', 'end_date'], name='cv_work_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workexperience',
+            index=models.Index(condition=models.Q(('currently_working', True)), fields=['company'], name='cv_work_current_company_idx'),
+        ),
+    ]
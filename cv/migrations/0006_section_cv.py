@@ -0,0 +1,29 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='cv',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='certificates', to='cv.cvcontent'),
+        ),
+        migrations.AddField(
+            model_name='education',
+            name='cv',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='educations', to='cv.cvcontent'),
+        ),
+        migrations.AddField(
+            model_name='workexperience',
+            name='cv',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='work_experiences', to='cv.cvcontent'),
+        ),
+    ]
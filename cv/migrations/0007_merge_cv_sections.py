@@ -0,0 +1,121 @@
+"""
+Move CV sections from the CvContent foreign keys to the new section -> CV foreign keys.
+
+Until now a candidate with several educations, jobs or certificates was stored
+as several CvContent rows that only differ in those foreign keys. Such rows are
+merged into one, preferring the row with an email and then the lowest id:
+every section is attached to it and identical sections are detached. Rows that
+disagree on a non-empty email are different candidates and are left alone.
+
+Detached sections are deleted in 0008, once the old foreign keys (which would
+cascade the delete to the CVs) are gone.
+"""
+from django.db import migrations
+from django.db.models import Count, F
+
+BATCH_SIZE = 1000
+
+IDENTITY_FIELDS = (
+    'user_id', 'first_name', 'last_name', 'title', 'summary', 'location', 'linkedin_url', 'github_url', 'skills',
+)
+# CvContent foreign key -> section model name
+SECTIONS = {
+    'education': 'Education',
+    'work_experience': 'WorkExperience',
+    'certificate': 'Certificate',
+}
+
+
+def _section_fields(model):
+    return [field for field in model._meta.concrete_fields if not field.primary_key and field.name != 'cv']
+
+
+def attach_sections(apps, db_alias):
+    """Point every section at the CV that references it, copying sections shared by several CVs."""
+    CvContent = apps.get_model('cv', 'CvContent')
+    for field, model_name in SECTIONS.items():
+        model = apps.get_model('cv', model_name)
+        last_pk = 0
+        while True:
+            batch = list(
+                CvContent.objects.using(db_alias)
+                .filter(pk__gt=last_pk, **{f'{field}__isnull': False})
+                .order_by('pk')
+                .values_list('pk', f'{field}_id')[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            sections = model.objects.using(db_alias).in_bulk([section_id for _, section_id in batch])
+            updated, copies = [], []
+            for cv_id, section_id in batch:
+                section = sections[section_id]
+                if section.cv_id is None:
+                    section.cv_id = cv_id
+                    updated.append(section)
+                else:
+                    copy = model(cv_id=cv_id)
+                    for section_field in _section_fields(model):
+                        setattr(copy, section_field.attname, getattr(section, section_field.attname))
+                    copies.append(copy)
+            model.objects.using(db_alias).bulk_update(updated, ['cv'])
+            model.objects.using(db_alias).bulk_create(copies)
+
+
+def _identity_filter(group):
+    return {
+        f'{name}__isnull' if group[name] is None else name: True if group[name] is None else group[name]
+        for name in IDENTITY_FIELDS
+    }
+
+
+def detach_duplicate_sections(model, cv_id, db_alias):
+    seen = set()
+    duplicates = []
+    for section in model.objects.using(db_alias).filter(cv_id=cv_id).order_by('pk'):
+        values = tuple(getattr(section, field.attname) for field in _section_fields(model))
+        if values in seen:
+            duplicates.append(section.pk)
+        seen.add(values)
+    model.objects.using(db_alias).filter(pk__in=duplicates).update(cv=None)
+
+
+def merge_duplicate_cvs(apps, db_alias):
+    CvContent = apps.get_model('cv', 'CvContent')
+    groups = list(
+        CvContent.objects.using(db_alias)
+        .values(*IDENTITY_FIELDS)
+        .annotate(rows=Count('pk'), emails=Count('email', distinct=True))
+        .filter(rows__gt=1, emails__lte=1)
+        .order_by()
+    )
+    for group in groups:
+        pks = list(
+            CvContent.objects.using(db_alias)
+            .filter(**_identity_filter(group))
+            .order_by(F('email').desc(nulls_last=True), 'pk')
+            .values_list('pk', flat=True)
+        )
+        keeper, duplicates = pks[0], pks[1:]
+        for model_name in SECTIONS.values():
+            model = apps.get_model('cv', model_name)
+            model.objects.using(db_alias).filter(cv_id__in=duplicates).update(cv_id=keeper)
+            detach_duplicate_sections(model, keeper, db_alias)
+        CvContent.objects.using(db_alias).filter(pk__in=duplicates).delete()
+
+
+def forwards(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    attach_sections(apps, db_alias)
+    merge_duplicate_cvs(apps, db_alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0006_section_cv'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+SECTION_MODELS = ('Education', 'WorkExperience', 'Certificate')
+
+
+def delete_orphan_sections(apps, schema_editor):
+    # Sections detached by 0007 and sections no CV referred to, which were unreachable before.
+    db_alias = schema_editor.connection.alias
+    for model_name in SECTION_MODELS:
+        apps.get_model('cv', model_name).objects.using(db_alias).filter(cv__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0007_merge_cv_sections'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='cvcontent',
+            name='certificate',
+        ),
+        migrations.RemoveField(
+            model_name='cvcontent',
+            name='education',
+        ),
+        migrations.RemoveField(
+            model_name='cvcontent',
+            name='work_experience',
+        ),
+        migrations.RunPython(delete_orphan_sections, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0008_remove_cv_section_fks'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='certificate',
+            name='cv',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='certificates', to='cv.cvcontent'),
+        ),
+        migrations.AlterField(
+            model_name='education',
+            name='cv',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='educations', to='cv.cvcontent'),
+        ),
+        migrations.AlterField(
+            model_name='workexperience',
+            name='cv',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='work_experiences', to='cv.cvcontent'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0009_alter_section_cv'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CvSummary',
+            fields=[
+                ('cv', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cv_summary', serialize=False, to='cv.cvcontent')),
+                ('full_name', models.CharField(blank=True, max_length=61)),
+                ('title', models.CharField(max_length=30)),
+                ('location', models.CharField(blank=True, max_length=100, null=True)),
+                ('experience_days', models.PositiveIntegerField(default=0)),
+                ('experience_ongoing', models.BooleanField(default=False)),
+                ('computed_on', models.DateField()),
+                ('current_employer', models.CharField(blank=True, max_length=100, null=True)),
+                ('latest_degree', models.CharField(blank=True, max_length=100, null=True)),
+                ('certificate_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='cvsummary',
+            index=models.Index(fields=['location', 'cv'], name='cv_summary_location_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0010_cv_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CvBlockingKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('cv', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocking_keys', to='cv.cvcontent')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='cvblockingkey',
+            index=models.Index(fields=['key', 'cv'], name='cv_blocking_key_cv_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cvblockingkey',
+            constraint=models.UniqueConstraint(fields=('cv', 'key'), name='cv_blocking_key_unique'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.1.5 on 2026-10-18 17:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0011_blocking_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CvRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('checkpoint', 'Checkpoint'), ('delta', 'Delta'), ('deletion', 'Deletion')], max_length=10)),
+                ('data', models.JSONField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cv', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='revisions', to='cv.cvcontent')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='cvrevision',
+            index=models.Index(fields=['cv', 'created_at'], name='cv_revision_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cvrevision',
+            index=models.Index(fields=['created_at'], name='cv_revision_age_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cvrevision',
+            constraint=models.UniqueConstraint(fields=('cv', 'number'), name='cv_revision_unique'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+# Frozen copies of cv.history.STATE_CV_FIELDS and cv.serializers.SECTION_FIELDS.
+CV_FIELDS = (
+    'user_id', 'first_name', 'last_name', 'email', 'title', 'summary', 'location', 'linkedin_url', 'github_url',
+    'skills',
+)
+SECTION_FIELDS = {
+    'Education': ('educations', ('school', 'degree', 'field_of_study', 'start_date', 'end_date')),
+    'WorkExperience': ('work_experiences', ('company', 'title', 'start_date', 'end_date', 'currently_working')),
+    'Certificate': ('certificates', ('name', 'organisation', 'issue_date', 'credential_url')),
+}
+
+
+def _json(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def checkpoint_existing_cvs(apps, schema_editor):
+    """Start the history of every existing CV with a checkpoint of its current state."""
+    CvContent = apps.get_model('cv', 'CvContent')
+    CvRevision = apps.get_model('cv', 'CvRevision')
+    db_alias = schema_editor.connection.alias
+    now = timezone.now()
+
+    last_pk = 0
+    while True:
+        cvs = CvContent.objects.using(db_alias).filter(pk__gt=last_pk).order_by('pk')
+        batch = list(cvs.values('pk', *CV_FIELDS)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1]['pk']
+        states = {}
+        for row in batch:
+            pk = row.pop('pk')
+            states[pk] = {
+                'cv': {name: _json(value) for name, value in row.items()},
+                **{name: {} for name, _ in SECTION_FIELDS.values()},
+            }
+        for model_name, (name, fields) in SECTION_FIELDS.items():
+            sections = apps.get_model('cv', model_name).objects.using(db_alias).filter(cv_id__in=states)
+            for row in sections.order_by('pk').values('pk', 'cv_id', *fields):
+                pk, cv_id = row.pop('pk'), row.pop('cv_id')
+                states[cv_id][name][str(pk)] = {key: _json(value) for key, value in row.items()}
+        CvRevision.objects.using(db_alias).bulk_create([
+            CvRevision(cv_id=pk, number=1, kind='checkpoint', data=state, created_at=now)
+            for pk, state in states.items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0012_cv_revisions'),
+    ]
+
+    operations = [
+        migrations.RunPython(checkpoint_existing_cvs, migrations.RunPython.noop),
+    ]
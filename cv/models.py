@@ -1,9 +1,75 @@
+import datetime
+
 from django.core.validators import MinLengthValidator
 from django.db import models
+from django.db.models import Count, Prefetch, Q, Value
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 from users.models import User
 
 
+def normalize_skill_name(name):
+    return ' '.join(name.split()).casefold()
+
+
+DAYS_PER_YEAR = 365.25
+
+SECTION_RELATED_NAMES = ('educations', 'work_experiences', 'certificates')
+
+
+class CvContentQuerySet(models.QuerySet):
+    def with_sections(self):
+        """
+        Load the user and all sections of the CVs along with them.
+
+        Evaluating the queryset then costs four queries whatever the number of
+        CVs: one for the CVs and their users and one per section type.
+        """
+        return self.select_related('user').prefetch_related(*(
+            Prefetch(name, queryset=self.model._meta.get_field(name).related_model.objects.order_by('pk'))
+            for name in SECTION_RELATED_NAMES
+        ))
+
+    def _skill_matches(self, skills):
+        names = {normalize_skill_name(skill) for skill in skills} - {''}
+        return names, CvSkill.objects.filter(skill__normalized_name__in=names)
+
+    def with_all_skills(self, skills):
+        """CVs that have every one of the given skills."""
+        names, matches = self._skill_matches(skills)
+        if not names:
+            return self
+        matching_cvs = matches.values('cv_id').annotate(matched=Count('skill_id')).filter(matched=len(names))
+        return self.filter(pk__in=matching_cvs.values('cv_id'))
+
+    def with_any_skills(self, skills):
+        """CVs that have at least one of the given skills."""
+        names, matches = self._skill_matches(skills)
+        if not names:
+            return self
+        return self.filter(pk__in=matches.values('cv_id'))
+
+    def lock(self, *fields):
+        """
+        Lock the rows of these CVs until the transaction ends and return them, with only ``fields`` loaded.
+
+        Code replacing the rows derived from CVs reads them through this first, so
+        concurrent refreshes of a CV run one after the other and the last one
+        writes what the CV holds when it commits. Rows are locked in pk order so
+        that two transactions cannot deadlock; SQLite, which has no row locks,
+        serializes writing transactions anyway.
+        """
+        return list(self.select_for_update().only('pk', *fields).order_by('pk'))
+
+    def with_skill_count(self):
+        return self.annotate(skill_count=Count('cv_skills'))
+
+    def by_email(self, email):
+        """Case-insensitive email lookup that can use the lower(email) index, unlike email__iexact."""
+        return self.alias(email_lower=Lower('email')).filter(email_lower=Lower(Value(email)))
+
+
 class CvContent(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True)
     first_name = models.CharField(max_length=30, validators=[MinLengthValidator(2)], blank=True, null=True)
@@ -15,31 +81,178 @@ class CvContent(models.Model):
     linkedin_url = models.URLField(max_length=200, blank=True, null=True)
     github_url = models.URLField(max_length=200, blank=True, null=True)
     skills = models.TextField(help_text='Comma separated list of skills', max_length=500, blank=True)
-    education = models.ForeignKey('cv.Education', on_delete=models.CASCADE, blank=True, null=True,
-                                  related_name='educations')
-    work_experience = models.ForeignKey('cv.WorkExperience', on_delete=models.CASCADE, blank=True, null=True,
-                                        related_name='work_experiences')
-    certificate = models.ForeignKey('cv.Certificate', on_delete=models.CASCADE, related_name='certificates')
+    skill_set = models.ManyToManyField('cv.Skill', through='cv.CvSkill', related_name='cvs', blank=True)
+
+    objects = CvContentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['location'], name='cv_location_idx'),
+            models.Index(fields=['title'], name='cv_title_idx'),
+            models.Index(fields=['last_name', 'first_name'], name='cv_name_idx'),
+            models.Index(Lower('email'), name='cv_email_lower_idx'),
+        ]
 
 
 class Education(models.Model):
+    cv = models.ForeignKey(CvContent, on_delete=models.CASCADE, related_name='educations')
     school = models.CharField(max_length=100, validators=[MinLengthValidator(2)])
     degree = models.CharField(max_length=100, validators=[MinLengthValidator(2)], blank=True, null=True)
     field_of_study = models.CharField(max_length=100, validators=[MinLengthValidator(2)])
     start_date = models.DateField(blank=True, null=True)
     end_date = models.DateField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_date', 'end_date'], name='cv_education_dates_idx'),
+        ]
+
 
 class WorkExperience(models.Model):
+    cv = models.ForeignKey(CvContent, on_delete=models.CASCADE, related_name='work_experiences')
     company = models.CharField(max_length=100, validators=[MinLengthValidator(2)])
     title = models.CharField(max_length=100, validators=[MinLengthValidator(2)], blank=True, null=True)
     start_date = models.DateField(blank=True, null=True)
     end_date = models.DateField(blank=True, null=True)
     currently_working = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['company'], name='cv_work_company_idx'),
+            models.Index(fields=['start_date', 'end_date'], name='cv_work_dates_idx'),
+            # Current employers are a small part of all work experience rows.
+            models.Index(
+                fields=['company'], condition=Q(currently_working=True), name='cv_work_current_company_idx',
+            ),
+        ]
+
 
 class Certificate(models.Model):
+    cv = models.ForeignKey(CvContent, on_delete=models.CASCADE, related_name='certificates')
     name = models.CharField(max_length=100, validators=[MinLengthValidator(2)])
     organisation = models.CharField(max_length=100, validators=[MinLengthValidator(2)], blank=True, null=True)
     issue_date = models.DateField(blank=True, null=True)
     credential_url = models.URLField()
+
+
+class CvRevision(models.Model):
+    """One change of a CV and its sections, stored as a checkpoint or a delta, see cv.history."""
+
+    CHECKPOINT = 'checkpoint'
+    DELTA = 'delta'
+    DELETION = 'deletion'
+    KIND_CHOICES = [
+        (CHECKPOINT, 'Checkpoint'),
+        (DELTA, 'Delta'),
+        (DELETION, 'Deletion'),
+    ]
+
+    # Not a constraint, so the history outlives the CV.
+    cv = models.ForeignKey(
+        CvContent, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='revisions',
+    )
+    # Position in the history of the CV, from 1.
+    number = models.PositiveIntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    data = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cv', 'number'], name='cv_revision_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['cv', 'created_at'], name='cv_revision_created_idx'),
+            models.Index(fields=['created_at'], name='cv_revision_age_idx'),
+        ]
+
+
+class CvSummary(models.Model):
+    """Listing data of a CV gathered from the CV and its sections, kept up to date by cv.summaries."""
+
+    cv = models.OneToOneField(CvContent, on_delete=models.CASCADE, primary_key=True, related_name='cv_summary')
+    full_name = models.CharField(max_length=61, blank=True)
+    title = models.CharField(max_length=30)
+    location = models.CharField(max_length=100, blank=True, null=True)
+    # Work experience up to computed_on, overlapping jobs counted once.
+    experience_days = models.PositiveIntegerField(default=0)
+    # Whether an ongoing job adds to the experience every day after computed_on.
+    experience_ongoing = models.BooleanField(default=False)
+    computed_on = models.DateField()
+    current_employer = models.CharField(max_length=100, blank=True, null=True)
+    latest_degree = models.CharField(max_length=100, blank=True, null=True)
+    certificate_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['location', 'cv'], name='cv_summary_location_idx'),
+        ]
+
+    def experience_days_on(self, date):
+        if not self.experience_ongoing:
+            return self.experience_days
+        return self.experience_days + max((date - self.computed_on).days, 0)
+
+    @property
+    def years_of_experience(self):
+        return self.experience_days_on(datetime.date.today()) / DAYS_PER_YEAR
+
+
+class SkillQuerySet(models.QuerySet):
+    def with_cv_count(self):
+        return self.annotate(cv_count=Count('cv_skills'))
+
+
+class Skill(models.Model):
+    name = models.CharField(max_length=100)
+    normalized_name = models.CharField(max_length=100, unique=True)
+
+    objects = SkillQuerySet.as_manager()
+
+    def __str__(self):
+        return self.name
+
+
+class CvSkill(models.Model):
+    cv = models.ForeignKey(CvContent, on_delete=models.CASCADE, related_name='cv_skills')
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='cv_skills')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cv', 'skill'], name='cv_skill_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['skill', 'cv'], name='cv_skill_skill_cv_idx'),
+        ]
+
+
+class SearchIndexEntry(models.Model):
+    """One posting of the CV full-text inverted index: a term and its weight within a CV."""
+
+    cv = models.ForeignKey(CvContent, on_delete=models.CASCADE, related_name='search_entries')
+    term = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cv', 'term'], name='cv_search_entry_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['term', 'cv'], name='cv_search_term_cv_idx'),
+        ]
+
+
+class CvBlockingKey(models.Model):
+    """A key that CVs of the same candidate are likely to share, see cv.dedup."""
+
+    cv = models.ForeignKey(CvContent, on_delete=models.CASCADE, related_name='blocking_keys')
+    key = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cv', 'key'], name='cv_blocking_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['key', 'cv'], name='cv_blocking_key_cv_idx'),
+        ]
@@ -0,0 +1,156 @@
+"""
+Keyset (cursor) pagination.
+
+Offset pagination (LIMIT 20 OFFSET 400000) makes the database read and throw
+away every row before the page, so the deeper the page the slower it is. A
+keyset paginator continues after the sort key of the last row of the previous
+page instead (WHERE (date_joined, id) > (:date_joined, :id) ORDER BY
+date_joined, id LIMIT 20), which an index on the ordering answers with a
+single seek: page N costs the same as page 1.
+
+Pages are addressed by opaque cursors holding the sort key of a boundary row
+and the direction to read in. Cursors are signed, so clients cannot forge
+arbitrary keys, and are only valid for the ordering they were made for. The
+ordering must end with a unique field, normally the primary key, and none of
+its fields may be null.
+"""
+import datetime
+import decimal
+import uuid
+from dataclasses import dataclass
+
+from django.core import signing
+from django.db.models import Model, Q
+
+SALT = 'cv.pagination'
+NEXT = 'next'
+PREVIOUS = 'previous'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    next_cursor: str = None
+    previous_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        # Unlike DjangoJSONEncoder, keep microseconds: the key must match the stored value exactly.
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` in ``ordering``, e.g. ``('date_joined', 'pk')`` or ``('-pk',)``.
+
+    Rows are model instances by default; for other rows, e.g. of values_list(),
+    pass ``key``, a function returning the tuple of ordering values of a row.
+    """
+
+    def __init__(self, queryset, ordering, per_page, key=None):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        opts = queryset.model._meta
+        self.fields = [
+            (opts.pk if name.lstrip('-') == 'pk' else opts.get_field(name.lstrip('-')), name.startswith('-'))
+            for name in self.ordering
+        ]
+        last_field = self.fields[-1][0]
+        if not (last_field.primary_key or last_field.unique):
+            raise ValueError('A keyset ordering must end with a unique field.')
+        self.key = key or self._instance_key
+
+    def _instance_key(self, obj):
+        if not isinstance(obj, Model):
+            raise TypeError('Pass key= to paginate rows that are not model instances.')
+        return tuple(getattr(obj, field.attname) for field, _ in self.fields)
+
+    def encode_cursor(self, row, direction):
+        payload = {'o': list(self.ordering), 'd': direction, 'k': [_encode_value(value) for value in self.key(row)]}
+        return signing.dumps(payload, salt=SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        """Return (key values, direction) of ``cursor``; raise InvalidCursor if it is not one of ours."""
+        try:
+            payload = signing.loads(cursor, salt=SALT)
+            if payload['o'] != list(self.ordering) or payload['d'] not in (NEXT, PREVIOUS):
+                raise ValueError
+            if len(payload['k']) != len(self.fields):
+                raise ValueError
+            values = [field.to_python(value) for (field, _), value in zip(self.fields, payload['k'])]
+        except (signing.BadSignature, ValueError, TypeError, KeyError) as exc:
+            raise InvalidCursor('Invalid cursor.') from exc
+        return values, payload['d']
+
+    def _seek(self, values, backwards):
+        """Rows after ``values`` in the ordering, or before them with ``backwards``."""
+        condition = None
+        for (field, descending), value in reversed(list(zip(self.fields, values))):
+            lookup = 'lt' if descending != backwards else 'gt'
+            strictly = Q(**{f'{field.attname}__{lookup}': value})
+            condition = strictly if condition is None else strictly | (Q(**{field.attname: value}) & condition)
+        if len(self.fields) == 1:
+            return condition
+        # The redundant bound on the first field lets the database seek the index instead of scanning it.
+        (first, descending), value = self.fields[0], values[0]
+        return Q(**{f'{first.attname}__{"lte" if descending != backwards else "gte"}': value}) & condition
+
+    def _query(self, cursor):
+        if not cursor:
+            return self.queryset.order_by(*self.ordering), NEXT, False
+        values, direction = self.decode_cursor(cursor)
+        backwards = direction == PREVIOUS
+        ordering = [
+            (name[1:] if name.startswith('-') else f'-{name}') if backwards else name for name in self.ordering
+        ]
+        return self.queryset.filter(self._seek(values, backwards)).order_by(*ordering), direction, True
+
+    def _page(self, rows, direction, has_cursor):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+            # Going back from a page, there is always a next one: the page we came from.
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = has_cursor, more
+        if not rows:
+            return KeysetPage([])
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], NEXT) if has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], PREVIOUS) if has_previous else None,
+        )
+
+    def page(self, cursor=None):
+        """Return the page at ``cursor``, or the first page without one."""
+        queryset, direction, has_cursor = self._query(cursor)
+        return self._page(list(queryset[:self.per_page + 1]), direction, has_cursor)
+
+    async def apage(self, cursor=None):
+        """Async version of page()."""
+        queryset, direction, has_cursor = self._query(cursor)
+        return self._page([row async for row in queryset[:self.per_page + 1]], direction, has_cursor)
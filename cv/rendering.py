@@ -0,0 +1,257 @@
+"""
+HTML and PDF rendering of CVs with an on-disk cache.
+
+A CV is rendered from its serialized form (see cv.cache) with the cv/cv.html
+template, and PDFs are produced from that HTML with WeasyPrint, which is only
+imported when a PDF is first rendered and is not needed for HTML; it needs the
+Pango system libraries, see the README. Renders are stored under
+CV_RENDER_CACHE_DIR, named after a hash of the serialized CV, its sections and
+the template, so any change to one of them yields a new file and an unchanged
+CV is never rendered twice. Files are touched when served and the least
+recently used ones are evicted once the cache outgrows CV_RENDER_CACHE_MAX_SIZE.
+
+render_many() renders the missing files of many CVs in a process pool, e.g.
+for zip downloads. Zips take too long for a request, and the pool must not be
+started from a web worker, so the render_zip task writes them under ZIP_DIR of
+the cache directory, where the zip view serves them; they are deleted after
+ZIP_MAX_AGE seconds.
+"""
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.template.loader import get_template, render_to_string
+
+from cv import cache
+from tasks.models import Task
+from tasks.queue import task
+
+FORMATS = ('html', 'pdf')
+CONTENT_TYPES = {
+    'html': 'text/html; charset=utf-8',
+    'pdf': 'application/pdf',
+}
+TEMPLATE_NAME = 'cv/cv.html'
+# Bump to drop every cached render after changing how CVs are rendered.
+RENDER_VERSION = 1
+# Evict down to this share of CV_RENDER_CACHE_MAX_SIZE, so eviction does not run on every write.
+EVICT_TO = 0.9
+# Check the cache size every this many writes of this process.
+EVICT_INTERVAL = 50
+# Zips are kept apart from the renders, which evict() finds in two-character directories.
+ZIP_DIR = 'zips'
+ZIP_MAX_AGE = 24 * 60 * 60
+
+_writes = 0
+_writes_lock = threading.Lock()
+
+
+@functools.lru_cache()
+def _template_digest():
+    return hashlib.sha256(get_template(TEMPLATE_NAME).template.source.encode()).hexdigest()
+
+
+def content_hash(data, format):
+    """Return the cache key of CV ``data`` (as returned by serialize_cv()) rendered as ``format``."""
+    payload = json.dumps([RENDER_VERSION, format, _template_digest(), data], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_cache_dir():
+    return Path(settings.CV_RENDER_CACHE_DIR)
+
+
+def cache_path(digest, format):
+    return get_cache_dir() / digest[:2] / f'{digest}.{format}'
+
+
+def render_html(data):
+    full_name = ' '.join(name for name in (data['first_name'], data['last_name']) if name)
+    return render_to_string(TEMPLATE_NAME, {'cv': data, 'full_name': full_name})
+
+
+def render_pdf(data):
+    try:
+        from weasyprint import HTML
+    except (ImportError, OSError) as exc:
+        # OSError: WeasyPrint is installed but the Pango libraries it loads are not.
+        raise ImproperlyConfigured(f'Rendering CVs as PDF requires WeasyPrint and its system libraries: {exc}') from exc
+    return HTML(string=render_html(data)).write_pdf()
+
+
+def render(data, format):
+    if format == 'html':
+        return render_html(data).encode()
+    if format == 'pdf':
+        return render_pdf(data)
+    raise ValueError(f'Unsupported render format {format!r}, expected one of {", ".join(FORMATS)}.')
+
+
+@contextmanager
+def _atomic_file(path):
+    """Yield a binary file replacing ``path`` when the block succeeds, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            yield file
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _write(path, content):
+    with _atomic_file(path) as file:
+        file.write(content)
+
+
+def _touch(path):
+    """Mark ``path`` as used; return False if it has been evicted meanwhile."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _render_to_file(data, format, path):
+    _write(path, render(data, format))
+    return path
+
+
+def _wrote(count):
+    global _writes
+    with _writes_lock:
+        _writes += count
+        due = _writes >= EVICT_INTERVAL
+        if due:
+            _writes = 0
+    if due:
+        evict()
+
+
+def evict(max_size=None):
+    """Delete the least recently used renders until the cache is below EVICT_TO of its maximum size."""
+    max_size = settings.CV_RENDER_CACHE_MAX_SIZE if max_size is None else max_size
+    files = []
+    total = 0
+    for directory in get_cache_dir().glob('??'):
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.startswith('.tmp-'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+    if total <= max_size:
+        return 0
+    evicted = 0
+    for _, size, path in sorted(files):
+        if total <= max_size * EVICT_TO:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        evicted += 1
+    return evicted
+
+
+def get_rendered(pk, format):
+    """Return the path of CV ``pk`` rendered as ``format`` and its content hash, or None if there is no such CV."""
+    data = cache.get_serialized_cv(pk)
+    if data is None:
+        return None
+    digest = content_hash(data, format)
+    path = cache_path(digest, format)
+    if not _touch(path):
+        _render_to_file(data, format, path)
+        _wrote(1)
+    return path, digest
+
+
+def _init_worker():
+    # Workers started with "spawn" rather than "fork" import the project from scratch.
+    if not apps.ready:
+        django.setup()
+
+
+def render_many(pks, format, processes=None):
+    """
+    Return a mapping of pk -> rendered file path for the existing CVs among ``pks``.
+
+    Renders missing from the cache are produced in a pool of ``processes``
+    processes, one per CPU by default.
+    """
+    serialized = cache.get_serialized_cvs(list(pks))
+    paths, missing = {}, []
+    for pk, data in serialized.items():
+        path = cache_path(content_hash(data, format), format)
+        paths[pk] = path
+        if not _touch(path):
+            missing.append((data, format, path))
+    if len(missing) == 1:
+        _render_to_file(*missing[0])
+    elif missing:
+        # Forked workers must not share the database connections of this process.
+        connections.close_all()
+        processes = min(processes or os.cpu_count() or 1, len(missing))
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+            list(pool.map(_render_to_file, *zip(*missing), chunksize=max(1, len(missing) // (processes * 4))))
+    if missing:
+        _wrote(len(missing))
+    return paths
+
+
+def write_zip(pks, format, file, processes=None):
+    """Write the renders of the CVs in ``pks`` to ``file`` as a zip archive; return the number of CVs."""
+    paths = render_many(pks, format, processes=processes)
+    # PDFs are compressed already.
+    compression = zipfile.ZIP_STORED if format == 'pdf' else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(file, 'w', compression=compression) as archive:
+        for pk in dict.fromkeys(pks):
+            if pk in paths:
+                archive.write(paths[pk], f'cv-{pk}.{format}')
+    return len(paths)
+
+
+def zip_path(key, format):
+    return get_cache_dir() / ZIP_DIR / f'{key}.{format}.zip'
+
+
+def _delete_old_zips():
+    expired = time.time() - ZIP_MAX_AGE
+    for path in (get_cache_dir() / ZIP_DIR).glob('*.zip'):
+        try:
+            if path.stat().st_mtime < expired:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+@task(name='cv.rendering.render_zip')
+def render_zip(pks, format, key):
+    """Write the zip of the CVs in ``pks`` to zip_path(key, format), see write_zip()."""
+    _delete_old_zips()
+    with _atomic_file(zip_path(key, format)) as file:
+        write_zip(pks, format, file)
+
+
+def zip_pending(key):
+    """Return whether the render_zip task writing the zip ``key`` is still queued or running."""
+    return Task.objects.filter(name=render_zip.task_name, kwargs__key=key).exclude(
+        status=Task.Status.FAILED,
+    ).exists()
@@ -0,0 +1,181 @@
+"""
+Full-text search over CvContent.
+
+CVs are tokenized into an inverted index (SearchIndexEntry rows keyed by term)
+which is kept up to date by the signal handlers in cv.signals. A query only
+touches the postings of its own terms, so lookups use the (term, cv) index
+instead of scanning every CV row.
+"""
+import math
+import re
+from collections import Counter
+
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, When
+
+from cv.models import CvContent, SearchIndexEntry
+
+# Matches in the title count more than matches in the free text summary.
+FIELD_WEIGHTS = {
+    'title': 5,
+    'skills': 4,
+    'location': 3,
+    'summary': 1,
+}
+
+MAX_TERM_LENGTH = SearchIndexEntry._meta.get_field('term').max_length
+
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it', 'of', 'on', 'or', 'the',
+    'to', 'with',
+})
+
+# Keep characters that are significant in skill names, e.g. "c++", "c#" or "node.js".
+TOKEN_RE = re.compile(r'[^\W_][\w+#.]*')
+
+
+def tokenize(text):
+    """Split text into lower-cased index terms."""
+    if not text:
+        return []
+    terms = []
+    for token in TOKEN_RE.findall(text.lower()):
+        token = token.rstrip('.')[:MAX_TERM_LENGTH]
+        if token and token not in STOP_WORDS:
+            terms.append(token)
+    return terms
+
+
+def build_postings(cv):
+    """Return a mapping of term -> weight for a single CV."""
+    weights = Counter()
+    for field, field_weight in FIELD_WEIGHTS.items():
+        for term in tokenize(getattr(cv, field)):
+            weights[term] += field_weight
+    return weights
+
+
+def index_cvs(cvs):
+    """(Re)index the given CVs from their stored, locked rows, replacing any postings they already have."""
+    pks = [cv.pk for cv in cvs if cv.pk is not None]
+    if not pks:
+        return 0
+    with transaction.atomic():
+        entries = [
+            SearchIndexEntry(cv_id=cv.pk, term=term, weight=weight)
+            for cv in CvContent.objects.filter(pk__in=pks).lock(*FIELD_WEIGHTS)
+            for term, weight in build_postings(cv).items()
+        ]
+        SearchIndexEntry.objects.filter(cv_id__in=pks).delete()
+        SearchIndexEntry.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+def index_cv(cv):
+    return index_cvs([cv])
+
+
+def rebuild_index(batch_size=1000, progress=None):
+    """
+    Rebuild the index from CvContent in batches of ``batch_size`` CVs.
+
+    Each batch replaces the postings of its CVs in one transaction, and drops
+    those of CVs in its pk range that no longer exist, so searches keep
+    working during the rebuild and an interrupted rebuild leaves a usable index.
+    """
+    queryset = CvContent.objects.only('pk').order_by('pk')
+    indexed = 0
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic():
+            SearchIndexEntry.objects.filter(cv_id__gt=last_pk, cv_id__lte=batch[-1].pk).exclude(
+                cv_id__in=[cv.pk for cv in batch],
+            ).delete()
+            index_cvs(batch)
+        indexed += len(batch)
+        last_pk = batch[-1].pk
+        if progress is not None:
+            progress(indexed)
+    SearchIndexEntry.objects.filter(cv_id__gt=last_pk).delete()
+    return indexed
+
+
+def _idf(frequencies, terms, total):
+    return {term: math.log(1 + total / (1 + frequencies.get(term, 0))) for term in terms}
+
+
+def _frequencies(terms):
+    return SearchIndexEntry.objects.filter(term__in=terms).values_list('term').annotate(df=Count('cv_id'))
+
+
+def _ranked(terms, idf, match_all):
+    """Return cv_id/score rows for the CVs matching ``terms``, best first."""
+    if not terms:
+        return SearchIndexEntry.objects.none().values('cv_id')
+    score = Sum(
+        Case(
+            *[When(term=term, then=F('weight') * idf[term]) for term in terms],
+            output_field=FloatField(),
+        )
+    )
+    ranked = (
+        SearchIndexEntry.objects.filter(term__in=terms)
+        .values('cv_id')
+        .annotate(score=score, matched=Count('term'))
+        .order_by('-score', 'cv_id')
+    )
+    if match_all:
+        ranked = ranked.filter(matched=len(terms))
+    return ranked
+
+
+def _with_scores(rows, cvs):
+    results = []
+    for row in rows:
+        cv = cvs.get(row['cv_id'])
+        if cv is not None:
+            cv.search_score = row['score']
+            results.append(cv)
+    return results
+
+
+def search(query, page=1, per_page=20, match_all=True):
+    """
+    Return a Page of CvContent objects matching ``query``, best matches first.
+
+    Each CV gets a ``search_score`` attribute: the sum of its term weights scaled
+    by the inverse document frequency of each term. With ``match_all`` a CV must
+    contain every query term, otherwise any term is enough.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    idf = {}
+    if terms:
+        idf = _idf(dict(_frequencies(terms)), terms, CvContent.objects.count())
+
+    page = Paginator(_ranked(terms, idf, match_all), per_page).get_page(page)
+    rows = list(page.object_list)
+    page.object_list = _with_scores(rows, CvContent.objects.in_bulk([row['cv_id'] for row in rows]))
+    return page
+
+
+async def asearch(query, page=1, per_page=20, match_all=True):
+    """Async version of search(), using the async queryset API."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    idf = {}
+    if terms:
+        frequencies = {term: df async for term, df in _frequencies(terms)}
+        idf = _idf(frequencies, terms, await CvContent.objects.acount())
+
+    ranked = _ranked(terms, idf, match_all)
+    paginator = Paginator(ranked, per_page)
+    # Paginator.count would run a synchronous query.
+    paginator.count = await ranked.acount()
+    page = paginator.get_page(page)
+    rows = [row async for row in page.object_list]
+    cvs = {cv.pk: cv async for cv in CvContent.objects.filter(pk__in=[row['cv_id'] for row in rows])}
+    page.object_list = _with_scores(rows, cvs)
+    return page
@@ -0,0 +1,38 @@
+"""Plain-dict representations of CVs, shared by the export and API code."""
+
+CV_FIELDS = (
+    'first_name', 'last_name', 'email', 'title', 'summary', 'location', 'linkedin_url', 'github_url', 'skills',
+)
+EDUCATION_FIELDS = ('school', 'degree', 'field_of_study', 'start_date', 'end_date')
+WORK_EXPERIENCE_FIELDS = ('company', 'title', 'start_date', 'end_date', 'currently_working')
+CERTIFICATE_FIELDS = ('name', 'organisation', 'issue_date', 'credential_url')
+
+# CvContent related name -> serialized section fields
+SECTION_FIELDS = {
+    'educations': EDUCATION_FIELDS,
+    'work_experiences': WORK_EXPERIENCE_FIELDS,
+    'certificates': CERTIFICATE_FIELDS,
+}
+
+
+def _value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def serialize_section(instance, fields):
+    return {'id': instance.pk, **{name: _value(getattr(instance, name)) for name in fields}}
+
+
+def serialize_cv(cv):
+    """
+    Return a JSON-compatible dict for ``cv`` and its sections.
+
+    Load CVs with CvContent.objects.with_sections() to avoid queries per CV.
+    """
+    data = {'id': cv.pk, 'user_id': cv.user_id}
+    data.update((name, getattr(cv, name)) for name in CV_FIELDS)
+    data.update(
+        (name, [serialize_section(section, fields) for section in getattr(cv, name).all()])
+        for name, fields in SECTION_FIELDS.items()
+    )
+    return data
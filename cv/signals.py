@@ -0,0 +1,120 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from cv import cache, dedup, history, search, skills
+from cv.models import Certificate, CvContent, Education, WorkExperience
+
+
+@receiver(post_save, sender=CvContent, dispatch_uid='cv_update_search_index')
+def update_search_index(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(search.FIELD_WEIGHTS):
+        return
+    search.index_cv(instance)
+
+
+@receiver(post_save, sender=CvContent, dispatch_uid='cv_sync_skills')
+def sync_skills(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and 'skills' not in update_fields:
+        return
+    skills.sync_cv_skill(instance)
+
+
+@receiver(post_save, sender=CvContent, dispatch_uid='cv_update_blocking_keys')
+def update_blocking_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(dedup.KEY_FIELDS):
+        return
+    dedup.index_cv(instance)
+
+
+def _invalidate_on_commit(pks):
+    pks = list(pks)
+    if pks:
+        transaction.on_commit(lambda: cache.invalidate(pks))
+
+
+@receiver(post_save, sender=CvContent, dispatch_uid='cv_invalidate_cache')
+@receiver(post_delete, sender=CvContent, dispatch_uid='cv_invalidate_cache_on_delete')
+def invalidate_cv_cache(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _invalidate_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Education, dispatch_uid='cv_invalidate_cache_education')
+@receiver(post_save, sender=WorkExperience, dispatch_uid='cv_invalidate_cache_work_experience')
+@receiver(post_save, sender=Certificate, dispatch_uid='cv_invalidate_cache_certificate')
+@receiver(post_delete, sender=Education, dispatch_uid='cv_invalidate_cache_education_on_delete')
+@receiver(post_delete, sender=WorkExperience, dispatch_uid='cv_invalidate_cache_work_experience_on_delete')
+@receiver(post_delete, sender=Certificate, dispatch_uid='cv_invalidate_cache_certificate_on_delete')
+def invalidate_section_cv_cache(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _invalidate_on_commit([instance.cv_id])
+
+
+@receiver(post_save, sender=CvContent, dispatch_uid='cv_update_matching_index')
+@receiver(post_delete, sender=CvContent, dispatch_uid='cv_update_matching_index_on_delete')
+@receiver(post_save, sender=WorkExperience, dispatch_uid='cv_update_matching_index_work_experience')
+@receiver(post_delete, sender=WorkExperience, dispatch_uid='cv_update_matching_index_work_experience_on_delete')
+def update_matching_index(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # cv.matching and cv.summaries import NumPy, which processes that never change a CV don't need.
+    from cv import matching
+
+    pks = [instance.pk if sender is CvContent else instance.cv_id]
+    transaction.on_commit(lambda: matching.mark_stale(pks))
+
+
+SUMMARY_CV_FIELDS = {'first_name', 'last_name', 'title', 'location'}
+
+
+@receiver(post_save, sender=CvContent, dispatch_uid='cv_refresh_summary')
+def refresh_summary(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if not created and update_fields is not None and not set(update_fields) & SUMMARY_CV_FIELDS:
+        return
+    from cv import summaries
+
+    pk = instance.pk
+    transaction.on_commit(lambda: summaries.refresh_summary(pk))
+
+
+@receiver(post_save, sender=Education, dispatch_uid='cv_refresh_summary_education')
+@receiver(post_save, sender=WorkExperience, dispatch_uid='cv_refresh_summary_work_experience')
+@receiver(post_save, sender=Certificate, dispatch_uid='cv_refresh_summary_certificate')
+@receiver(post_delete, sender=Education, dispatch_uid='cv_refresh_summary_education_on_delete')
+@receiver(post_delete, sender=WorkExperience, dispatch_uid='cv_refresh_summary_work_experience_on_delete')
+@receiver(post_delete, sender=Certificate, dispatch_uid='cv_refresh_summary_certificate_on_delete')
+def refresh_section_summary(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from cv import summaries
+
+    # After the commit, as sections are also deleted while their CV (and its summary) is being deleted.
+    cv_id = instance.cv_id
+    transaction.on_commit(lambda: summaries.refresh_summary(cv_id))
+
+
+@receiver(post_save, sender=CvContent, dispatch_uid='cv_record_history')
+@receiver(post_delete, sender=CvContent, dispatch_uid='cv_record_history_on_delete')
+@receiver(post_save, sender=Education, dispatch_uid='cv_record_history_education')
+@receiver(post_save, sender=WorkExperience, dispatch_uid='cv_record_history_work_experience')
+@receiver(post_save, sender=Certificate, dispatch_uid='cv_record_history_certificate')
+@receiver(post_delete, sender=Education, dispatch_uid='cv_record_history_education_on_delete')
+@receiver(post_delete, sender=WorkExperience, dispatch_uid='cv_record_history_work_experience_on_delete')
+@receiver(post_delete, sender=Certificate, dispatch_uid='cv_record_history_certificate_on_delete')
+def record_history(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # From the committed rows, so the changes of one transaction make one revision.
+    pk = instance.pk if sender is CvContent else instance.cv_id
+    transaction.on_commit(lambda: history.record_cv(pk))
@@ -0,0 +1,60 @@
+"""
+Keeps the normalized Skill/CvSkill tables in sync with CvContent.skills.
+
+CvContent.skills stays the editable, comma separated input; every save splits
+it into CvSkill rows so skill filters and counts run as indexed joins. The rows
+are rebuilt from the stored CV, locked, so concurrent saves cannot interleave.
+"""
+from django.db import transaction
+
+from cv.models import CvContent, CvSkill, Skill, normalize_skill_name
+
+MAX_SKILL_LENGTH = Skill._meta.get_field('name').max_length
+
+
+def parse_skills(text):
+    """Split a comma separated skills string into (name, normalized_name) pairs, dropping duplicates."""
+    skills = {}
+    for raw in (text or '').split(','):
+        name = ' '.join(raw.split())[:MAX_SKILL_LENGTH]
+        normalized = normalize_skill_name(name)
+        if normalized and normalized not in skills:
+            skills[normalized] = name
+    return [(name, normalized) for normalized, name in skills.items()]
+
+
+def get_or_create_skills(pairs):
+    """Return a mapping of normalized_name -> Skill, creating the missing ones in bulk."""
+    names = {normalized: name for name, normalized in pairs}
+    existing = Skill.objects.in_bulk(names, field_name='normalized_name')
+    missing = names.keys() - existing.keys()
+    if missing:
+        Skill.objects.bulk_create(
+            [Skill(name=names[normalized], normalized_name=normalized) for normalized in missing],
+            ignore_conflicts=True,
+        )
+        existing.update(Skill.objects.in_bulk(missing, field_name='normalized_name'))
+    return existing
+
+
+def sync_cv_skills(cvs):
+    """Replace the CvSkill rows of the given CVs with the contents of their stored skills field."""
+    pks = [cv.pk for cv in cvs if cv.pk is not None]
+    if not pks:
+        return
+    with transaction.atomic():
+        parsed = {cv.pk: parse_skills(cv.skills) for cv in CvContent.objects.filter(pk__in=pks).lock('skills')}
+        skills = get_or_create_skills(pair for pairs in parsed.values() for pair in pairs)
+        CvSkill.objects.filter(cv_id__in=parsed).delete()
+        CvSkill.objects.bulk_create(
+            [
+                CvSkill(cv_id=cv_id, skill=skills[normalized], position=position)
+                for cv_id, pairs in parsed.items()
+                for position, (_, normalized) in enumerate(pairs)
+            ],
+            batch_size=1000,
+        )
+
+
+def sync_cv_skill(cv):
+    sync_cv_skills([cv])
@@ -0,0 +1,143 @@
+"""
+Keeps CvSummary, the denormalized listing data of every CV, in sync with the CVs.
+
+Summaries are recomputed from a CV and its sections in bulk: the signal handlers
+in cv.signals refresh the summary of a CV once a transaction that changed it
+commits, and the importer refreshes them within its own transactions.
+reconcile() compares every stored summary with a freshly computed one, to
+backfill missing summaries and repair outdated ones or only to report them.
+Both read from the primary database: refreshes run in a transaction, and
+reconcile() would report the changes a lagging replica misses as drift.
+"""
+import datetime
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.db import transaction
+
+from cv.dates import experience_days, job_span
+from cv.models import CvContent, CvSummary
+from joinit.routers import use_primary
+
+# Fields compared by reconcile(); experience_days is compared as of the same day instead.
+COMPARED_FIELDS = [
+    'full_name', 'title', 'location', 'experience_ongoing', 'current_employer', 'latest_degree', 'certificate_count',
+]
+MAX_REPORTED_PKS = 100
+
+
+def _latest(instances, *dates):
+    def key(instance):
+        return (*(getattr(instance, name) or datetime.date.min for name in dates), instance.pk)
+    return max(instances, key=key, default=None)
+
+
+def build_summaries(cvs, today=None):
+    """Return unsaved summaries of ``cvs``, which should have their sections prefetched (see with_sections())."""
+    today = today or datetime.date.today()
+    cvs = list(cvs)
+    rows, starts, ends = [], [], []
+    for row, cv in enumerate(cvs):
+        for job in cv.work_experiences.all():
+            span = job_span(job.start_date, job.end_date, job.currently_working, today)
+            if span is not None:
+                rows.append(row)
+                starts.append(span[0])
+                ends.append(span[1])
+    days = experience_days(
+        len(cvs), np.array(rows, dtype=np.int64), np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64),
+    )
+
+    summaries = []
+    for row, cv in enumerate(cvs):
+        jobs = cv.work_experiences.all()
+        current_job = _latest([job for job in jobs if job.currently_working], 'start_date')
+        latest_education = _latest([education for education in cv.educations.all() if education.degree],
+                                   'end_date', 'start_date')
+        summaries.append(CvSummary(
+            cv=cv,
+            full_name=' '.join(name for name in (cv.first_name, cv.last_name) if name),
+            title=cv.title,
+            location=cv.location,
+            experience_days=int(days[row]),
+            experience_ongoing=any(job.currently_working and job.start_date for job in jobs),
+            computed_on=today,
+            current_employer=current_job.company if current_job else None,
+            latest_degree=latest_education.degree if latest_education else None,
+            certificate_count=len(cv.certificates.all()),
+        ))
+    return summaries
+
+
+@transaction.atomic
+def refresh_summaries(pks):
+    """Recompute the summaries of the CVs in ``pks``; summaries of deleted CVs are dropped."""
+    pks = set(pks)
+    if not pks:
+        return
+    # Concurrent refreshes of a CV wait for each other, and the last one reads the latest sections.
+    CvContent.objects.filter(pk__in=pks).lock()
+    summaries = build_summaries(CvContent.objects.with_sections().filter(pk__in=pks))
+    CvSummary.objects.filter(cv_id__in=pks).delete()
+    CvSummary.objects.bulk_create(summaries, batch_size=1000)
+
+
+def refresh_summary(pk):
+    refresh_summaries([pk])
+
+
+def _differs(stored, computed):
+    if stored is None:
+        return True
+    if any(getattr(stored, name) != getattr(computed, name) for name in COMPARED_FIELDS):
+        return True
+    return stored.experience_days_on(computed.computed_on) != computed.experience_days
+
+
+@dataclass
+class ReconcileResult:
+    checked: int = 0
+    missing: int = 0
+    outdated: int = 0
+    # Up to MAX_REPORTED_PKS CV ids of missing or outdated summaries.
+    pks: list = field(default_factory=list)
+
+    @property
+    def consistent(self):
+        return not self.missing and not self.outdated
+
+
+def reconcile(batch_size=1000, fix=True, progress=None):
+    """
+    Compare the stored summary of every CV with a freshly computed one and return a ReconcileResult.
+
+    With ``fix`` missing and outdated summaries are rewritten, otherwise they are
+    only counted. ``progress`` is called with the result after each batch.
+    """
+    result = ReconcileResult()
+    queryset = CvContent.objects.with_sections().order_by('pk')
+    last_pk = 0
+    while True:
+        with use_primary():
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            stored = CvSummary.objects.in_bulk([cv.pk for cv in batch])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        wrong = []
+        for summary in build_summaries(batch):
+            current = stored.get(summary.cv_id)
+            if _differs(current, summary):
+                wrong.append(summary)
+                if current is None:
+                    result.missing += 1
+                else:
+                    result.outdated += 1
+                if len(result.pks) < MAX_REPORTED_PKS:
+                    result.pks.append(summary.cv_id)
+        if fix and wrong:
+            refresh_summaries(summary.cv_id for summary in wrong)
+        result.checked += len(batch)
+        if progress is not None:
+            progress(result)
+    return result
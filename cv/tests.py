@@ -1,3 +1,949 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import re
+import tempfile
+import uuid
+import zipfile
+from urllib.parse import quote
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management import CommandError, call_command
+from django.db import connection, router, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.connection import ConnectionDoesNotExist
+
+from benchmarks import data
+from cv import cache, dates, dedup, exporters, history, importers, matching, rendering, search, skills, summaries
+from cv.models import (
+    CvBlockingKey, CvContent, CvRevision, CvSkill, CvSummary, Education, SearchIndexEntry, Skill, WorkExperience,
+)
+from cv.pagination import InvalidCursor, KeysetPaginator
+from tasks.models import Task
+from tasks.worker import Worker
+from users.models import User
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plan assertions are written against the SQLite EXPLAIN format.')
+class QueryPlanTests(TestCase):
+    """Guard the CV query patterns against regressing to full table scans."""
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf'USING (COVERING )?INDEX {index_name}\b', msg=plan)
+
+    def assertNoFullScan(self, queryset):
+        plan = queryset.explain()
+        # "SCAN table USING INDEX ..." walks an index, a bare "SCAN table" reads every row.
+        self.assertIsNone(re.search(r'(?m)\bSCAN (?!CONSTANT ROW)\S+$', plan), msg=plan)
+
+    def test_cv_location(self):
+        self.assertUsesIndex(CvContent.objects.filter(location='Berlin'), 'cv_location_idx')
+
+    def test_cv_title(self):
+        self.assertUsesIndex(CvContent.objects.filter(title='Developer'), 'cv_title_idx')
+
+    def test_cv_name(self):
+        self.assertUsesIndex(CvContent.objects.filter(last_name='Smith'), 'cv_name_idx')
+        self.assertUsesIndex(CvContent.objects.filter(last_name='Smith', first_name='Anna'), 'cv_name_idx')
+
+    def test_cv_email_case_insensitive(self):
+        self.assertUsesIndex(CvContent.objects.by_email('Anna@Example.com'), 'cv_email_lower_idx')
+
+    def test_cv_keyset_pagination(self):
+        self.assertNoFullScan(CvContent.objects.filter(pk__gt=100).order_by('pk')[:20])
+
+    def test_blocking_keys(self):
+        self.assertUsesIndex(CvBlockingKey.objects.filter(key__in=['em:anna', 'gh:anna']), 'cv_blocking_key_cv_idx')
+
+    def test_summary_location(self):
+        self.assertUsesIndex(CvSummary.objects.filter(location='Berlin').order_by('cv_id'), 'cv_summary_location_idx')
+        self.assertNotIn('TEMP B-TREE', CvSummary.objects.filter(location='Berlin').order_by('cv_id').explain())
+
+    def test_work_experience_company(self):
+        self.assertUsesIndex(WorkExperience.objects.filter(company='ACME'), 'cv_work_company_idx')
+
+    def test_work_experience_current_employer(self):
+        self.assertUsesIndex(
+            WorkExperience.objects.filter(company='ACME', currently_working=True), 'cv_work_current_company_idx',
+        )
+
+    def test_work_experience_date_range(self):
+        self.assertUsesIndex(
+            WorkExperience.objects.filter(
+                start_date__gte=datetime.date(2020, 1, 1), end_date__lte=datetime.date(2022, 1, 1),
+            ),
+            'cv_work_dates_idx',
+        )
+
+    def test_education_date_range(self):
+        self.assertUsesIndex(
+            Education.objects.filter(start_date__range=(datetime.date(2010, 1, 1), datetime.date(2015, 1, 1))),
+            'cv_education_dates_idx',
+        )
+
+    def test_search_terms(self):
+        self.assertUsesIndex(SearchIndexEntry.objects.filter(term__in=['python', 'django']), 'cv_search_term_cv_idx')
+        ranked = search._ranked(['python', 'django'], {'python': 1.0, 'django': 1.0}, match_all=True)
+        self.assertNoFullScan(ranked)
+
+    def test_user_keyset_pagination(self):
+        paginator = KeysetPaginator(User.objects.all(), ('-date_joined', '-pk'), 20)
+        seek = paginator._seek([datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc), 10], backwards=False)
+        self.assertUsesIndex(User.objects.filter(seek).order_by('-date_joined', '-pk'), 'user_date_joined_idx')
+
+    def test_skill_filters(self):
+        self.assertNoFullScan(CvContent.objects.with_all_skills(['Python', 'Django']))
+        self.assertNoFullScan(CvContent.objects.with_any_skills(['Python', 'Django']))
+
+
+class QueryCountTests(TestCase):
+    """The CV endpoints run a fixed number of queries, whatever the number of CVs they return."""
+
+    @classmethod
+    def setUpTestData(cls):
+        data.generate(30)
+        cls.staff = User.objects.create_user(
+            'staff@example.com', 'password', username='staff@example.com', is_staff=True,
+        )
+
+    def setUp(self):
+        cache.get_cache().clear()
+        # Loading the session and the staff user takes two queries in every request.
+        self.client.force_login(self.staff)
+
+    def test_list(self):
+        for per_page in (5, 20):
+            with self.assertNumQueries(8):
+                self.client.get('/cv/', {'per_page': per_page})
+
+    def test_detail(self):
+        pk = CvContent.objects.values_list('pk', flat=True).first()
+        with self.assertNumQueries(6):
+            self.client.get(f'/cv/{pk}/')
+        with self.assertNumQueries(2):
+            self.client.get(f'/cv/{pk}/')
+
+    def test_summaries(self):
+        with self.assertNumQueries(4):
+            self.client.get('/cv/summaries/', {'per_page': 20})
+
+
+class CacheInvalidationTests(TestCase):
+    """Committed changes of a CV or of any of its sections show up in its cached serialization."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cv = CvContent.objects.create(title='Developer', summary='Summary')
+        cls.job = cls.cv.work_experiences.create(company='Acme')
+        cls.certificate = cls.cv.certificates.create(name='AWS', credential_url='https://example.com/aws')
+        cls.staff = User.objects.create_user(
+            'staff@example.com', 'password', username='staff@example.com', is_staff=True,
+        )
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client.force_login(self.staff)
+
+    def get(self):
+        return self.client.get(f'/cv/{self.cv.pk}/')
+
+    def test_changes_show_up(self):
+        self.assertEqual(self.get().json()['work_experiences'][0]['company'], 'Acme')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.job.company = 'Globex'
+            self.job.save()
+        self.assertEqual(self.get().json()['work_experiences'][0]['company'], 'Globex')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.certificate.delete()
+        self.assertEqual(self.get().json()['certificates'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cv.educations.create(school='TU Berlin', field_of_study='Computer Science')
+            self.cv.title = 'Manager'
+            self.cv.save()
+        data = self.get().json()
+        self.assertEqual((data['title'], len(data['educations'])), ('Manager', 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cv.delete()
+        self.assertEqual(self.get().status_code, 404)
+
+    def test_rollback(self):
+        self.get()
+        version = cache.get_versions([self.cv.pk])[self.cv.pk]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.cv.title = 'Manager'
+                self.cv.save()
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(cache.get_versions([self.cv.pk])[self.cv.pk], version)
+        self.assertEqual(self.get().json()['title'], 'Developer')
+
+
+class ReplicaTests(TransactionTestCase):
+    """Reads following a change go to the primary, which a lagging replica would answer with old rows."""
+
+    def setUp(self):
+        self.cv = CvContent.objects.create(title='Developer', summary='Summary')
+        cache.get_cache().clear()
+        matching._index = None
+        self.addCleanup(setattr, matching, '_index', None)
+        # Reads sent to a replica fail, as the alias is not configured.
+        patcher = mock.patch.object(router.routers[0], 'replicas', ['replica_0'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_replica_reads(self):
+        with self.assertRaises(ConnectionDoesNotExist):
+            CvContent.objects.count()
+
+    def test_cache_fill(self):
+        self.assertEqual(cache.get_serialized_cv(self.cv.pk)['title'], 'Developer')
+        cache.get_cache().clear()
+        self.assertEqual(async_to_sync(cache.aget_serialized_cv)(self.cv.pk)['title'], 'Developer')
+
+    def test_matching_index(self):
+        self.assertEqual(list(matching.get_index().cv_ids), [self.cv.pk])
+        matching.mark_stale([self.cv.pk])
+        self.assertEqual(len(matching.get_index()), 1)
+
+    def test_reconcile(self):
+        self.assertEqual(summaries.reconcile(fix=False).checked, 1)
+
+
+class AccessTests(TestCase):
+    """Every view returning CV data, skill names included, is staff only."""
+
+    PATHS = [
+        '/cv/', '/cv/{pk}/', '/cv/{pk}/history/', '/cv/{pk}/render/html/', '/cv/summaries/', '/cv/search/?q=python',
+        '/cv/match/?skills=Python', '/cv/export/', '/cv/cache-stats/',
+        '/cv/skills/', '/cv/async/', '/cv/async/{pk}/', '/cv/async/search/?q=python',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        data.generate(3)
+        cls.pk = CvContent.objects.values_list('pk', flat=True).first()
+
+    def setUp(self):
+        render_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(render_dir.cleanup)
+        render_settings = override_settings(CV_RENDER_CACHE_DIR=render_dir.name)
+        render_settings.enable()
+        self.addCleanup(render_settings.disable)
+
+    def get_all(self):
+        return {path: self.client.get(path.format(pk=self.pk)) for path in self.PATHS}
+
+    def test_anonymous(self):
+        for path, response in self.get_all().items():
+            with self.subTest(path=path):
+                self.assertEqual(response.status_code, 302)
+                self.assertTrue(response['Location'].startswith('/admin/login/?next=/cv/'))
+
+    def test_not_staff(self):
+        self.client.force_login(User.objects.create_user('user@example.com', 'password', username='user@example.com'))
+        for path, response in self.get_all().items():
+            with self.subTest(path=path):
+                self.assertEqual(response.status_code, 302)
+
+    def test_staff(self):
+        staff = User.objects.create_user('staff@example.com', 'password', username='staff@example.com', is_staff=True)
+        self.client.force_login(staff)
+        for path, response in self.get_all().items():
+            with self.subTest(path=path):
+                self.assertEqual(response.status_code, 200)
+
+
+class AsyncViewTests(TestCase):
+    """The async views answer like their sync versions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        data.generate(5)
+        cls.pk = CvContent.objects.values_list('pk', flat=True).first()
+        cls.staff = User.objects.create_user(
+            'staff@example.com', 'password', username='staff@example.com', is_staff=True,
+        )
+
+    def setUp(self):
+        cache.get_cache().clear()
+
+    async def test_responses(self):
+        # force_login() saves the session with sync queries.
+        await sync_to_async(self.client.force_login)(self.staff)
+        await sync_to_async(self.async_client.force_login)(self.staff)
+        for query in [
+            '', '{pk}/', '0/', '?per_page=2&page=2', '?per_page=2&page=9', '?per_page=2&cursor=', '?cursor=invalid',
+            'search/?q=python', 'search/?q=python&per_page=1&page=2',
+        ]:
+            with self.subTest(query=query):
+                expected = await sync_to_async(self.client.get)(f'/cv/{query.format(pk=self.pk)}')
+                response = await self.async_client.get(f'/cv/async/{query.format(pk=self.pk)}')
+                self.assertEqual(response.status_code, expected.status_code)
+                if expected['Content-Type'] == 'application/json':
+                    self.assertEqual(response.json(), expected.json())
+
+    async def test_staff_only(self):
+        paths = ['/cv/async/', f'/cv/async/{self.pk}/', '/cv/async/search/?q=python']
+        for path in paths:
+            with self.subTest(path=path):
+                response = await self.async_client.get(path)
+                self.assertEqual(response.status_code, 302)
+                self.assertEqual(response['Location'], f'/admin/login/?next={quote(path)}')
+        user = await sync_to_async(User.objects.create_user)(
+            'user@example.com', 'password', username='user@example.com',
+        )
+        await sync_to_async(self.async_client.force_login)(user)
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertEqual((await self.async_client.get(path)).status_code, 302)
+        self.assertEqual((await self.async_client.post('/cv/async/')).status_code, 302)
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        joined = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        # Several users per date_joined, so pages must break ties on the pk.
+        User.objects.bulk_create([
+            User(email=f'user{i}@example.com', username=f'user{i}', date_joined=joined + datetime.timedelta(
+                microseconds=i // 4,
+            ))
+            for i in range(23)
+        ])
+        cls.expected = list(User.objects.order_by('-date_joined', '-pk').values_list('pk', flat=True))
+
+    def test_forward_and_back(self):
+        paginator = KeysetPaginator(User.objects.all(), ('-date_joined', '-pk'), 5)
+        pages = [paginator.page()]
+        while pages[-1].has_next:
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([user.pk for page in pages for user in page], self.expected)
+        self.assertFalse(pages[0].has_previous)
+
+        page = pages[-1]
+        backwards = []
+        while page.has_previous:
+            page = paginator.page(page.previous_cursor)
+            backwards.insert(0, [user.pk for user in page])
+        self.assertEqual(backwards, [[user.pk for user in page] for page in pages[:-1]])
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(User.objects.all(), ('-date_joined', '-pk'), 5)
+        with self.assertRaises(InvalidCursor):
+            paginator.page('not-a-cursor')
+        # Cursors are only valid for the ordering they were made for.
+        cursor = KeysetPaginator(User.objects.all(), ('pk',), 5).page().next_cursor
+        with self.assertRaises(InvalidCursor):
+            paginator.page(cursor)
+
+
+@override_settings(CV_HISTORY_CHECKPOINT_INTERVAL=3)
+class HistoryTests(TestCase):
+    def save(self, instance):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+        return timezone.now()
+
+    def test_deltas_and_as_of(self):
+        cv = CvContent(title='Developer', summary='A long summary. ' * 100, location='Berlin')
+        created = self.save(cv)
+        education = Education(cv=cv, school='TU Berlin', field_of_study='Computer Science')
+        with_education = self.save(education)
+        education_pk = education.pk
+        versions = [created, with_education]
+        for number in range(4):
+            cv.location = f'City {number}'
+            versions.append(self.save(cv))
+        with self.captureOnCommitCallbacks(execute=True):
+            education.delete()
+        versions.append(timezone.now())
+
+        revisions = list(CvRevision.objects.filter(cv=cv).order_by('number'))
+        kinds = [revision.kind for revision in revisions]
+        self.assertEqual(kinds, ['checkpoint', 'delta', 'delta', 'checkpoint', 'delta', 'delta', 'checkpoint'])
+        self.assertEqual(revisions[-1].data['educations'], {})
+        # Deltas leave out the unchanged summary.
+        self.assertEqual(revisions[2].data, {'cv': {'location': 'City 0'}})
+        self.assertEqual(revisions[1].data['educations'][str(education_pk)]['school'], 'TU Berlin')
+
+        self.assertIsNone(history.as_of(cv.pk, created - datetime.timedelta(seconds=1)))
+        self.assertEqual(history.as_of(cv.pk, created)['educations'], [])
+        self.assertEqual(history.as_of(cv.pk, with_education)['educations'][0]['school'], 'TU Berlin')
+        self.assertEqual([history.as_of(cv.pk, when)['location'] for when in versions[2:6]], [
+            'City 0', 'City 1', 'City 2', 'City 3',
+        ])
+        self.assertEqual(history.as_of(cv.pk, versions[-1])['educations'], [])
+        self.assertEqual(history.as_of(cv.pk, versions[-1])['summary'], cv.summary)
+
+    def test_deleted_cv(self):
+        cv = CvContent(title='Developer', summary='Summary', location='Berlin')
+        saved = self.save(cv)
+        pk = cv.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            cv.delete()
+        self.assertIsNone(history.as_of(pk, timezone.now()))
+        self.assertEqual(history.as_of(pk, saved)['title'], 'Developer')
+
+        result = history.compact(timezone.now() + datetime.timedelta(seconds=1), purge_deleted=True)
+        self.assertEqual(result.purged, [pk])
+        self.assertFalse(CvRevision.objects.filter(cv_id=pk).exists())
+
+    def test_compact(self):
+        cv = CvContent(title='Developer', summary='Summary', location='Berlin')
+        versions = []
+        for number in range(5):
+            cv.location = f'City {number}'
+            versions.append(self.save(cv))
+        # Two days of history, five revisions on the first day.
+        day = datetime.timedelta(days=1)
+        CvRevision.objects.filter(cv=cv).update(created_at=versions[-1] - 2 * day)
+        cv.location = 'Paris'
+        latest = self.save(cv)
+
+        result = history.compact(latest - day, granularity=day.total_seconds())
+        self.assertEqual((result.revisions_before, result.revisions_after), (6, 2))
+        self.assertEqual(history.as_of(cv.pk, latest - day)['location'], 'City 4')
+        self.assertEqual(history.as_of(cv.pk, latest)['location'], 'Paris')
+        # Compacted history is left alone.
+        self.assertEqual(history.compact(latest - day, granularity=day.total_seconds()).cvs, 0)
+
+
+class SearchTests(TestCase):
+    def test_rebuild_index(self):
+        cvs = [
+            CvContent.objects.create(title='Python developer', summary='Django and Postgres', location='Berlin'),
+            CvContent.objects.create(title='Java developer', summary='Spring', location='Paris'),
+            CvContent.objects.create(title='Designer', summary='Figma', location='Berlin'),
+        ]
+        SearchIndexEntry.objects.filter(cv=cvs[0]).delete()
+        SearchIndexEntry.objects.create(cv=cvs[1], term='outdated', weight=1)
+
+        self.assertEqual(search.rebuild_index(batch_size=2), 3)
+        self.assertFalse(SearchIndexEntry.objects.filter(term='outdated').exists())
+        self.assertEqual([cv.pk for cv in search.search('developer')], [cvs[0].pk, cvs[1].pk])
+        self.assertEqual([cv.pk for cv in search.search('python django')], [cvs[0].pk])
+
+    def test_index_stored_cv(self):
+        # A refresh running after a newer one must not index its outdated copy of the CV.
+        cv = CvContent.objects.create(title='Python developer', summary='Django')
+        outdated = CvContent.objects.get(pk=cv.pk)
+        cv.title = 'Rust developer'
+        cv.save()
+        search.index_cv(outdated)
+        self.assertEqual([result.pk for result in search.search('rust')], [cv.pk])
+        self.assertEqual(list(search.search('python')), [])
+
+
+class SummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ongoing, cls.outdated, cls.missing = (
+            CvContent.objects.create(title='Developer', summary='Summary') for _ in range(3)
+        )
+        cls.ongoing.work_experiences.create(
+            company='Acme', start_date=datetime.date(2020, 1, 1), currently_working=True,
+        )
+        summaries.refresh_summaries([cls.ongoing.pk, cls.outdated.pk])
+        CvSummary.objects.filter(cv=cls.outdated).update(title='Designer')
+        # Summaries of ongoing jobs computed on an earlier day are still up to date.
+        CvSummary.objects.filter(cv=cls.ongoing).update(
+            computed_on=F('computed_on') - datetime.timedelta(days=10),
+            experience_days=F('experience_days') - 10,
+        )
+
+    def test_reconcile(self):
+        progress = []
+        result = summaries.reconcile(batch_size=2, fix=False, progress=lambda result: progress.append(result.checked))
+        self.assertEqual((result.checked, result.missing, result.outdated), (3, 1, 1))
+        self.assertEqual(result.pks, [self.outdated.pk, self.missing.pk])
+        self.assertEqual((result.consistent, progress), (False, [2, 3]))
+        self.assertEqual(CvSummary.objects.count(), 2)
+
+        result = summaries.reconcile()
+        self.assertEqual((result.missing, result.outdated), (1, 1))
+        self.assertTrue(summaries.reconcile(fix=False).consistent)
+        self.assertEqual(CvSummary.objects.get(cv=self.outdated).title, 'Developer')
+
+    def test_command(self):
+        with self.assertRaisesMessage(CommandError, '1 missing and 1 outdated summaries'):
+            call_command('sync_cv_summaries', '--check', stdout=io.StringIO())
+        stdout = io.StringIO()
+        call_command('sync_cv_summaries', stdout=stdout)
+        self.assertIn('Checked 3 CVs', stdout.getvalue())
+        self.assertIn('wrote 1 missing and 1 outdated summaries', stdout.getvalue())
+        self.assertEqual(CvSummary.objects.count(), 3)
+        stdout = io.StringIO()
+        call_command('sync_cv_summaries', '--check', stdout=stdout)
+        self.assertIn('all summaries are up to date', stdout.getvalue())
+
+
+class SkillTests(TestCase):
+    def skill_names(self, cv):
+        return list(cv.cv_skills.order_by('position').values_list('skill__name', flat=True))
+
+    def test_parse_skills(self):
+        self.assertEqual(
+            skills.parse_skills(' Python ,django,, python, Node.js  '),
+            [('Python', 'python'), ('django', 'django'), ('Node.js', 'node.js')],
+        )
+
+    def test_sync_on_save(self):
+        cv = CvContent.objects.create(title='Developer', summary='Summary', skills='Python, Django')
+        other = CvContent.objects.create(title='Developer', summary='Summary', skills='python, SQL')
+        self.assertEqual(self.skill_names(cv), ['Python', 'Django'])
+        # Skills are shared by their normalized name, and keep the name they were first created with.
+        self.assertEqual(self.skill_names(other), ['Python', 'SQL'])
+        self.assertEqual(Skill.objects.count(), 3)
+
+        cv.skills = 'SQL'
+        cv.save(update_fields=['skills'])
+        self.assertEqual(self.skill_names(cv), ['SQL'])
+        self.assertEqual(
+            set(CvContent.objects.with_all_skills(['sql', 'PYTHON']).values_list('pk', flat=True)), {other.pk},
+        )
+        self.assertEqual(
+            set(CvContent.objects.with_any_skills(['sql', 'rust']).values_list('pk', flat=True)), {cv.pk, other.pk},
+        )
+
+
+class PopulateSkillsMigrationTests(TransactionTestCase):
+    before = [('cv', '0003_skills')]
+    after = [('cv', '0004_populate_skills')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_populate_skills(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        old_apps = executor.loader.project_state(self.before).apps
+        OldCvContent = old_apps.get_model('cv', 'CvContent')
+        # CVs still required a certificate then.
+        certificate = old_apps.get_model('cv', 'Certificate').objects.create(
+            name='Certificate', credential_url='https://example.com/certificate',
+        )
+        first, second = (
+            OldCvContent.objects.create(title='Developer', summary='Summary', skills=skills, certificate=certificate)
+            for skills in ('Python, django, python', 'Django ,  SQL')
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        new_apps = executor.loader.project_state(self.after).apps
+        NewCvSkill = new_apps.get_model('cv', 'CvSkill')
+        rows = NewCvSkill.objects.order_by('cv_id', 'position').values_list('cv_id', 'skill__normalized_name')
+        self.assertEqual(list(rows), [
+            (first.pk, 'python'), (first.pk, 'django'), (second.pk, 'django'), (second.pk, 'sql'),
+        ])
+
+
+class MergeCvSectionsMigrationTests(TransactionTestCase):
+    before = [('cv', '0006_section_cv')]
+    after = [('cv', '0008_remove_cv_section_fks')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_merge_cv_sections(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        old_apps = executor.loader.project_state(self.before).apps
+        OldCvContent = old_apps.get_model('cv', 'CvContent')
+        OldEducation = old_apps.get_model('cv', 'Education')
+        OldCertificate = old_apps.get_model('cv', 'Certificate')
+        OldWorkExperience = old_apps.get_model('cv', 'WorkExperience')
+
+        def create_cv(title, certificate, email=None, **sections):
+            return OldCvContent.objects.create(
+                title=title, summary='Summary', email=email, certificate=certificate, **sections,
+            ).pk
+
+        aws, azure, gcp = (
+            OldCertificate.objects.create(name=name, credential_url=f'https://example.com/{name}')
+            for name in ('AWS', 'Azure', 'GCP')
+        )
+        OldEducation.objects.create(school='Unreferenced', field_of_study='Physics')
+        # One candidate with two educations, stored as two rows; only the second one has an email.
+        first = create_cv('Developer', aws, education=OldEducation.objects.create(school='TUM', field_of_study='CS'))
+        keeper = create_cv(
+            'Developer', aws, email='jane@example.com',
+            education=OldEducation.objects.create(school='LMU', field_of_study='Physics'),
+        )
+        # Two candidates sharing a certificate.
+        designer = create_cv('Designer', azure)
+        writer = create_cv('Writer', azure)
+        # Rows that differ only in sections but have different emails are different candidates.
+        ann, bob = (
+            create_cv(
+                'Tester', gcp, email=f'{name}@example.com',
+                work_experience=OldWorkExperience.objects.create(company=f'{name} Inc'),
+            )
+            for name in ('ann', 'bob')
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        new_apps = executor.loader.project_state(self.after).apps
+        NewCvContent = new_apps.get_model('cv', 'CvContent')
+        self.assertEqual(
+            set(NewCvContent.objects.values_list('pk', flat=True)), {keeper, designer, writer, ann, bob},
+        )
+        self.assertFalse(NewCvContent.objects.filter(pk=first).exists())
+
+        def sections(model_name, field):
+            return sorted(new_apps.get_model('cv', model_name).objects.values_list('cv_id', field))
+
+        self.assertEqual(sections('Education', 'school'), [(keeper, 'LMU'), (keeper, 'TUM')])
+        self.assertEqual(sections('Certificate', 'name'), sorted([
+            (keeper, 'AWS'), (designer, 'Azure'), (writer, 'Azure'), (ann, 'GCP'), (bob, 'GCP'),
+        ]))
+        self.assertEqual(sections('WorkExperience', 'company'), [(ann, 'ann Inc'), (bob, 'bob Inc')])
+
+
+class ImportTests(TestCase):
+    def import_records(self, *records, **kwargs):
+        lines = [record if isinstance(record, str) else json.dumps(record) for record in records]
+        return importers.import_cvs(io.StringIO('\n'.join(lines)), **kwargs)
+
+    def test_import(self):
+        result = self.import_records(
+            {
+                'first_name': 'Jane', 'last_name': 'Doe', 'email': 'Jane@Example.com', 'title': 'Developer',
+                'summary': 'Summary', 'skills': 'Python, SQL',
+                'educations': [{'school': 'TU Berlin', 'field_of_study': 'Computer Science'}],
+                # Single section objects of the legacy format.
+                'work_experience': {'company': 'Acme', 'start_date': '2020-01-01', 'currently_working': True},
+            },
+            '{"title": "Developer",',
+            {'title': 'Developer', 'summary': 'Summary', 'work_experiences': [{'company': 'A'}]},
+            {'title': 'Developer', 'summary': 'Summary', 'age': 30},
+            {'title': 'Developer', 'summary': 'Summary', 'email': 42},
+            chunk_size=2,
+        )
+        self.assertEqual((result.created, result.invalid), (1, 4))
+        self.assertEqual([line for line, _ in result.errors], [2, 3, 4, 5])
+        self.assertTrue(result.errors[0][1].startswith('Invalid JSON'), result.errors[0][1])
+        self.assertTrue(result.errors[1][1].startswith('work_experiences.company:'), result.errors[1][1])
+        self.assertEqual(result.errors[2][1], 'Unknown CV fields: age.')
+        self.assertEqual(result.errors[3][1], 'email: Enter a valid email address.')
+
+        cv = CvContent.objects.get()
+        self.assertEqual(cv.email, 'Jane@example.com')
+        self.assertEqual(list(cv.educations.values_list('school', flat=True)), ['TU Berlin'])
+        self.assertEqual(cv.work_experiences.get().start_date, datetime.date(2020, 1, 1))
+        # Derived data is kept up to date without signals.
+        self.assertEqual(CvSummary.objects.get(cv=cv).current_employer, 'Acme')
+        self.assertEqual(set(cv.cv_skills.values_list('skill__normalized_name', flat=True)), {'python', 'sql'})
+        self.assertEqual([found.pk for found in search.search('developer')], [cv.pk])
+
+    def test_update_queries(self):
+        records = list(data.iter_cv_records(20))
+        self.import_records(*records)
+        changed = [{**record, 'title': 'Manager'} for record in records]
+        # A fixed number of queries per chunk, whatever the number of sections: deleting the old
+        # sections must not fire signals whose on-commit work repeats the chunk's own updates.
+        with self.assertNumQueries(45), self.captureOnCommitCallbacks(execute=True):
+            result = self.import_records(*changed, update_existing=True)
+        self.assertEqual(result.updated, 20)
+        self.assertEqual(set(CvSummary.objects.values_list('title', flat=True)), {'Manager'})
+
+    def test_duplicate_emails(self):
+        record = {'email': 'jane@example.com', 'title': 'Developer', 'summary': 'Summary'}
+        result = self.import_records(record, {**record, 'email': 'JANE@example.com', 'title': 'Designer'})
+        self.assertEqual((result.created, result.skipped), (1, 1))
+        self.assertEqual(self.import_records({**record, 'email': 'Jane@Example.com'}).skipped, 1)
+
+        result = self.import_records({**record, 'email': 'Jane@Example.com', 'title': 'Designer'}, update_existing=True)
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(CvContent.objects.get().title, 'Designer')
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data.generate(5)
+
+    def export(self, format):
+        return ''.join(exporters.export_cvs(format, chunk_size=2))
+
+    def exported_cvs(self):
+        return [
+            {key: value for key, value in cv.items() if key not in ('id', 'user_id')}
+            for cv in map(json.loads, self.export('ndjson').splitlines())
+        ]
+
+    def assertRoundTrip(self, format, import_format):
+        before = self.exported_cvs()
+        exported = self.export(format)
+        CvContent.objects.all().delete()
+        result = importers.import_cvs(io.StringIO(exported), format=import_format)
+        self.assertEqual((result.created, result.invalid), (5, 0), result.errors)
+        # Sections come back without their ids.
+        strip = lambda cvs: [  # noqa: E731
+            {key: [{**section, 'id': None} for section in value] if isinstance(value, list) else value
+             for key, value in cv.items()}
+            for cv in cvs
+        ]
+        self.assertEqual(strip(self.exported_cvs()), strip(before))
+
+    def test_ndjson_round_trip(self):
+        self.assertRoundTrip('ndjson', 'ndjson')
+
+    def test_csv_round_trip(self):
+        self.assertRoundTrip('csv', 'csv')
+
+    def test_json_resume(self):
+        documents = json.loads(self.export('json-resume'))
+        cv = CvContent.objects.with_sections().order_by('pk').first()
+        self.assertEqual(len(documents), 5)
+        self.assertEqual(documents[0]['meta'], {'id': cv.pk})
+        self.assertEqual(documents[0]['basics']['label'], cv.title)
+        self.assertEqual(len(documents[0]['work']), len(cv.work_experiences.all()))
+
+    def test_endpoint_requires_staff(self):
+        self.assertEqual(self.client.get('/cv/export/').status_code, 302)
+        staff = User.objects.create_user('staff@example.com', 'password', username='staff@example.com', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get('/cv/export/', {'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(b''.join(response.streaming_content).decode(), self.export('csv'))
+
+
+class MatchingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.python = cls.create_cv('Python Developer', 'Berlin', 'Python, Django', (2015, 2020))
+        cls.java = cls.create_cv('Java Developer', 'Paris', 'Python, Java', (2019, 2020))
+        cls.designer = cls.create_cv('Designer', 'Berlin', 'Figma')
+
+    @staticmethod
+    def create_cv(title, location, skills, *jobs):
+        cv = CvContent.objects.create(title=title, summary='Summary', location=location, skills=skills)
+        for start, end in jobs:
+            cv.work_experiences.create(
+                company='Company', start_date=datetime.date(start, 1, 1), end_date=datetime.date(end, 1, 1),
+            )
+        return cv
+
+    def setUp(self):
+        matching._index = None
+        self.addCleanup(setattr, matching, '_index', None)
+
+    def match(self, **job):
+        return matching.match_cvs(matching.Job(**job))
+
+    def test_ranking(self):
+        matches = self.match(skills=['python', 'DJANGO'], title='python developer', location=' berlin', min_years=4)
+        self.assertEqual([pk for pk, _ in matches], [self.python.pk, self.java.pk, self.designer.pk])
+        scores = [score for _, score in matches]
+        self.assertAlmostEqual(scores[0], 1)
+        # Half the skills, half the title, no location and a quarter of the experience.
+        self.assertAlmostEqual(scores[1], 0.5 * 0.5 + 0.2 * 0.5 + 0.2 * 0.25, places=2)
+        self.assertAlmostEqual(scores[2], 0.1)
+
+    def test_unspecified_criteria(self):
+        # Only the skills count, so a CV with every skill scores 1.
+        self.assertEqual(self.match(skills=['Java', 'Python']), [(self.java.pk, 1.0), (self.python.pk, 0.5)])
+        self.assertEqual(self.match(skills=['Rust']), [])
+        self.assertEqual(self.match(), [])
+
+    def test_ties_and_limit(self):
+        self.assertEqual(self.match(location='Berlin'), [(self.python.pk, 1.0), (self.designer.pk, 1.0)])
+        self.assertEqual(matching.match_cvs(matching.Job(location='Berlin'), limit=1), [(self.python.pk, 1.0)])
+
+    def test_stale_cvs_are_reloaded(self):
+        self.match(skills=['Figma'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.java.skills = 'Figma'
+            self.java.save()
+            self.designer.delete()
+        self.assertEqual(self.match(skills=['Figma']), [(self.java.pk, 1.0)])
+
+    def test_experience_days(self):
+        # Overlapping jobs count once, and a job ending before it starts counts nothing.
+        days = dates.experience_days(
+            3, np.array([0, 0, 0, 2]), np.array([0, 5, 30, 7]), np.array([10, 15, 20, 9]),
+        )
+        self.assertEqual(days.tolist(), [15, 0, 2])
+
+
+class DedupTests(TestCase):
+    def create_cv(self, first_name, last_name, **fields):
+        return CvContent.objects.create(
+            first_name=first_name, last_name=last_name, title='Developer', summary='Summary', **fields,
+        )
+
+    def test_blocking_keys(self):
+        self.assertEqual(dedup.soundex('Robert'), dedup.soundex('Rupert'))
+        self.assertEqual(dedup.url_handle('https://www.linkedin.com/in/J-Smith/?trk=x', 'linkedin.com'), 'jsmith')
+        self.assertEqual(dedup.url_handle('linkedin.com/company/acme', 'linkedin.com'), '')
+        self.assertEqual(dedup.url_handle('https://github.com/jsmith', 'linkedin.com'), '')
+        cv = self.create_cv(
+            'José', 'Smith', email='J.Smith+cv@example.com', github_url='https://github.com/jsmith/repo',
+        )
+        self.assertEqual(
+            set(cv.blocking_keys.values_list('key', flat=True)),
+            {'gh:jsmith', 'em:jsmith', 'nm:s530:j', 'nm:j200:s'},
+        )
+
+    def test_find_candidates(self):
+        cv = self.create_cv('John', 'Smith', linkedin_url='https://linkedin.com/in/jsmith')
+        same_profile = self.create_cv('Jon', 'Smith', linkedin_url='http://www.linkedin.com/in/JSmith/')
+        # Swapped names and the same mailbox.
+        same_mailbox = self.create_cv('Smith', 'John', email='john.smith@example.com')
+        other_mailbox = self.create_cv('John', 'Smith', email='johnsmith@example.org')
+        # Same name, but a different profile on the same site.
+        other_profile = self.create_cv('John', 'Smith', linkedin_url='https://linkedin.com/in/someone-else')
+        self.create_cv('Jane', 'Doe')
+
+        candidates = dedup.find_candidates(CvContent.objects.values_list('pk', flat=True))
+        pairs = [(candidate.cv_id, candidate.other_id) for candidate in candidates]
+        self.assertEqual(pairs[:2], [(same_mailbox.pk, other_mailbox.pk), (cv.pk, same_profile.pk)])
+        # John and Jon share their soundex code too.
+        self.assertEqual(candidates[1].keys, ['li:jsmith', 'nm:j500:s', 'nm:s530:j'])
+        self.assertNotIn((cv.pk, other_profile.pk), pairs)
+        self.assertEqual(len(pairs), len(set(pairs)))
+        self.assertAlmostEqual(dedup.score_pair(cv, other_profile), 0.4)
+        self.assertEqual([candidate.score for candidate in candidates], sorted(
+            (candidate.score for candidate in candidates), reverse=True,
+        ))
+
+        # Scanning in batches finds the same pairs, each once.
+        batched = [
+            (candidate.cv_id, candidate.other_id)
+            for _, candidates in dedup.iter_candidates(batch_size=2)
+            for candidate in candidates
+        ]
+        self.assertEqual(sorted(batched), sorted(pairs))
+        # Keys shared by more CVs than the block size are skipped.
+        self.assertEqual(dedup.find_candidates([cv.pk], max_block_size=1), [])
+
+    def test_keys_follow_changes(self):
+        cv = self.create_cv('John', 'Smith')
+        other = self.create_cv('Mary', 'Jones', github_url='https://github.com/jsmith')
+        self.assertEqual(dedup.find_candidates([cv.pk]), [])
+        cv.github_url = 'https://github.com/JSmith'
+        cv.save(update_fields=['github_url'])
+        self.assertEqual([c.other_id for c in dedup.find_candidates([cv.pk])], [other.pk])
+
+
+class RenderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cv = CvContent.objects.create(first_name='Jane', last_name='Doe', title='Developer', summary='Summary')
+        cls.other = CvContent.objects.create(first_name='John', last_name='Doe', title='Designer', summary='Summary')
+        cls.staff = User.objects.create_user(
+            'staff@example.com', 'password', username='staff@example.com', is_staff=True,
+        )
+
+    def setUp(self):
+        cache.get_cache().clear()
+        render_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(render_dir.cleanup)
+        render_settings = override_settings(CV_RENDER_CACHE_DIR=render_dir.name)
+        render_settings.enable()
+        self.addCleanup(render_settings.disable)
+
+    def test_content_hash(self):
+        data = cache.get_serialized_cv(self.cv.pk)
+        digest = rendering.content_hash(data, 'html')
+        self.assertEqual(rendering.content_hash(dict(data), 'html'), digest)
+        self.assertNotEqual(rendering.content_hash(data, 'pdf'), digest)
+        self.assertNotEqual(rendering.content_hash({**data, 'title': 'Manager'}, 'html'), digest)
+        self.assertEqual(rendering.cache_path(digest, 'html').relative_to(rendering.get_cache_dir()).as_posix(),
+                         f'{digest[:2]}/{digest}.html')
+
+    def test_get_rendered(self):
+        path, digest = rendering.get_rendered(self.cv.pk, 'html')
+        self.assertIn('Jane Doe', path.read_text())
+        with mock.patch.object(rendering, 'render') as render:
+            self.assertEqual(rendering.get_rendered(self.cv.pk, 'html'), (path, digest))
+        render.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cv.title = 'Manager'
+            self.cv.save()
+        new_path, new_digest = rendering.get_rendered(self.cv.pk, 'html')
+        self.assertNotEqual(new_digest, digest)
+        self.assertIn('Manager', new_path.read_text())
+        self.assertIsNone(rendering.get_rendered(0, 'html'))
+
+    def test_evict(self):
+        paths = []
+        for number in range(5):
+            path = rendering.cache_path(f'{number:02d}' * 32, 'html')
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b'x' * 100)
+            # Least recently used first.
+            os.utime(path, (1000 + number, 1000 + number))
+            paths.append(path)
+        self.assertEqual(rendering.evict(max_size=500), 0)
+        # Down to EVICT_TO of the maximum size.
+        self.assertEqual(rendering.evict(max_size=400), 2)
+        self.assertEqual([path.exists() for path in paths], [False, False, True, True, True])
+
+    def test_view(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(f'/cv/{self.cv.pk}/render/html/', {'download': ''})
+        self.assertEqual(response['Content-Type'], rendering.CONTENT_TYPES['html'])
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="cv-{self.cv.pk}.html"')
+        self.assertIn(b'Jane Doe', b''.join(response.streaming_content))
+        response = self.client.get(f'/cv/{self.cv.pk}/render/html/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(f'/cv/{self.cv.pk}/render/docx/').status_code, 404)
+
+    def test_write_zip(self):
+        # Renders already in the cache are zipped without starting a process pool.
+        for pk in (self.cv.pk, self.other.pk):
+            rendering.get_rendered(pk, 'html')
+        file = io.BytesIO()
+        self.assertEqual(rendering.write_zip([self.other.pk, self.cv.pk, self.other.pk, 0], 'html', file), 2)
+        with zipfile.ZipFile(file) as archive:
+            self.assertEqual(archive.namelist(), [f'cv-{self.other.pk}.html', f'cv-{self.cv.pk}.html'])
+
+    def test_zip_view(self):
+        ids = {'ids': f'{self.other.pk},{self.cv.pk}'}
+        response = self.client.post('/cv/render/html/', ids)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Task.objects.exists())
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get('/cv/render/html/', ids).status_code, 405)
+        self.assertEqual(self.client.post('/cv/render/docx/', ids).status_code, 404)
+        # Zips older than ZIP_MAX_AGE are deleted when the next one is written.
+        old_zip = rendering.zip_path('0' * 32, 'html')
+        old_zip.parent.mkdir(parents=True)
+        old_zip.write_bytes(b'')
+        os.utime(old_zip, (0, 0))
+
+        response = self.client.post('/cv/render/html/', ids)
+        self.assertEqual(response.status_code, 202)
+        location = response.json()['location']
+        self.assertEqual(response['Location'], location)
+        response = self.client.get(location)
+        self.assertEqual((response.status_code, response['Retry-After']), (202, '5'))
+
+        # Renders already in the cache are zipped without starting a process pool.
+        for pk in (self.cv.pk, self.other.pk):
+            rendering.get_rendered(pk, 'html')
+        worker = Worker(name='test-worker')
+        worker.execute(worker.claim())
+        response = self.client.get(location)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="cvs-html.zip"')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(archive.namelist(), [f'cv-{self.other.pk}.html', f'cv-{self.cv.pk}.html'])
+        self.assertFalse(old_zip.exists())
+        self.assertEqual(self.client.get(f'/cv/render/html/{uuid.uuid4()}/').status_code, 404)
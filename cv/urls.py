@@ -0,0 +1,23 @@
+from django.urls import path
+
+from cv import async_views, views
+
+app_name = 'cv'
+
+urlpatterns = [
+    path('', views.cv_list, name='list'),
+    path('<int:pk>/', views.cv_detail, name='detail'),
+    path('<int:pk>/history/', views.cv_history, name='history'),
+    path('<int:pk>/render/<str:format>/', views.render_cv, name='render'),
+    path('summaries/', views.summary_list, name='summaries'),
+    path('render/<str:format>/', views.render_cvs_zip, name='render-zip'),
+    path('render/<str:format>/<uuid:key>/', views.render_zip_download, name='render-zip-download'),
+    path('cache-stats/', views.cache_stats, name='cache-stats'),
+    path('search/', views.search_cvs, name='search'),
+    path('skills/', views.skill_counts, name='skills'),
+    path('match/', views.match_cvs, name='match'),
+    path('export/', views.export_cvs, name='export'),
+    path('async/', async_views.cv_list, name='async-list'),
+    path('async/<int:pk>/', async_views.cv_detail, name='async-detail'),
+    path('async/search/', async_views.search_cvs, name='async-search'),
+]
@@ -1,3 +1,313 @@
-from django.shortcuts import render
+import math
+import uuid
 
-# Create your views here.
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.paginator import Paginator
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET, require_POST
+
+from cv import cache, exporters, history, rendering, search
+from cv.models import CvContent, CvRevision, CvSummary, Skill
+from cv.pagination import InvalidCursor, KeysetPaginator
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+SKILLS_LIMIT = 50
+SKILLS_MAX_LIMIT = 500
+MATCH_LIMIT = 50
+MATCH_MAX_LIMIT = 500
+MAX_RENDER_ZIP_CVS = 1000
+# Seconds clients are asked to wait before asking again for a zip being written.
+RENDER_ZIP_RETRY_AFTER = 5
+
+
+def _int_param(request, name, default, maximum=None):
+    try:
+        value = int(request.GET.get(name, default))
+    except (TypeError, ValueError):
+        value = default
+    value = max(value, 1)
+    return min(value, maximum) if maximum else value
+
+
+def _float_param(request, name, default=0.0):
+    try:
+        value = float(request.GET.get(name, default))
+    except (TypeError, ValueError):
+        return default
+    return value if math.isfinite(value) else default
+
+
+def _skills_param(request):
+    return [skill for skill in request.GET.get('skills', '').split(',') if skill.strip()]
+
+
+def _filter_cvs(request):
+    cvs = CvContent.objects.all()
+    skills = _skills_param(request)
+    if skills:
+        cvs = cvs.with_any_skills(skills) if request.GET.get('match') == 'any' else cvs.with_all_skills(skills)
+    if request.GET.get('location'):
+        cvs = cvs.filter(location=request.GET['location'])
+    return cvs.order_by('pk').values_list('pk', flat=True)
+
+
+def _list_response(page, serialized):
+    return JsonResponse({
+        'count': page.paginator.count,
+        'page': page.number,
+        'num_pages': page.paginator.num_pages,
+        'results': [serialized[pk] for pk in page if pk in serialized],
+    })
+
+
+def _cursor_response(page, results):
+    return JsonResponse({'next': page.next_cursor, 'previous': page.previous_cursor, 'results': results})
+
+
+def _invalid_cursor(exc):
+    return JsonResponse({'error': str(exc)}, status=400)
+
+
+def _cv_keyset_paginator(request):
+    # Rows are the pks of _filter_cvs().
+    return KeysetPaginator(
+        _filter_cvs(request), ['pk'], _int_param(request, 'per_page', PAGE_SIZE, MAX_PAGE_SIZE), key=lambda pk: (pk,),
+    )
+
+
+@staff_member_required
+@require_GET
+def cv_list(request):
+    # ?cursor= (empty for the first page) switches to keyset pagination, whose pages cost the same at any depth.
+    if 'cursor' in request.GET:
+        try:
+            page = _cv_keyset_paginator(request).page(request.GET['cursor'])
+        except InvalidCursor as exc:
+            return _invalid_cursor(exc)
+        serialized = cache.get_serialized_cvs(page.object_list)
+        return _cursor_response(page, [serialized[pk] for pk in page if pk in serialized])
+    paginator = Paginator(_filter_cvs(request), _int_param(request, 'per_page', PAGE_SIZE, MAX_PAGE_SIZE))
+    page = paginator.get_page(_int_param(request, 'page', 1))
+    return _list_response(page, cache.get_serialized_cvs(list(page)))
+
+
+@staff_member_required
+@require_GET
+def cv_detail(request, pk):
+    data = cache.get_serialized_cv(pk)
+    if data is None:
+        raise Http404('CV not found.')
+    return JsonResponse(data)
+
+
+@staff_member_required
+@require_GET
+def cv_history(request, pk):
+    # ?as_of=<ISO 8601 datetime> returns the CV as it was then, otherwise the list of its revisions.
+    if 'as_of' in request.GET:
+        try:
+            when = parse_datetime(request.GET['as_of'])
+        except ValueError:
+            when = None
+        if when is None:
+            return JsonResponse({'error': 'as_of must be an ISO 8601 datetime.'}, status=400)
+        if timezone.is_naive(when):
+            when = timezone.make_aware(when)
+        data = history.as_of(pk, when)
+        if data is None:
+            raise Http404('CV not found at that time.')
+        return JsonResponse(data)
+    revisions = CvRevision.objects.filter(cv_id=pk).order_by('number').values_list('number', 'kind', 'created_at')
+    return JsonResponse({
+        'results': [
+            {'number': number, 'kind': kind, 'created_at': created_at.isoformat()}
+            for number, kind, created_at in revisions
+        ],
+    })
+
+
+def _summary_data(summary):
+    return {
+        'id': summary.cv_id,
+        'full_name': summary.full_name,
+        'title': summary.title,
+        'location': summary.location,
+        'years_of_experience': round(summary.years_of_experience, 1),
+        'current_employer': summary.current_employer,
+        'latest_degree': summary.latest_degree,
+        'certificate_count': summary.certificate_count,
+    }
+
+
+@staff_member_required
+@require_GET
+def summary_list(request):
+    summaries = CvSummary.objects.order_by('cv_id')
+    if request.GET.get('location'):
+        summaries = summaries.filter(location=request.GET['location'])
+    per_page = _int_param(request, 'per_page', PAGE_SIZE, MAX_PAGE_SIZE)
+    if 'cursor' in request.GET:
+        try:
+            page = KeysetPaginator(summaries, ['pk'], per_page).page(request.GET['cursor'])
+        except InvalidCursor as exc:
+            return _invalid_cursor(exc)
+        return _cursor_response(page, [_summary_data(summary) for summary in page])
+    paginator = Paginator(summaries, per_page)
+    page = paginator.get_page(_int_param(request, 'page', 1))
+    return JsonResponse({
+        'count': paginator.count,
+        'page': page.number,
+        'num_pages': paginator.num_pages,
+        'results': [_summary_data(summary) for summary in page],
+    })
+
+
+@staff_member_required
+@require_GET
+def cache_stats(request):
+    return JsonResponse(cache.stats.as_dict())
+
+
+def _search_params(request):
+    return {
+        'query': request.GET.get('q', '').strip(),
+        'page': _int_param(request, 'page', 1),
+        'per_page': _int_param(request, 'per_page', PAGE_SIZE, MAX_PAGE_SIZE),
+        'match_all': request.GET.get('match') != 'any',
+    }
+
+
+def _search_response(query, page):
+    return JsonResponse({
+        'query': query,
+        'count': page.paginator.count,
+        'page': page.number,
+        'num_pages': page.paginator.num_pages,
+        'results': [
+            {
+                'id': cv.pk,
+                'score': round(cv.search_score, 4),
+                'first_name': cv.first_name,
+                'last_name': cv.last_name,
+                'title': cv.title,
+                'location': cv.location,
+                'skills': cv.skills,
+            }
+            for cv in page
+        ],
+    })
+
+
+@staff_member_required
+@require_GET
+def search_cvs(request):
+    params = _search_params(request)
+    return _search_response(params['query'], search.search(**params))
+
+
+@staff_member_required
+@require_GET
+def skill_counts(request):
+    limit = _int_param(request, 'limit', SKILLS_LIMIT, SKILLS_MAX_LIMIT)
+    skills = Skill.objects.with_cv_count().filter(cv_count__gt=0).order_by('-cv_count', 'normalized_name')
+    return JsonResponse({
+        'results': [
+            {'name': skill.name, 'count': skill.cv_count}
+            for skill in skills.only('name', 'normalized_name')[:limit]
+        ],
+    })
+
+
+@staff_member_required
+@require_GET
+def match_cvs(request):
+    # cv.matching imports NumPy, which loading the URLconf should not wait for.
+    from cv import matching
+
+    job = matching.Job(
+        skills=_skills_param(request),
+        title=request.GET.get('title', ''),
+        location=request.GET.get('location', ''),
+        min_years=_float_param(request, 'years'),
+    )
+    matches = matching.match_cvs(job, _int_param(request, 'limit', MATCH_LIMIT, MATCH_MAX_LIMIT))
+    serialized = cache.get_serialized_cvs([pk for pk, _ in matches])
+    return JsonResponse({
+        'results': [{'score': round(score, 4), **serialized[pk]} for pk, score in matches if pk in serialized],
+    })
+
+
+@staff_member_required
+@require_GET
+def export_cvs(request):
+    format = request.GET.get('format', 'ndjson')
+    if format not in exporters.FORMATS:
+        raise Http404('Unknown export format.')
+    response = StreamingHttpResponse(exporters.export_cvs(format), content_type=exporters.CONTENT_TYPES[format])
+    response['Content-Disposition'] = f'attachment; filename="cvs.{exporters.FILE_EXTENSIONS[format]}"'
+    return response
+
+
+@staff_member_required
+@require_GET
+def render_cv(request, pk, format):
+    if format not in rendering.FORMATS:
+        raise Http404('Unknown render format.')
+    rendered = rendering.get_rendered(pk, format)
+    if rendered is None:
+        raise Http404('CV not found.')
+    path, digest = rendered
+    etag = f'"{digest}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if settings.CV_RENDER_X_ACCEL_REDIRECT:
+            response = HttpResponse(content_type=rendering.CONTENT_TYPES[format])
+            relative = path.relative_to(rendering.get_cache_dir()).as_posix()
+            response['X-Accel-Redirect'] = f'{settings.CV_RENDER_X_ACCEL_REDIRECT.rstrip("/")}/{relative}'
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=rendering.CONTENT_TYPES[format])
+        if 'download' in request.GET:
+            response['Content-Disposition'] = f'attachment; filename="cv-{pk}.{format}"'
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@staff_member_required
+@require_POST
+def render_cvs_zip(request, format):
+    # Zips are written by a task worker; the response points to where the zip can be downloaded from.
+    if format not in rendering.FORMATS:
+        raise Http404('Unknown render format.')
+    pks = []
+    for value in request.POST.get('ids', '').split(','):
+        if value.strip().isdigit():
+            pks.append(int(value))
+    key = uuid.uuid4()
+    rendering.render_zip.enqueue(pks=pks[:MAX_RENDER_ZIP_CVS], format=format, key=key.hex)
+    location = reverse('cv:render-zip-download', args=[format, key])
+    response = JsonResponse({'location': location}, status=202)
+    response['Location'] = location
+    return response
+
+
+@staff_member_required
+@require_GET
+def render_zip_download(request, format, key):
+    if format not in rendering.FORMATS:
+        raise Http404('Unknown render format.')
+    try:
+        file = open(rendering.zip_path(key.hex, format), 'rb')
+    except FileNotFoundError:
+        if not rendering.zip_pending(key.hex):
+            raise Http404('Zip not found.') from None
+        response = JsonResponse({'status': 'pending'}, status=202)
+        response['Retry-After'] = RENDER_ZIP_RETRY_AFTER
+        return response
+    return FileResponse(file, as_attachment=True, filename=f'cvs-{format}.zip', content_type='application/zip')
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class JoinitConfig(AppConfig):
+    name = 'joinit'
+
+    def ready(self):
+        from joinit import metrics, sqlite
+
+        connection_created.connect(sqlite.configure_connection, dispatch_uid='joinit_configure_sqlite')
+        connection_created.connect(metrics.install_query_wrapper, dispatch_uid='joinit_install_query_metrics')
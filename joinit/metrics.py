@@ -0,0 +1,316 @@
+"""
+Request and database metrics in the Prometheus text format.
+
+MetricsMiddleware records the latency and status of every request per view
+(its URL route, so /cv/1/ and /cv/2/ are one view). A sample of
+METRICS_QUERY_SAMPLE_RATE of the requests additionally records the database
+queries they run: their number and time, queries executed more than once with
+the same parameters (duplicates) and statements executed at least
+METRICS_N_PLUS_ONE_THRESHOLD times with different parameters (N+1 suspects).
+Queries are seen by an execute wrapper installed on every database connection
+when it is opened, which does nothing outside sampled requests, so unsampled
+requests only pay for a clock read and a histogram update.
+
+The metrics are exposed at /metrics/ for Prometheus and summarized per view,
+slowest first, at /metrics/hot-paths/. Both require the METRICS_TOKEN bearer
+token, or a staff session when no token is configured. Metrics are kept per
+process: scrape every worker process, or run a single one per target.
+"""
+import bisect
+import hmac
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+# Repeated statements remembered per view for the hot path report.
+MAX_STATEMENTS_PER_VIEW = 20
+UNRESOLVED_VIEW = '<unresolved>'
+# Other methods are counted as "other", so clients cannot create any number of label values.
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+_sampled = ContextVar('metrics_sampled_queries', default=None)
+_collectors = []
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, share):
+        """Upper bound of the bucket holding the ``share`` quantile; the largest bucket bound for overflows."""
+        rank = share * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            yield f'{name}_bucket', {**labels, 'le': str(bound)}, cumulative
+        yield f'{name}_sum', labels, self.sum
+        yield f'{name}_count', labels, self.count
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.responses = Counter()
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.sampled = 0
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.query_time = Histogram(LATENCY_BUCKETS)
+        self.duplicate_queries = 0
+        self.n_plus_one = 0
+        # Statement -> executions beyond the first, in sampled requests.
+        self.repeated = Counter()
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = defaultdict(ViewMetrics)
+
+    def record_request(self, view, method, status, duration, queries=None):
+        if method not in METHODS:
+            method = 'other'
+        if queries is not None:
+            duplicates, repeated = queries.duplicates(), queries.repeated()
+        with self.lock:
+            metrics = self.views[view]
+            metrics.responses[method, status] += 1
+            metrics.latency.observe(duration)
+            if queries is not None:
+                metrics.sampled += 1
+                metrics.queries.observe(queries.count)
+                metrics.query_time.observe(queries.duration)
+                metrics.duplicate_queries += duplicates
+                if any(count >= settings.METRICS_N_PLUS_ONE_THRESHOLD for count in repeated.values()):
+                    metrics.n_plus_one += 1
+                for statement, count in repeated.items():
+                    if statement in metrics.repeated or len(metrics.repeated) < MAX_STATEMENTS_PER_VIEW:
+                        metrics.repeated[statement] += count - 1
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+registry = Registry()
+
+
+def register_collector(collector):
+    """
+    Export metrics maintained elsewhere, e.g. cache statistics.
+
+    ``collector`` is called on every scrape and returns an iterable of
+    (name, type, help, [(labels, value), ...]) tuples.
+    """
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+class SampledQueries:
+    """Queries run by one sampled request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.executions = Counter()
+
+    def record(self, sql, params, duration):
+        self.count += 1
+        self.duration += duration
+        self.executions[sql, repr(params)] += 1
+
+    def duplicates(self):
+        """Executions repeating an earlier query with the same parameters."""
+        return sum(count - 1 for count in self.executions.values())
+
+    def repeated(self):
+        """Statement -> executions, whatever the parameters, for statements run more than once."""
+        statements = Counter()
+        for (sql, _), count in self.executions.items():
+            statements[normalize_sql(sql)] += count
+        return Counter({statement: count for statement, count in statements.items() if count > 1})
+
+
+def normalize_sql(sql):
+    # IN lists of different lengths are the same statement.
+    return re.sub(r'IN \((?:%s, )*%s\)', 'IN (...)', sql)
+
+
+def record_queries(execute, sql, params, many, context):
+    """Execute wrapper timing the queries of sampled requests."""
+    queries = _sampled.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.record(sql, params, time.perf_counter() - started)
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else UNRESOLVED_VIEW
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self):
+        queries = SampledQueries() if random.random() < settings.METRICS_QUERY_SAMPLE_RATE else None
+        return queries, _sampled.set(queries), time.perf_counter()
+
+    def _finish(self, request, response, queries, token, started):
+        duration = time.perf_counter() - started
+        _sampled.reset(token)
+        registry.record_request(_view_name(request), request.method, response.status_code, duration, queries)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries, token, started = self._start()
+        response = self.get_response(request)
+        self._finish(request, response, queries, token, started)
+        return response
+
+    async def __acall__(self, request):
+        queries, token, started = self._start()
+        response = await self.get_response(request)
+        self._finish(request, response, queries, token, started)
+        return response
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_sample(name, labels, value):
+    if labels:
+        name += '{' + ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items()) + '}'
+    return f'{name} {value}'
+
+
+def _families():
+    requests, latency, sampled, queries, query_time, duplicates, n_plus_one = ([] for _ in range(7))
+    with registry.lock:
+        for view, metrics in sorted(registry.views.items()):
+            labels = {'view': view}
+            for (method, status), count in sorted(metrics.responses.items()):
+                requests.append(({**labels, 'method': method, 'status': str(status)}, count))
+            latency.extend(metrics.latency.samples('joinit_request_duration_seconds', labels))
+            sampled.append((labels, metrics.sampled))
+            queries.extend(metrics.queries.samples('joinit_request_queries', labels))
+            query_time.extend(metrics.query_time.samples('joinit_request_query_duration_seconds', labels))
+            duplicates.append((labels, metrics.duplicate_queries))
+            n_plus_one.append((labels, metrics.n_plus_one))
+    yield 'joinit_requests_total', 'counter', 'Responses by view, method and status.', requests
+    yield 'joinit_request_duration_seconds', 'histogram', 'Request latency by view.', latency
+    yield 'joinit_query_sampled_requests_total', 'counter', 'Requests whose queries were recorded.', sampled
+    yield 'joinit_request_queries', 'histogram', 'Database queries per sampled request.', queries
+    yield 'joinit_request_query_duration_seconds', 'histogram', 'Database time per sampled request.', query_time
+    yield (
+        'joinit_duplicate_queries_total', 'counter',
+        'Queries repeating an earlier query of the same sampled request with the same parameters.', duplicates,
+    )
+    yield (
+        'joinit_n_plus_one_requests_total', 'counter',
+        'Sampled requests running a statement at least METRICS_N_PLUS_ONE_THRESHOLD times.', n_plus_one,
+    )
+    for collector in _collectors:
+        yield from collector()
+
+
+def render():
+    lines = []
+    for name, kind, help_text, samples in _families():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for sample in samples:
+            # Histograms name their samples (_bucket, _sum, _count), other metrics give (labels, value).
+            lines.append(_format_sample(*sample) if len(sample) == 3 else _format_sample(name, *sample))
+    return '\n'.join(lines) + '\n'
+
+
+def hot_paths():
+    """Per-view summary of the sampled metrics, the views taking the most time in total first."""
+    with registry.lock:
+        report = []
+        total = sum(metrics.latency.sum for metrics in registry.views.values())
+        for view, metrics in registry.views.items():
+            sampled = metrics.sampled or 1
+            report.append({
+                'view': view,
+                'requests': metrics.latency.count,
+                'total_seconds': round(metrics.latency.sum, 3),
+                'share_of_time': round(metrics.latency.sum / total, 4) if total else 0.0,
+                'mean_ms': round(metrics.latency.sum / metrics.latency.count * 1000, 2),
+                'p95_ms_upper_bound': metrics.latency.quantile(0.95) * 1000,
+                'sampled_requests': metrics.sampled,
+                'mean_queries': round(metrics.queries.sum / sampled, 2),
+                'mean_query_ms': round(metrics.query_time.sum / sampled * 1000, 2),
+                'duplicate_queries_per_request': round(metrics.duplicate_queries / sampled, 2),
+                'n_plus_one_requests': metrics.n_plus_one,
+                'repeated_statements': [
+                    {'sql': statement, 'extra_executions': count}
+                    for statement, count in metrics.repeated.most_common(5)
+                ],
+            })
+    report.sort(key=lambda entry: -entry['total_seconds'])
+    return report
+
+
+def _authorized(request):
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        return hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode())
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_active and user.is_staff)
+
+
+@require_GET
+def metrics_view(request):
+    if not _authorized(request):
+        return HttpResponse(status=403)
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@require_GET
+def hot_paths_view(request):
+    if not _authorized(request):
+        return HttpResponse(status=403)
+    return JsonResponse({'views': hot_paths()})
@@ -0,0 +1,88 @@
+"""
+Database routing between the primary database and its read replicas.
+
+Replicas are the databases configured through DATABASE_REPLICA_URLS (aliased
+``replica_0``, ``replica_1``, ...). Reads of models in DATABASE_REPLICA_APPS go
+to a random replica; everything else, and every write, goes to ``default``.
+Reads stay on the primary while a transaction is open on it, inside
+``use_primary()`` and during unsafe (writing) requests, so code always sees
+its own writes despite replication lag.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_PREFIX = 'replica_'
+
+_pinned = ContextVar('database_pinned_to_primary', default=False)
+
+
+def get_replicas():
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+@contextmanager
+def use_primary():
+    """Send every read inside the block to the primary database."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def __init__(self):
+        self.replicas = get_replicas()
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas or model._meta.app_label not in settings.DATABASE_REPLICA_APPS:
+            return None
+        if _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema through replication.
+        if db.startswith(REPLICA_PREFIX):
+            return False
+        return None
+
+
+class PrimaryForUnsafeMethodsMiddleware:
+    """Read from the primary for the whole of POST/PUT/PATCH/DELETE requests."""
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.method in self.SAFE_METHODS:
+            return self.get_response(request)
+        with use_primary():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.method in self.SAFE_METHODS:
+            return await self.get_response(request)
+        with use_primary():
+            return await self.get_response(request)
@@ -0,0 +1,47 @@
+"""
+Opt-in SQLite tuning for small deployments and tests.
+
+With SQLITE_PERFORMANCE_PROFILE enabled every new SQLite connection switches to
+WAL journaling, so readers no longer wait for writers, and applies the other
+PRAGMAS below. SQLITE_SERIALIZE_WRITES additionally starts transactions with
+BEGIN IMMEDIATE: writers then queue on the database lock (up to busy_timeout)
+when the transaction starts, instead of failing with "database is locked" when
+a deferred transaction tries to upgrade from reading to writing.
+"""
+from django.conf import settings
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Durable across application crashes; only an OS crash can lose the last commits.
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative values are KiB, i.e. a 64 MiB page cache per connection.
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def get_pragmas():
+    return {**PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def begin_immediate(execute, sql, params, many, context):
+    if sql == 'BEGIN':
+        sql = 'BEGIN IMMEDIATE'
+    return execute(sql, params, many, context)
+
+
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    if settings.SQLITE_PERFORMANCE_PROFILE:
+        with connection.cursor() as cursor:
+            apply_pragmas(cursor, get_pragmas())
+    if settings.SQLITE_SERIALIZE_WRITES and begin_immediate not in connection.execute_wrappers:
+        connection.execute_wrappers.append(begin_immediate)
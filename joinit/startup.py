@@ -0,0 +1,114 @@
+"""
+Startup profile: where the time of django.setup() goes, per app.
+
+With DJANGO_STARTUP_PROFILE set, manage.py, joinit.wsgi and joinit.asgi call
+install() before Django starts. django.setup() then times loading the settings
+and, for every app of INSTALLED_APPS, importing its package and AppConfig,
+importing its models module and running its ready() method, and writes a
+report to stderr, slowest app first:
+
+    DJANGO_STARTUP_PROFILE=1 python manage.py check
+
+A module imported by several apps is counted for the first one importing it,
+so the report shows which app pulls an expensive dependency into the process
+at startup. ``python -X importtime`` then tells which of its modules cost the
+time. benchmarks/startup.py measures the resulting cold start time.
+"""
+import os
+import sys
+import time
+from functools import wraps
+
+import django
+from django.apps import AppConfig
+
+ENV_VAR = 'DJANGO_STARTUP_PROFILE'
+PHASES = ('import', 'models', 'ready')
+
+
+class StartupProfile:
+    def __init__(self):
+        self.settings = 0.0
+        self.total = 0.0
+        # App label -> seconds spent in each of PHASES.
+        self.apps = {}
+
+    def add(self, label, phase, seconds):
+        self.apps.setdefault(label, dict.fromkeys(PHASES, 0.0))[phase] += seconds
+
+    def report(self):
+        rows = sorted(self.apps.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        lines = [f'{"app":<24}' + ''.join(f'{phase:>10}' for phase in PHASES) + f'{"total":>10}']
+        for label, phases in rows:
+            lines.append(
+                f'{label:<24}' + ''.join(f'{phases[phase] * 1000:>10.1f}' for phase in PHASES)
+                + f'{sum(phases.values()) * 1000:>10.1f}'
+            )
+        apps = sum(sum(phases.values()) for phases in self.apps.values())
+        lines.append(f'{"settings":<24}{self.settings * 1000:>40.1f}')
+        lines.append(f'{"django.setup() (ms)":<24}{self.total * 1000:>40.1f}')
+        lines.append(f'{"other":<24}{(self.total - self.settings - apps) * 1000:>40.1f}')
+        return '\n'.join(lines)
+
+
+def _timed(profile, label, phase, function):
+    @wraps(function)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.add(label, phase, time.perf_counter() - started)
+    return timed
+
+
+def profile_setup(setup, *args, **kwargs):
+    """Call ``setup`` (django.setup) and return a StartupProfile of the call."""
+    from django.conf import settings
+
+    profile = StartupProfile()
+    create = AppConfig.__dict__['create']
+    import_models = AppConfig.import_models
+
+    def timed_create(cls, entry):
+        started = time.perf_counter()
+        config = create.__func__(cls, entry)
+        profile.add(config.label, 'import', time.perf_counter() - started)
+        # apps.populate() calls ready() on the instance, so the instance attribute takes precedence.
+        config.ready = _timed(profile, config.label, 'ready', config.ready)
+        return config
+
+    def timed_import_models(self):
+        started = time.perf_counter()
+        try:
+            return import_models(self)
+        finally:
+            profile.add(self.label, 'models', time.perf_counter() - started)
+
+    AppConfig.create = classmethod(timed_create)
+    AppConfig.import_models = timed_import_models
+    started = time.perf_counter()
+    try:
+        settings.INSTALLED_APPS
+        profile.settings = time.perf_counter() - started
+        setup(*args, **kwargs)
+    finally:
+        profile.total = time.perf_counter() - started
+        AppConfig.create = create
+        AppConfig.import_models = import_models
+    return profile
+
+
+def install():
+    """Profile django.setup() and report to stderr when the DJANGO_STARTUP_PROFILE environment variable is set."""
+    if not os.environ.get(ENV_VAR) or getattr(django.setup, 'profiled', False):
+        return
+    setup = django.setup
+
+    @wraps(setup)
+    def profiled_setup(*args, **kwargs):
+        django.setup = setup
+        print(profile_setup(setup, *args, **kwargs).report(), file=sys.stderr)
+
+    profiled_setup.profiled = True
+    django.setup = profiled_setup
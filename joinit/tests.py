@@ -0,0 +1,225 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from cv.models import CvContent
+from joinit import metrics, routers, sqlite
+from users.models import User
+
+
+@override_settings(METRICS_QUERY_SAMPLE_RATE=1, METRICS_N_PLUS_ONE_THRESHOLD=2, METRICS_TOKEN='')
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+
+    def login_staff(self):
+        self.client.force_login(User.objects.create_user(
+            'staff@example.com', 'password', username='staff@example.com', is_staff=True,
+        ))
+
+    def test_authorization(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.client.force_login(User.objects.create_user('user@example.com', 'password', username='user@example.com'))
+        self.assertEqual(self.client.get('/metrics/hot-paths/').status_code, 403)
+        self.login_staff()
+        self.assertEqual(self.client.get('/metrics/').status_code, 200)
+        self.assertEqual(self.client.get('/metrics/hot-paths/').status_code, 200)
+
+        with self.settings(METRICS_TOKEN='secret'):
+            # With a token configured, sessions no longer grant access.
+            self.assertEqual(self.client.get('/metrics/').status_code, 403)
+            self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+    def test_render(self):
+        self.login_staff()
+        self.client.get('/cv/skills/')
+        self.client.get('/cv/skills/')
+        self.client.post('/cv/skills/')
+        self.client.get('/missing/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        lines = response.content.decode().splitlines()
+        self.assertIn('# TYPE joinit_requests_total counter', lines)
+        self.assertIn('joinit_requests_total{view="cv/skills/",method="GET",status="200"} 2', lines)
+        self.assertIn('joinit_requests_total{view="cv/skills/",method="POST",status="405"} 1', lines)
+        self.assertIn('joinit_requests_total{view="<unresolved>",method="GET",status="404"} 1', lines)
+        self.assertIn('joinit_request_duration_seconds_count{view="cv/skills/"} 3', lines)
+        self.assertIn('joinit_request_duration_seconds_bucket{view="cv/skills/",le="+Inf"} 3', lines)
+        self.assertIn('joinit_query_sampled_requests_total{view="cv/skills/"} 3', lines)
+        # Collectors registered by other apps are exported too.
+        self.assertIn('# TYPE joinit_cv_cache_requests_total counter', lines)
+
+    def test_sampled_queries(self):
+        queries = metrics.SampledQueries()
+        for params in ([1], [1], [2]):
+            queries.record('SELECT * FROM cv WHERE id = %s', params, 0.001)
+        queries.record('SELECT * FROM cv WHERE id IN (%s, %s)', [1, 2], 0.001)
+        queries.record('SELECT * FROM cv WHERE id IN (%s)', [3], 0.001)
+        self.assertEqual(queries.duplicates(), 1)
+        self.assertEqual(queries.repeated(), {
+            'SELECT * FROM cv WHERE id = %s': 3, 'SELECT * FROM cv WHERE id IN (...)': 2,
+        })
+
+        metrics.registry.record_request('cv/', 'GET', 200, 0.02, queries)
+        metrics.registry.record_request('cv/<int:pk>/', 'BREW', 200, 0.5)
+        report = metrics.hot_paths()
+        self.assertEqual([entry['view'] for entry in report], ['cv/<int:pk>/', 'cv/'])
+        self.assertEqual((report[1]['sampled_requests'], report[1]['mean_queries']), (1, 5))
+        self.assertEqual(report[1]['n_plus_one_requests'], 1)
+        self.assertEqual(report[1]['repeated_statements'][0], {
+            'sql': 'SELECT * FROM cv WHERE id = %s', 'extra_executions': 2,
+        })
+        self.assertEqual(metrics.registry.views['cv/<int:pk>/'].responses, {('other', 200): 1})
+
+    def test_label_escaping(self):
+        self.assertEqual(
+            metrics._format_sample('requests', {'view': 'a"b\\c\nd'}, 1), 'requests{view="a\\"b\\\\c\\nd"} 1',
+        )
+
+
+class RouterTests(TransactionTestCase):
+    """Every TestCase test runs in a transaction, which pins reads to the primary."""
+
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        self.router.replicas = ['replica_0', 'replica_1']
+
+    def db_for_read(self):
+        return self.router.db_for_read(CvContent)
+
+    def test_reads(self):
+        self.assertIn(self.db_for_read(), self.router.replicas)
+        # Only the models of DATABASE_REPLICA_APPS are read from replicas.
+        self.assertIsNone(self.router.db_for_read(User))
+        self.assertEqual(self.router.db_for_write(CvContent), 'default')
+        self.assertIsNone(routers.PrimaryReplicaRouter().db_for_read(CvContent))
+
+    def test_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.db_for_read(), 'default')
+        with routers.use_primary():
+            self.assertEqual(self.db_for_read(), 'default')
+        self.assertIn(self.db_for_read(), self.router.replicas)
+
+    def test_unsafe_methods(self):
+        middleware = routers.PrimaryForUnsafeMethodsMiddleware(lambda request: self.db_for_read())
+        self.assertIn(middleware(RequestFactory().get('/')), self.router.replicas)
+        self.assertEqual(middleware(RequestFactory().post('/')), 'default')
+
+        async def view(request):
+            return self.db_for_read()
+
+        middleware = routers.PrimaryForUnsafeMethodsMiddleware(view)
+        self.assertIn(async_to_sync(middleware)(RequestFactory().get('/')), self.router.replicas)
+        self.assertEqual(async_to_sync(middleware)(RequestFactory().delete('/')), 'default')
+
+    def test_migrations(self):
+        self.assertIs(self.router.allow_migrate('replica_0', 'cv'), False)
+        self.assertIsNone(self.router.allow_migrate('default', 'cv'))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'The tests database is not SQLite.')
+class SqliteTests(SimpleTestCase):
+    @contextmanager
+    def connect(self):
+        """Yield a new connection to a new database file, configured when it is opened."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_dict = {**connection.settings_dict, 'NAME': f'{directory.name}/db.sqlite3'}
+        with mock.patch.dict(connections.settings, {'sqlite_test': settings_dict}):
+            try:
+                yield connections['sqlite_test']
+            finally:
+                connections['sqlite_test'].close()
+                del connections['sqlite_test']
+
+    def pragmas(self, database):
+        with database.cursor() as cursor:
+            return {name: cursor.execute(f'PRAGMA {name}').fetchone()[0] for name in sqlite.PRAGMAS}
+
+    def test_default(self):
+        with self.connect() as database:
+            self.assertEqual(self.pragmas(database)['journal_mode'], 'delete')
+
+    @override_settings(SQLITE_PERFORMANCE_PROFILE=True, SQLITE_PRAGMAS={'busy_timeout': 1000})
+    def test_performance_profile(self):
+        with self.connect() as database:
+            self.assertEqual(self.pragmas(database), {
+                'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 1000, 'mmap_size': 256 * 1024 * 1024,
+                'cache_size': -64 * 1024, 'temp_store': 2,
+            })
+
+    def transaction_statements(self, database):
+        statements = []
+        # Opening the connection adds the wrappers this one must run after.
+        database.ensure_connection()
+
+        def record(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with database.execute_wrapper(record), transaction.atomic(using=database.alias):
+            database.cursor().execute('CREATE TABLE item (id integer)')
+        return statements
+
+    def test_deferred_transactions(self):
+        with self.connect() as database:
+            self.assertEqual(self.transaction_statements(database), ['BEGIN', 'CREATE TABLE item (id integer)'])
+
+    @override_settings(SQLITE_SERIALIZE_WRITES=True)
+    def test_serialize_writes(self):
+        with self.connect() as database:
+            self.assertEqual(
+                self.transaction_statements(database), ['BEGIN IMMEDIATE', 'CREATE TABLE item (id integer)'],
+            )
+            # Reconnecting does not wrap the connection twice.
+            database.close()
+            database.connect()
+            self.assertEqual(database.execute_wrappers.count(sqlite.begin_immediate), 1)
+
+
+STARTUP_SCRIPT = """
+import json, sys
+import django
+from django.conf import settings
+from joinit import startup
+startup.install()
+django.setup()
+import joinit.urls
+print(json.dumps({'modules': sorted(sys.modules), 'apps': settings.INSTALLED_APPS}))
+"""
+
+
+class StartupTests(SimpleTestCase):
+    """Startup runs in a new interpreter, as this one has imported everything the tests use."""
+
+    HEAVY_MODULES = ('numpy', 'scipy', 'weasyprint', 'qrcode')
+
+    def start(self, **environ):
+        process = subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'joinit.settings', **environ},
+        )
+        return json.loads(process.stdout), process.stderr
+
+    def test_lazy_imports(self):
+        result, stderr = self.start(DJANGO_STARTUP_PROFILE='1')
+        self.assertEqual([name for name in self.HEAVY_MODULES if name in result['modules']], [])
+        self.assertIn('django.setup() (ms)', stderr)
+
+    def test_enabled_providers(self):
+        result, _ = self.start(SOCIALACCOUNT_ENABLED_PROVIDERS='google')
+        providers = [app for app in result['apps'] if app.startswith('allauth.socialaccount.providers.')]
+        self.assertEqual(providers, ['allauth.socialaccount.providers.google'])
+        self.assertNotIn('allauth.socialaccount.providers.facebook', result['modules'])
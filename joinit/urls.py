@@ -16,7 +16,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from joinit import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('allauth.urls')),
+    path('cv/', include('cv.urls')),
+    path('metrics/', metrics.metrics_view, name='metrics'),
+    path('metrics/hot-paths/', metrics.hot_paths_view, name='metrics_hot_paths'),
 ]
@@ -11,6 +11,10 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from joinit import startup
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'joinit.settings')
+# Reports where the startup time goes when DJANGO_STARTUP_PROFILE is set, see joinit/startup.py
+startup.install()
 
 application = get_wsgi_application()
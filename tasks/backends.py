@@ -0,0 +1,87 @@
+"""
+Email backend that queues messages instead of sending them.
+
+Every message becomes a tasks.backends.send_email task, delivered by a worker
+through TASKS_EMAIL_BACKEND, so requests do not wait on the mail server and
+failed deliveries are retried.
+"""
+import base64
+import email
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.mail import EmailMessage, EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from tasks.queue import task
+
+EMAIL_QUEUE = 'email'
+EMAIL_PRIORITY = 10
+
+
+def _encode(content):
+    if isinstance(content, bytes):
+        return {'base64': base64.b64encode(content).decode('ascii')}
+    return {'text': content}
+
+
+def _decode(content):
+    if 'base64' in content:
+        return base64.b64decode(content['base64'])
+    return content['text']
+
+
+def serialize_message(message):
+    attachments = []
+    for attachment in message.attachments:
+        if isinstance(attachment, MIMEBase):
+            attachments.append({'mime': _encode(attachment.as_bytes())})
+        else:
+            filename, content, mimetype = attachment
+            attachments.append({'filename': filename, 'content': _encode(content), 'mimetype': mimetype})
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': [list(alternative) for alternative in getattr(message, 'alternatives', [])],
+        'attachments': attachments,
+        'content_subtype': message.content_subtype,
+        'mixed_subtype': message.mixed_subtype,
+    }
+
+
+def deserialize_message(data):
+    data = dict(data)
+    attachments = data.pop('attachments')
+    content_subtype = data.pop('content_subtype')
+    mixed_subtype = data.pop('mixed_subtype')
+    message = EmailMultiAlternatives(**data)
+    message.content_subtype = content_subtype
+    message.mixed_subtype = mixed_subtype
+    for attachment in attachments:
+        if 'mime' in attachment:
+            message.attach(email.message_from_bytes(_decode(attachment['mime'])))
+        else:
+            message.attach(attachment['filename'], _decode(attachment['content']), attachment['mimetype'])
+    return message
+
+
+@task(queue=EMAIL_QUEUE, priority=EMAIL_PRIORITY)
+def send_email(data):
+    connection = get_connection(settings.TASKS_EMAIL_BACKEND, fail_silently=False)
+    connection.send_messages([deserialize_message(data)])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        queued = 0
+        for message in email_messages:
+            if isinstance(message, EmailMessage) and message.recipients():
+                send_email.enqueue(serialize_message(message))
+                queued += 1
+        return queued
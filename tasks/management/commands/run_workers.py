@@ -0,0 +1,69 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks.backends import EMAIL_QUEUE
+from tasks.queue import DEFAULT_QUEUE
+from tasks.worker import Worker
+
+
+def run_worker(queues, poll_interval, burst):
+    worker = Worker(queues=queues, poll_interval=poll_interval)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run(burst=burst)
+
+
+class Command(BaseCommand):
+    help = 'Run worker processes executing queued background tasks until interrupted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', '-p', type=int, default=1, help='Number of worker processes.')
+        parser.add_argument('--queue', '-q', action='append', dest='queues',
+                            help='Queue to take tasks from, may be repeated. Defaults to the default and email queues.')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait before looking again when no task is ready.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no task is ready.')
+
+    def handle(self, *args, processes, queues, poll_interval, burst, verbosity, **options):
+        queues = queues or [DEFAULT_QUEUE, EMAIL_QUEUE]
+        if processes == 1:
+            run_worker(queues, poll_interval, burst)
+            return
+
+        # Connections must not be shared with the forked workers.
+        connections.close_all()
+        stopping = False
+
+        def start():
+            process = multiprocessing.Process(target=run_worker, args=(queues, poll_interval, burst))
+            process.start()
+            return process
+
+        def stop(*args):
+            nonlocal stopping
+            stopping = True
+            for process in workers:
+                if process.is_alive():
+                    process.terminate()
+
+        workers = [start() for _ in range(processes)]
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        if verbosity > 0:
+            self.stdout.write(f'Started {processes} workers on queues {", ".join(queues)}')
+        while workers:
+            for index, process in enumerate(workers):
+                process.join(timeout=0.5)
+                if process.exitcode is None:
+                    continue
+                if process.exitcode != 0 and not stopping and not burst:
+                    self.stderr.write(f'Worker {process.pid} exited with status {process.exitcode}, restarting it')
+                    workers[index] = start()
+                    time.sleep(1)
+                else:
+                    workers.remove(process)
+                    break
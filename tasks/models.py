@@ -0,0 +1,41 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """A call of a registered task function waiting to run, running, or given up on (see tasks.queue)."""
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued'
+        RUNNING = 'running'
+        FAILED = 'failed'
+
+    # Registered name of the task function, usually its dotted path.
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    queue = models.CharField(max_length=50, default='default')
+    # Higher priorities run first.
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    # Running tasks whose lease expired belong to a worker that died and are queued again.
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['queue', '-priority', 'run_at'], condition=Q(status='queued'), name='tasks_task_ready_idx',
+            ),
+            models.Index(fields=['locked_until'], condition=Q(status='running'), name='tasks_task_lease_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
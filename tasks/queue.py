@@ -0,0 +1,65 @@
+"""
+A small task queue stored in the database.
+
+Functions decorated with @task can be enqueued instead of being called: the
+call is stored as a Task row (in the current transaction, so it is only run
+if that commits) and executed later by a worker process, see tasks.worker and
+the run_workers command. Arguments must be JSON serializable.
+"""
+import functools
+
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from tasks.models import Task
+
+DEFAULT_QUEUE = 'default'
+DEFAULT_MAX_ATTEMPTS = 5
+
+_registry = {}
+
+
+def task(func=None, *, name=None, queue=DEFAULT_QUEUE, priority=0, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Register ``func`` as a task.
+
+    The function gains an ``enqueue(*args, **kwargs)`` method that queues a call
+    with the defaults given here; use enqueue() to override them per call.
+    """
+    if func is None:
+        return functools.partial(task, name=name, queue=queue, priority=priority, max_attempts=max_attempts)
+
+    func.task_name = name or f'{func.__module__}.{func.__qualname__}'
+    func.task_options = {'queue': queue, 'priority': priority, 'max_attempts': max_attempts}
+    func.enqueue = lambda *args, **kwargs: enqueue(func, args, kwargs)
+    _registry[func.task_name] = func
+    return func
+
+
+def get_task(name):
+    """Return the task function registered as ``name``, importing its module if needed."""
+    if name not in _registry:
+        try:
+            import_string(name)
+        except ImportError:
+            pass
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f'No task is registered as {name!r}.') from None
+
+
+def enqueue(func, args=(), kwargs=None, *, queue=None, priority=None, max_attempts=None, run_at=None):
+    """Queue a call of the task ``func`` (a task function or its registered name) and return the Task."""
+    if isinstance(func, str):
+        func = get_task(func)
+    options = func.task_options
+    return Task.objects.create(
+        name=func.task_name,
+        args=list(args),
+        kwargs=kwargs or {},
+        queue=queue or options['queue'],
+        priority=options['priority'] if priority is None else priority,
+        max_attempts=max_attempts or options['max_attempts'],
+        run_at=run_at or timezone.now(),
+    )
@@ -0,0 +1,150 @@
+import datetime
+import time
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from tasks import worker
+from tasks.models import Task
+from tasks.queue import enqueue, get_task, task
+from tasks.worker import Worker
+
+calls = []
+
+
+@task(name='tasks.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='tasks.tests.fail', max_attempts=2)
+def fail():
+    raise RuntimeError('Task failed.')
+
+
+@task(name='tasks.tests.outlive_lease')
+def outlive_lease():
+    time.sleep(1)
+    Worker(name='other-worker').reclaim_expired()
+    calls.append(Task.objects.get(name='tasks.tests.outlive_lease').status)
+
+
+class QueueTests(TestCase):
+    def test_enqueue(self):
+        queued = record.enqueue(1)
+        self.assertEqual((queued.name, queued.args, queued.kwargs), ('tasks.tests.record', [1], {}))
+        self.assertEqual((queued.queue, queued.priority, queued.max_attempts), ('default', 0, 5))
+        self.assertEqual(queued.status, Task.Status.QUEUED)
+
+        run_at = timezone.now() + datetime.timedelta(hours=1)
+        queued = enqueue('tasks.tests.fail', kwargs={}, queue='other', priority=3, run_at=run_at)
+        self.assertEqual((queued.queue, queued.priority, queued.max_attempts), ('other', 3, 2))
+        self.assertEqual(queued.run_at, run_at)
+
+    def test_get_task(self):
+        self.assertIs(get_task('tasks.tests.record'), record)
+        with self.assertRaises(LookupError):
+            get_task('tasks.tests.missing')
+
+
+class WorkerTests(TransactionTestCase):
+    """The worker closes obsolete connections between tasks, so these tests cannot run in a transaction."""
+
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(name='test-worker')
+
+    def test_claim_order(self):
+        now = timezone.now()
+        later = record.enqueue('later')
+        Task.objects.filter(pk=later.pk).update(run_at=now - datetime.timedelta(minutes=1))
+        first = enqueue(record, ['first'], priority=5)
+        enqueue(record, ['future'], priority=9, run_at=now + datetime.timedelta(hours=1))
+        enqueue(record, ['other queue'], queue='other', priority=9)
+        earlier = enqueue(record, ['earlier'], run_at=now - datetime.timedelta(minutes=2))
+
+        claimed = [self.worker.claim() for _ in range(4)]
+        self.assertEqual([task and task.pk for task in claimed], [first.pk, earlier.pk, later.pk, None])
+        task = Task.objects.get(pk=first.pk)
+        self.assertEqual((task.status, task.attempts, task.locked_by), (Task.Status.RUNNING, 1, 'test-worker'))
+        self.assertIsNone(Worker(name='other-worker').claim())
+
+    def test_success(self):
+        record.enqueue('value')
+        self.worker.run(burst=True)
+        self.assertEqual(calls, ['value'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_retry_with_backoff(self):
+        queued = fail.enqueue()
+        started = timezone.now()
+        self.assertTrue(self.worker.run_once())
+        task = Task.objects.get(pk=queued.pk)
+        self.assertEqual((task.status, task.attempts, task.locked_by), (Task.Status.QUEUED, 1, ''))
+        self.assertIn('RuntimeError: Task failed.', task.last_error)
+        # BACKOFF_BASE seconds after the first failure, less up to half of it as jitter.
+        self.assertGreaterEqual(task.run_at, started + datetime.timedelta(seconds=worker.BACKOFF_BASE / 2))
+        self.assertLessEqual(task.run_at, timezone.now() + datetime.timedelta(seconds=worker.BACKOFF_BASE))
+        self.assertFalse(self.worker.run_once())
+
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        self.assertTrue(self.worker.run_once())
+        task = Task.objects.get(pk=queued.pk)
+        self.assertEqual((task.status, task.attempts), (Task.Status.FAILED, 2))
+        self.assertIsNotNone(task.finished_at)
+        self.assertFalse(self.worker.run_once())
+
+    def test_retry_delay(self):
+        with mock.patch('random.uniform', return_value=1):
+            self.assertEqual([worker.retry_delay(attempts) for attempts in (1, 2, 3)], [10, 20, 40])
+            self.assertEqual(worker.retry_delay(20), worker.BACKOFF_MAX)
+
+    def test_reclaim_expired(self):
+        expired = timezone.now() - datetime.timedelta(seconds=1)
+        retried = record.enqueue('retried')
+        given_up = fail.enqueue()
+        running = record.enqueue('running')
+        Task.objects.filter(pk=retried.pk).update(
+            status=Task.Status.RUNNING, attempts=1, locked_by='dead-worker', locked_until=expired,
+        )
+        Task.objects.filter(pk=given_up.pk).update(
+            status=Task.Status.RUNNING, attempts=2, locked_by='dead-worker', locked_until=expired,
+        )
+        Task.objects.filter(pk=running.pk).update(
+            status=Task.Status.RUNNING, attempts=1, locked_by='live-worker',
+            locked_until=timezone.now() + datetime.timedelta(minutes=1),
+        )
+        self.worker.reclaim_expired()
+        self.assertEqual(dict(Task.objects.values_list('pk', 'status')), {
+            retried.pk: Task.Status.QUEUED, given_up.pk: Task.Status.FAILED, running.pk: Task.Status.RUNNING,
+        })
+        self.assertEqual(Task.objects.get(pk=retried.pk).locked_by, '')
+
+    def test_lost_lease(self):
+        # A task reclaimed from this worker while it ran is left to the worker that claimed it next.
+        record.enqueue('value')
+        task = self.worker.claim()
+        Task.objects.filter(pk=task.pk).update(locked_by='other-worker')
+        self.worker.execute(task)
+        self.assertEqual(Task.objects.get(pk=task.pk).locked_by, 'other-worker')
+
+    @override_settings(TASKS_LEASE_SECONDS=0.6)
+    def test_lease_renewal(self):
+        # The lease of a task running longer than TASKS_LEASE_SECONDS is renewed until it finishes.
+        outlive_lease.enqueue()
+        self.worker.run(burst=True)
+        self.assertEqual(calls, [Task.Status.RUNNING])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(
+        EMAIL_BACKEND='tasks.backends.QueuedEmailBackend',
+        TASKS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_queued_email(self):
+        mail.EmailMessage('Subject', 'Body', 'from@example.com', ['to@example.com']).send()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Task.objects.get().queue, 'email')
+        Worker(queues=['email']).run(burst=True)
+        self.assertEqual([(message.subject, message.to) for message in mail.outbox], [('Subject', ['to@example.com'])])
@@ -0,0 +1,169 @@
+"""
+Worker executing queued tasks.
+
+A worker repeatedly claims the ready task with the highest priority from its
+queues and runs it. Claiming uses SELECT ... FOR UPDATE SKIP LOCKED where the
+database supports it and a compare-and-swap UPDATE on the task status
+elsewhere (SQLite), so any number of workers can share a queue without running
+a task twice. A claimed task is leased for TASKS_LEASE_SECONDS, and a thread
+of the worker renews the lease while the task runs, so tasks may take longer;
+tasks of workers that die are queued again once their lease expires.
+
+Successful tasks are deleted. Failed ones are retried with exponential backoff
+until they run out of attempts, then kept with status "failed" and their last
+traceback.
+"""
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.queue import DEFAULT_QUEUE, get_task
+
+BACKOFF_BASE = 10
+BACKOFF_MAX = 60 * 60
+# Ready tasks tried per claim when compare-and-swap loses races to other workers.
+CLAIM_CANDIDATES = 10
+RECLAIM_INTERVAL = 60
+# Lease renewals per TASKS_LEASE_SECONDS, so a slow renewal does not let the lease of a running task expire.
+LEASE_RENEWALS = 3
+
+
+def retry_delay(attempts):
+    """Seconds to wait before retrying a task that failed ``attempts`` times, with jitter."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1)
+
+
+class Worker:
+    def __init__(self, queues=(DEFAULT_QUEUE,), poll_interval=1.0, name=None):
+        self.queues = list(queues)
+        self.poll_interval = poll_interval
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+        self._reclaimed_at = 0.0
+
+    def stop(self, *args):
+        """Finish the running task, then return from run(); usable as a signal handler."""
+        self.stopping = True
+
+    def _ready(self, now):
+        return Task.objects.filter(status=Task.Status.QUEUED, queue__in=self.queues, run_at__lte=now).order_by(
+            '-priority', 'run_at', 'pk',
+        )
+
+    def _lease(self, now):
+        return {
+            'status': Task.Status.RUNNING,
+            'locked_by': self.name,
+            'locked_until': now + timedelta(seconds=settings.TASKS_LEASE_SECONDS),
+        }
+
+    def claim(self):
+        """Mark the next ready task as running on this worker and return it, or None if there is none."""
+        now = timezone.now()
+        lease = self._lease(now)
+        database = router.db_for_write(Task)
+        if connections[database].features.has_select_for_update_skip_locked:
+            with transaction.atomic(using=database):
+                task = self._ready(now).select_for_update(skip_locked=True).first()
+                if task is None:
+                    return None
+                for field, value in lease.items():
+                    setattr(task, field, value)
+                task.attempts += 1
+                task.save(update_fields=[*lease, 'attempts'])
+                return task
+        for pk in self._ready(now).values_list('pk', flat=True)[:CLAIM_CANDIDATES]:
+            claimed = Task.objects.filter(pk=pk, status=Task.Status.QUEUED).update(
+                attempts=F('attempts') + 1, **lease,
+            )
+            if claimed:
+                return Task.objects.get(pk=pk)
+        return None
+
+    def _renew_lease(self, task, done):
+        try:
+            while not done.wait(settings.TASKS_LEASE_SECONDS / LEASE_RENEWALS):
+                Task.objects.filter(pk=task.pk, status=Task.Status.RUNNING, locked_by=self.name).update(
+                    locked_until=self._lease(timezone.now())['locked_until'],
+                )
+        finally:
+            # Only closes the connections of this thread.
+            connections.close_all()
+
+    @contextmanager
+    def _leased(self, task):
+        """Renew the lease of ``task`` in a background thread until the block exits."""
+        done = threading.Event()
+        renewer = threading.Thread(target=self._renew_lease, args=(task, done), name=f'lease-{task.pk}', daemon=True)
+        renewer.start()
+        try:
+            yield
+        finally:
+            done.set()
+            renewer.join()
+
+    def execute(self, task):
+        try:
+            with self._leased(task):
+                get_task(task.name)(*task.args, **task.kwargs)
+        except Exception:
+            self.failed(task, traceback.format_exc())
+        else:
+            Task.objects.filter(pk=task.pk, locked_by=self.name).delete()
+
+    def failed(self, task, error):
+        mine = Task.objects.filter(pk=task.pk, locked_by=self.name)
+        if task.attempts < task.max_attempts:
+            mine.update(
+                status=Task.Status.QUEUED,
+                run_at=timezone.now() + timedelta(seconds=retry_delay(task.attempts)),
+                locked_by='',
+                locked_until=None,
+                last_error=error,
+            )
+        else:
+            mine.update(status=Task.Status.FAILED, locked_until=None, last_error=error, finished_at=timezone.now())
+
+    def reclaim_expired(self):
+        """Queue again the tasks whose worker stopped renewing their lease, or fail them if out of attempts."""
+        now = timezone.now()
+        expired = Task.objects.filter(status=Task.Status.RUNNING, locked_until__lt=now)
+        expired.filter(attempts__gte=F('max_attempts')).update(
+            status=Task.Status.FAILED,
+            locked_until=None,
+            last_error='The worker running the task stopped before the task finished.',
+            finished_at=now,
+        )
+        expired.update(status=Task.Status.QUEUED, run_at=now, locked_by='', locked_until=None)
+
+    def run_once(self):
+        """Claim and execute one task; return whether there was one."""
+        close_old_connections()
+        if time.monotonic() - self._reclaimed_at > RECLAIM_INTERVAL:
+            self.reclaim_expired()
+            self._reclaimed_at = time.monotonic()
+        task = self.claim()
+        if task is not None:
+            self.execute(task)
+        close_old_connections()
+        return task is not None
+
+    def run(self, burst=False):
+        """Execute tasks until stop() is called, or until no task is ready with ``burst``."""
+        while not self.stopping:
+            if not self.run_once():
+                if burst:
+                    return
+                time.sleep(self.poll_interval)
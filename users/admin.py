@@ -0,0 +1,50 @@
+from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
+from django.contrib.auth.forms import UserChangeForm, UserCreationForm
+from django.utils.translation import gettext_lazy as _
+
+from cv.admin import KeysetPaginationMixin
+from users.models import User
+
+
+class UserCreationAdminForm(UserCreationForm):
+    class Meta:
+        model = User
+        fields = ("email",)
+
+    def save(self, commit=True):
+        user = super().save(commit=False)
+        # The username column inherited from AbstractUser is unused but still unique.
+        user.username = user.email
+        if commit:
+            user.save()
+        return user
+
+
+class UserChangeAdminForm(UserChangeForm):
+    class Meta:
+        model = User
+        fields = "__all__"
+
+
+@admin.register(User)
+class UserAdmin(KeysetPaginationMixin, DjangoUserAdmin):
+    form = UserChangeAdminForm
+    add_form = UserCreationAdminForm
+    fieldsets = (
+        (None, {"fields": ("email", "password")}),
+        (_("Personal info"), {"fields": ("first_name", "last_name")}),
+        (
+            _("Permissions"),
+            {"fields": ("is_active", "is_staff", "is_superuser", "groups", "user_permissions")},
+        ),
+        (_("Important dates"), {"fields": ("last_login", "date_joined")}),
+    )
+    add_fieldsets = (
+        (None, {"classes": ("wide",), "fields": ("email", "password1", "password2")}),
+    )
+    list_display = ("email", "first_name", "last_name", "is_staff", "date_joined")
+    search_fields = ("email", "first_name", "last_name")
+    # Served by the user_date_joined_idx index.
+    ordering = ("-date_joined", "-pk")
+    keyset_ordering = ("-date_joined", "-pk")
@@ -0,0 +1,51 @@
+"""
+Password hashers with parameters taken from the settings.
+
+PASSWORD_HASHER_PROFILE selects the hasher of new passwords (see
+PASSWORD_HASHERS in joinit/settings.py); the hashers of the other profiles
+stay enabled so existing hashes still verify. Django rehashes a password when
+its user next logs in successfully if it was hashed with another algorithm or
+with other parameters, so changing the profile or its cost settings migrates
+users transparently.
+
+The default Argon2id parameters are the OWASP recommendation for a single
+lane (19 MiB, two passes): Django's defaults use eight lanes, i.e. up to
+eight threads per login, which lets a burst of logins take over every core.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    # Properties rather than attributes set in __init__(): get_hashers() caches the instances.
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_SCRYPT_BLOCK_SIZE
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_SCRYPT_PARALLELISM
+
+    @property
+    def maxmem(self):
+        # hashlib.scrypt refuses to use more than 32 MiB (128 * n * r bytes) unless allowed to. Leave room
+        # to verify hashes made before the work factor was lowered.
+        return max(4 * 128 * self.work_factor * self.block_size, 256 * 1024 ** 2)
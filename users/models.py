@@ -1,5 +1,3 @@
-from allauth.account.models import EmailAddress
-from allauth_2fa.utils import user_has_valid_totp_device
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.models import PermissionsMixin
 from django.contrib.auth.models import UserManager as DjangoUserManager
@@ -8,6 +6,8 @@ from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from users import verification
+
 
 class UserManager(DjangoUserManager):
     def _create_user(self, email, password, **extra_fields):
@@ -68,6 +68,10 @@ class User(AbstractUser, PermissionsMixin):
     class Meta:
         verbose_name = _("user")
         verbose_name_plural = _("users")
+        indexes = [
+            # Keyset pagination of the user list, see cv.pagination.
+            models.Index(fields=["date_joined", "id"], name="user_date_joined_idx"),
+        ]
 
     def clean(self):
         super().clean()
@@ -104,12 +108,23 @@ class User(AbstractUser, PermissionsMixin):
 
     @property
     def has_verified_email(self):
+        return verification.cached_check(self, "has_verified_email", self._has_verified_email)
+
+    def _has_verified_email(self):
+        from allauth.account.models import EmailAddress
+
         return EmailAddress.objects.filter(
             user=self, verified=True, email__iexact=self.email
         ).exists()
 
     @property
     def has_valid_totp_device(self):
+        return verification.cached_check(self, "has_valid_totp_device", self._has_valid_totp_device)
+
+    def _has_valid_totp_device(self):
+        # Imported here as allauth_2fa.utils imports qrcode, which most processes never use.
+        from allauth_2fa.utils import user_has_valid_totp_device
+
         return user_has_valid_totp_device(self)
 
     def __str__(self):
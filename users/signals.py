@@ -0,0 +1,32 @@
+from allauth.account.models import EmailAddress
+from django.apps import apps
+from django.contrib.auth.signals import user_logged_in, user_login_failed
+from django.db.models.signals import post_delete, post_save
+
+from users import throttle, verification
+from users.models import User
+
+
+def invalidate_owner_verification(sender, instance, raw=False, **kwargs):
+    if not raw:
+        verification.invalidate(instance.user_id)
+
+
+def invalidate_user_verification(sender, instance, raw=False, update_fields=None, **kwargs):
+    # has_verified_email depends on the user's current email address.
+    if not raw and (update_fields is None or "email" in update_fields):
+        verification.invalidate(instance.pk)
+
+
+def connect():
+    post_save.connect(invalidate_owner_verification, sender=EmailAddress, dispatch_uid="users_email_saved")
+    post_delete.connect(invalidate_owner_verification, sender=EmailAddress, dispatch_uid="users_email_deleted")
+    post_save.connect(invalidate_user_verification, sender=User, dispatch_uid="users_user_saved")
+    user_login_failed.connect(throttle.login_failed, dispatch_uid="users_login_failed")
+    user_logged_in.connect(throttle.logged_in, dispatch_uid="users_logged_in")
+
+    if apps.is_installed("django_otp.plugins.otp_totp"):
+        from django_otp.plugins.otp_totp.models import TOTPDevice
+
+        post_save.connect(invalidate_owner_verification, sender=TOTPDevice, dispatch_uid="users_totp_saved")
+        post_delete.connect(invalidate_owner_verification, sender=TOTPDevice, dispatch_uid="users_totp_deleted")
@@ -1 +1,166 @@
-# Create your tests here.
+import time
+from unittest import mock, skipUnless
+
+from allauth.account.models import EmailAddress
+from django.apps import apps
+from django.contrib.auth import authenticate, user_logged_in
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from users import signals, verification
+from users.models import User
+from users.verification import VerificationCacheMiddleware
+
+
+@override_settings(LOGIN_THROTTLE_IDENTIFIER_LIMIT=3, LOGIN_THROTTLE_IP_LIMIT=5)
+class LoginThrottleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("jane@example.com", "correct horse", username="jane@example.com")
+
+    def setUp(self):
+        cache.clear()
+
+    def authenticate(self, email, password, ip="192.0.2.1"):
+        request = RequestFactory().post("/accounts/login/", REMOTE_ADDR=ip)
+        return authenticate(request, email=email, password=password)
+
+    def test_identifier_limit(self):
+        for _ in range(3):
+            self.assertIsNone(self.authenticate("jane@example.com", "wrong"))
+        # Even the right password is rejected from that address until the window ends.
+        self.assertIsNone(self.authenticate("JANE@example.com", "correct horse"))
+        # Failures from one address do not lock the user out of the others.
+        self.assertEqual(self.authenticate("jane@example.com", "correct horse", ip="198.51.100.7"), self.user)
+
+    def test_ip_limit(self):
+        for number in range(5):
+            self.authenticate(f"user{number}@example.com", "wrong")
+        self.assertIsNone(self.authenticate("jane@example.com", "correct horse"))
+        self.assertEqual(self.authenticate("jane@example.com", "correct horse", ip="198.51.100.7"), self.user)
+
+    def test_login_clears_identifier(self):
+        for _ in range(2):
+            self.authenticate("jane@example.com", "wrong")
+        self.assertEqual(self.authenticate("jane@example.com", "correct horse"), self.user)
+        user_logged_in.send(sender=User, request=RequestFactory().get("/", REMOTE_ADDR="192.0.2.1"), user=self.user)
+        for _ in range(2):
+            self.authenticate("jane@example.com", "wrong")
+        self.assertEqual(self.authenticate("jane@example.com", "correct horse"), self.user)
+
+    def test_force_login(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.session["_auth_user_id"], str(self.user.pk))
+        self.assertEqual(self.client.get("/admin/").wsgi_request.user, self.user)
+
+
+class PasswordRehashTests(TestCase):
+    @override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.PBKDF2PasswordHasher"])
+    def make_user(self):
+        return User.objects.create(
+            email="jane@example.com", username="jane@example.com", password=make_password("correct horse"),
+        )
+
+    @override_settings(PASSWORD_HASHERS=[
+        "users.hashers.Argon2PasswordHasher", "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    ])
+    def test_rehash_on_login(self):
+        user = self.make_user()
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$"))
+        self.assertEqual(authenticate(email="jane@example.com", password="correct horse"), user)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("argon2$argon2id$"), user.password)
+        self.assertFalse(identify_hasher(user.password).must_update(user.password))
+
+    @override_settings(PASSWORD_HASHERS=["users.hashers.Argon2PasswordHasher", "users.hashers.ScryptPasswordHasher"])
+    def test_cost_settings(self):
+        # get_hashers() caches the hashers, so they must read their parameters on use.
+        self.assertIn(",t=2,", make_password("correct horse"))
+        with self.settings(PASSWORD_ARGON2_TIME_COST=3):
+            password = make_password("correct horse")
+            self.assertIn(",t=3,", password)
+            self.assertFalse(identify_hasher(password).must_update(password))
+        self.assertTrue(identify_hasher(password).must_update(password))
+        with self.settings(PASSWORD_SCRYPT_WORK_FACTOR=2 ** 10):
+            self.assertIn("scrypt$1024$", make_password("correct horse", hasher="scrypt"))
+
+
+class VerificationCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("jane@example.com", "correct horse", username="jane@example.com")
+        cls.email = EmailAddress.objects.create(user=cls.user, email="jane@example.com", verified=True, primary=True)
+
+    def setUp(self):
+        cache.clear()
+        self.session = SessionStore()
+
+    def check(self, name="has_verified_email", queries=1):
+        """Run a request checking the user twice and return the result."""
+        results = []
+
+        def view(request):
+            results.extend(getattr(request.user, name) for _ in range(2))
+            return HttpResponse()
+
+        request = RequestFactory().get("/")
+        request.user, request.session = self.user, self.session
+        with self.assertNumQueries(queries):
+            VerificationCacheMiddleware(view)(request)
+        self.assertEqual(results[0], results[1])
+        return results[0]
+
+    def test_one_query_per_request(self):
+        self.assertTrue(self.check())
+        # Without USER_VERIFICATION_SESSION_TTL, every request checks again.
+        self.assertTrue(self.check())
+        self.assertNotIn(verification.SESSION_KEY, self.session)
+
+    @override_settings(USER_VERIFICATION_SESSION_TTL=60)
+    def test_session(self):
+        self.assertTrue(self.check())
+        self.assertTrue(self.check(queries=0))
+        with mock.patch("time.time", return_value=time.time() + 61):
+            self.assertTrue(self.check())
+
+    @override_settings(USER_VERIFICATION_SESSION_TTL=60)
+    def test_email_address_changes(self):
+        self.assertTrue(self.check())
+        self.email.verified = False
+        self.email.save()
+        self.assertFalse(self.check())
+        self.assertFalse(self.check(queries=0))
+        self.email.delete()
+        self.assertFalse(self.check())
+
+    @override_settings(USER_VERIFICATION_SESSION_TTL=60)
+    def test_user_email_changes(self):
+        self.assertTrue(self.check())
+        self.user.save(update_fields=["first_name"])
+        self.assertTrue(self.check(queries=0))
+        self.user.email = "john@example.com"
+        self.user.save()
+        self.assertFalse(self.check())
+
+    @override_settings(USER_VERIFICATION_SESSION_TTL=60)
+    def test_totp_device_receiver(self):
+        # The receiver connected to TOTPDevice changes when django_otp is installed.
+        with mock.patch.object(User, "_has_valid_totp_device", side_effect=[False, True]):
+            self.assertFalse(self.check("has_valid_totp_device", queries=0))
+            self.assertFalse(self.check("has_valid_totp_device", queries=0))
+            signals.invalidate_owner_verification(sender=None, instance=mock.Mock(user_id=self.user.pk))
+            self.assertTrue(self.check("has_valid_totp_device", queries=0))
+
+    @skipUnless(apps.is_installed("django_otp.plugins.otp_totp"), "django_otp.plugins.otp_totp is not installed")
+    @override_settings(USER_VERIFICATION_SESSION_TTL=60)
+    def test_totp_device_changes(self):
+        from django_otp.plugins.otp_totp.models import TOTPDevice
+
+        self.assertFalse(self.check("has_valid_totp_device"))
+        device = TOTPDevice.objects.create(user=self.user, name="Phone")
+        self.assertTrue(self.check("has_valid_totp_device"))
+        device.delete()
+        self.assertFalse(self.check("has_valid_totp_device"))
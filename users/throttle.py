@@ -0,0 +1,109 @@
+"""
+Login throttling in front of the password hashers.
+
+LoginThrottleBackend comes first in AUTHENTICATION_BACKENDS. It counts failed
+logins per submitted identifier (email or username) and client IP address pair
+and per client IP address in the default cache, in fixed windows of
+LOGIN_THROTTLE_WINDOW seconds. Once either count reaches its limit it raises
+PermissionDenied, which stops authenticate() before any other backend hashes
+the password: a credential stuffing burst then costs one cache lookup per
+attempt instead of a hash. Identifiers are only counted per address, so failed
+attempts from elsewhere cannot lock a user out. A successful login clears the
+count of its identifier and address.
+
+Behind a reverse proxy, set LOGIN_THROTTLE_IP_HEADER to the request.META key
+of the header the proxy sets (e.g. HTTP_X_FORWARDED_FOR); otherwise every
+client shares the proxy's address.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+
+KEY_PREFIX = "login-throttle"
+
+
+def _window():
+    return int(time.time() // settings.LOGIN_THROTTLE_WINDOW)
+
+
+def _key(kind, value, window):
+    digest = hashlib.sha256(value.encode()).hexdigest()[:32]
+    return f"{KEY_PREFIX}:{kind}:{digest}:{window}"
+
+
+def get_identifier(credentials):
+    identifier = credentials.get("username") or credentials.get("email") or ""
+    return identifier.strip().casefold() if isinstance(identifier, str) else ""
+
+
+def get_client_ip(request):
+    if request is None:
+        return ""
+    header = settings.LOGIN_THROTTLE_IP_HEADER
+    if header and request.META.get(header):
+        # The proxy appends the address it received the request from, so the last one can be trusted.
+        return request.META[header].split(",")[-1].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _identifier_key(identifier, ip, window):
+    return _key("id", f"{identifier}\n{ip}", window)
+
+
+def _keys(request, credentials, window):
+    keys = {}
+    identifier = get_identifier(credentials)
+    ip = get_client_ip(request)
+    if identifier:
+        keys[_identifier_key(identifier, ip, window)] = settings.LOGIN_THROTTLE_IDENTIFIER_LIMIT
+    if ip:
+        keys[_key("ip", ip, window)] = settings.LOGIN_THROTTLE_IP_LIMIT
+    return keys
+
+
+def is_throttled(request, credentials):
+    keys = _keys(request, credentials, _window())
+    counts = cache.get_many(keys)
+    return any(count >= keys[key] for key, count in counts.items())
+
+
+def record_failure(request, credentials):
+    for key in _keys(request, credentials, _window()):
+        # add() starts the count without resetting one another process created meanwhile.
+        cache.add(key, 0, timeout=settings.LOGIN_THROTTLE_WINDOW)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr().
+            cache.set(key, 1, timeout=settings.LOGIN_THROTTLE_WINDOW)
+
+
+def clear_identifier(request, identifier):
+    if identifier:
+        cache.delete(_identifier_key(identifier.strip().casefold(), get_client_ip(request), _window()))
+
+
+class LoginThrottleBackend:
+    """
+    Authentication backend that never authenticates, but stops authenticate() for throttled attempts.
+
+    It has no get_user() method, so Client.force_login() and login() without a backend skip it.
+    """
+
+    def authenticate(self, request, **credentials):
+        if settings.LOGIN_THROTTLE_WINDOW and is_throttled(request, credentials):
+            raise PermissionDenied("Too many failed login attempts.")
+        return None
+
+
+def login_failed(sender, credentials, request=None, **kwargs):
+    if settings.LOGIN_THROTTLE_WINDOW:
+        record_failure(request, credentials)
+
+
+def logged_in(sender, request, user, **kwargs):
+    if settings.LOGIN_THROTTLE_WINDOW:
+        clear_identifier(request, user.get_username())
@@ -0,0 +1,133 @@
+"""
+Request- and session-scoped caching of the User verification checks.
+
+User.has_verified_email and User.has_valid_totp_device each cost a query. While
+VerificationCacheMiddleware is handling a request their results are memoized
+for the rest of the request and, when USER_VERIFICATION_SESSION_TTL is set,
+kept in the session for that many seconds. Every change to a user's email
+addresses or TOTP devices bumps a per-user generation number in the default
+cache, which makes earlier results stale in every session. Sessions can outlive
+a process, so with USER_VERIFICATION_SESSION_TTL set the default cache must be
+shared by all of them: the local memory cache is per process, and a change made
+through one would go unnoticed by the sessions served by the others.
+"""
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+SESSION_KEY = '_user_verification'
+
+_current = ContextVar('user_verification_cache', default=None)
+
+
+def _generation_key(user_pk):
+    return f'users:{user_pk}:verification'
+
+
+def get_generation(user_pk):
+    return cache.get(_generation_key(user_pk), 0)
+
+
+def invalidate(user_pk):
+    """Forget the cached verification checks of a user, in this request and in all sessions."""
+    try:
+        cache.incr(_generation_key(user_pk))
+    except ValueError:
+        cache.set(_generation_key(user_pk), 1, timeout=None)
+    request_cache = _current.get()
+    if request_cache is not None:
+        request_cache.forget(user_pk)
+
+
+class RequestVerificationCache:
+    def __init__(self, request):
+        self.request = request
+        self.values = {}
+        self.generations = {}
+
+    def _uses_session(self, user_pk):
+        # Only the checks of the logged in user are worth keeping in their session.
+        if not settings.USER_VERIFICATION_SESSION_TTL or not hasattr(self.request, 'session'):
+            return False
+        return getattr(getattr(self.request, 'user', None), 'pk', None) == user_pk
+
+    def _generation(self, user_pk):
+        if user_pk not in self.generations:
+            self.generations[user_pk] = get_generation(user_pk)
+        return self.generations[user_pk]
+
+    def _session_entry(self, user_pk):
+        entry = self.request.session.get(SESSION_KEY)
+        if (
+            entry
+            and entry['user'] == user_pk
+            and entry['expires'] > time.time()
+            and entry['generation'] == self._generation(user_pk)
+        ):
+            return entry
+        return None
+
+    def _store_in_session(self, user_pk, name, value):
+        entry = self._session_entry(user_pk) or {
+            'user': user_pk,
+            'generation': self._generation(user_pk),
+            'expires': time.time() + settings.USER_VERIFICATION_SESSION_TTL,
+            'values': {},
+        }
+        entry['values'][name] = value
+        self.request.session[SESSION_KEY] = entry
+
+    def get(self, user, name, compute):
+        uses_session = self._uses_session(user.pk)
+        values = self.values.get(user.pk)
+        if values is None:
+            entry = self._session_entry(user.pk) if uses_session else None
+            values = self.values[user.pk] = dict(entry['values']) if entry else {}
+        if name not in values:
+            values[name] = compute()
+            if uses_session:
+                self._store_in_session(user.pk, name, values[name])
+        return values[name]
+
+    def forget(self, user_pk):
+        self.values.pop(user_pk, None)
+        self.generations.pop(user_pk, None)
+
+
+def cached_check(user, name, compute):
+    """Return ``compute()``, memoized for the current request when there is one."""
+    request_cache = _current.get()
+    if request_cache is None or user.pk is None:
+        return compute()
+    return request_cache.get(user, name, compute)
+
+
+class VerificationCacheMiddleware:
+    """Memoize User verification checks for the duration of each request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _current.set(RequestVerificationCache(request))
+        try:
+            return self.get_response(request)
+        finally:
+            _current.reset(token)
+
+    async def __acall__(self, request):
+        token = _current.set(RequestVerificationCache(request))
+        try:
+            return await self.get_response(request)
+        finally:
+            _current.reset(token)